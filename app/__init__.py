@@ -1,3 +1,10 @@
-from app.api.main import create_app
-
 __all__ = ["create_app"]
+
+
+def __getattr__(name):
+    # Lazy: `import app.services.*` (OCR pool children, CLIs, batch_processor) must not pull in FastAPI.
+    if name == "create_app":
+        from app.api.main import create_app
+
+        return create_app
+    raise AttributeError(f"module 'app' has no attribute {name!r}")
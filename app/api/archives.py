@@ -0,0 +1,201 @@
+# archives.py
+import os
+import queue
+import shutil
+import tarfile
+import tempfile
+import threading
+import zipfile
+from typing import IO, AsyncIterator, Iterator, Optional, Tuple, Union
+
+from starlette.concurrency import run_in_threadpool
+
+from app.api.uploads import UPLOAD_MEMORY_MAX_MB, Uploads
+
+# Tope de entradas por archivo comprimido y de tamaño descomprimido por entrada (defensa contra zip bombs).
+ARCHIVE_MAX_ENTRIES = max(1, int(os.environ.get("ARCHIVE_MAX_ENTRIES", "2000")))
+ARCHIVE_MAX_ENTRY_MB = float(os.environ.get("ARCHIVE_MAX_ENTRY_MB", "64"))
+_ARCHIVE_MAX_ENTRY_BYTES = int(ARCHIVE_MAX_ENTRY_MB * 1024 * 1024)
+_MEMORY_MAX_BYTES = int(UPLOAD_MEMORY_MAX_MB * 1024 * 1024)
+# Entradas leidas por adelantado mientras los workers extraen (acota la memoria del stream).
+ARCHIVE_READ_AHEAD = max(1, int(os.environ.get("ARCHIVE_READ_AHEAD", "4")))
+
+_CHUNK = 1024 * 1024
+_PENDING = object()
+
+# (indice en el archivo, nombre, bytes o ruta temporal del PDF, error)
+ArchiveEntry = Tuple[int, str, Optional[Union[bytes, str]], Optional[str]]
+
+
+class Archives:
+    """Lectura en streaming de uploads ZIP/TAR: cada PDF se descomprime recien cuando se lo necesita."""
+
+    @staticmethod
+    def kind(fileobj: IO[bytes]) -> Optional[str]:
+        """
+        "zip", "tar" (plano o comprimido con gzip/bz2/xz) o None, mirando solo la cabecera del upload.
+        """
+        fileobj.seek(0)
+        head = fileobj.read(512)
+        fileobj.seek(0)
+        if head.startswith(b"PK\x03\x04") or head.startswith(b"PK\x05\x06"):
+            return "zip"
+        if head[:2] == b"\x1f\x8b" or head[:3] == b"BZh" or head[:6] == b"\xfd7zXZ\x00" or head[257:262] == b"ustar":
+            return "tar"
+        return None
+
+    @staticmethod
+    def spool(fileobj: IO[bytes]) -> IO[bytes]:
+        """
+        Copia el upload a un temporal anonimo propio (se borra al cerrarlo), para leerlo despues de que
+        el request cierre su UploadFile (respuestas en streaming).
+        """
+        fileobj.seek(0)
+        spooled = tempfile.TemporaryFile()
+        try:
+            shutil.copyfileobj(fileobj, spooled, _CHUNK)
+            spooled.seek(0)
+        except Exception:
+            spooled.close()
+            raise
+        return spooled
+
+    @staticmethod
+    def _read_entry(stream: IO[bytes], name: str) -> Tuple[Optional[Union[bytes, str]], Optional[str]]:
+        """
+        Copia una entrada a memoria (hasta UPLOAD_MEMORY_MAX_MB) o a un temporal, por chunks.
+        Valida la firma `%PDF` y corta si supera ARCHIVE_MAX_ENTRY_MB.
+        """
+        head = stream.read(_CHUNK)
+        if b"%PDF" not in head[:1024]:
+            return None, "No es un PDF valido."
+        buffer = bytearray()
+        tmp = None
+        size = 0
+        chunk = head
+        try:
+            while chunk:
+                size += len(chunk)
+                if size > _ARCHIVE_MAX_ENTRY_BYTES:
+                    raise ValueError(f"{name}: supera {ARCHIVE_MAX_ENTRY_MB:g} MB descomprimido")
+                if tmp is None and size > _MEMORY_MAX_BYTES:
+                    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
+                    tmp.write(buffer)
+                    buffer = bytearray()
+                if tmp is not None:
+                    tmp.write(chunk)
+                else:
+                    buffer += chunk
+                chunk = stream.read(_CHUNK)
+        except ValueError as ex:
+            if tmp is not None:
+                tmp.close()
+                Uploads.cleanup_temp_file(tmp.name)
+            return None, f"Archivo demasiado grande ({ex})."
+        if tmp is not None:
+            tmp.close()
+            return tmp.name, None
+        return bytes(buffer), None
+
+    @staticmethod
+    def _members(fileobj: IO[bytes], kind: str) -> Iterator[Tuple[str, Optional[IO[bytes]]]]:
+        """(nombre, stream) de cada archivo regular, en el orden del archivo comprimido."""
+        fileobj.seek(0)
+        if kind == "zip":
+            with zipfile.ZipFile(fileobj) as zf:
+                for info in zf.infolist():
+                    if info.is_dir():
+                        continue
+                    try:
+                        stream = zf.open(info)
+                    except (RuntimeError, NotImplementedError, zipfile.BadZipFile):  # cifrada / compresion no soportada
+                        yield info.filename, None
+                        continue
+                    with stream:
+                        yield info.filename, stream
+            return
+        # "r|*": lectura secuencial sin seek, descomprimiendo gzip/bz2/xz al vuelo
+        with tarfile.open(fileobj=fileobj, mode="r|*") as tar:
+            for member in tar:
+                if member.isfile():
+                    yield member.name, tar.extractfile(member)
+
+    @staticmethod
+    def iter_entries(fileobj: IO[bytes], kind: str) -> Iterator[ArchiveEntry]:
+        """
+        Recorre el archivo comprimido devolviendo (indice, nombre, fuente, error) por entrada.
+        Las que no son PDF quedan con error; un archivo corrupto corta con una entrada de error final.
+        """
+        index = -1
+        try:
+            for index, (name, stream) in enumerate(Archives._members(fileobj, kind)):
+                if index >= ARCHIVE_MAX_ENTRIES:
+                    yield index, name, None, f"Se supero el limite de {ARCHIVE_MAX_ENTRIES} archivos."
+                    return
+                if not name.lower().endswith(".pdf"):
+                    yield index, name, None, "Solo se aceptan PDFs."
+                    continue
+                if stream is None:
+                    yield index, name, None, "No se pudo leer la entrada (cifrada o compresion no soportada)."
+                    continue
+                source, error = Archives._read_entry(stream, name)
+                yield index, name, source, error
+        except Exception as ex:  # BadZipFile, TarError, zlib.error, EOF truncado...
+            yield index + 1, "", None, f"Archivo comprimido invalido: {ex}"
+
+    @staticmethod
+    async def stream_entries(fileobj: IO[bytes], kind: str) -> AsyncIterator[ArchiveEntry]:
+        """
+        `iter_entries` en un thread aparte, con a lo sumo ARCHIVE_READ_AHEAD entradas leidas por adelantado.
+        Si el consumidor corta antes, el thread se detiene y libera los temporales que quedaron sin usar.
+        """
+        entries: "queue.Queue[Optional[ArchiveEntry]]" = queue.Queue(maxsize=ARCHIVE_READ_AHEAD)
+        stop = threading.Event()
+
+        def produce() -> None:
+            try:
+                for entry in Archives.iter_entries(fileobj, kind):
+                    queued = False
+                    while not queued and not stop.is_set():
+                        try:
+                            entries.put(entry, timeout=0.5)
+                            queued = True
+                        except queue.Full:
+                            continue
+                    if not queued:
+                        Uploads.release(entry[2])
+                        return
+            finally:
+                while not stop.is_set():
+                    try:
+                        entries.put(None, timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+
+        def next_entry() -> Union[ArchiveEntry, None, object]:
+            try:
+                return entries.get(timeout=0.5)
+            except queue.Empty:
+                return _PENDING
+
+        producer = threading.Thread(target=produce, name="archive-reader", daemon=True)
+        producer.start()
+        try:
+            while True:
+                entry = await run_in_threadpool(next_entry)
+                if entry is _PENDING:
+                    continue
+                if entry is None:
+                    return
+                yield entry
+        finally:
+            stop.set()
+            await run_in_threadpool(producer.join, 1.0)
+            while True:
+                try:
+                    leftover = entries.get_nowait()
+                except queue.Empty:
+                    break
+                if leftover is not None:
+                    Uploads.release(leftover[2])
@@ -1,22 +1,128 @@
-import os
-from typing import Annotated, Optional
+import asyncio
+import json
+import time
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from typing import Annotated, AsyncIterator, Optional
 
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Query
+from fastapi import Depends, FastAPI, File, UploadFile, Form, Header, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 
 from app.config import apply_runtime_env
 from app.models import Vendor, OutFmt
-from app.formatters import to_kv, to_ini, clean_cuit
-from app.api.uploads import Uploads
+from app.formatters import to_kv, to_ini, clean_cuit, batch_to_kv, batch_to_ini, debug_to_kv, debug_to_ini
+from app.api.archives import Archives
+from app.api.uploads import UploadBudget, Uploads, upload_budget
 
 apply_runtime_env()
 
-from app.services.extractor import extract_from_pdf  # noqa: E402
+from app.services.extraction_executor import (  # noqa: E402
+    LaneFull,
+    choose_lane,
+    get_extraction_executor,
+    shutdown_extraction_executor,
+)
+from app.services.job_queue import get_job_queue, start_job_workers, stop_job_workers  # noqa: E402
+from app.services.line_cache import get_line_cache  # noqa: E402
+from app.services.metrics import HTTP_IN_FLIGHT, HTTP_SECONDS, METRICS, cache_event_totals, record_stage  # noqa: E402
+from app.services.result_cache import get_result_cache  # noqa: E402
+from app.services.warmup import WARMUP_ENABLED, mark_ready, warm_worker, warmup_status  # noqa: E402
+
+
+def _clean_item(item: dict) -> dict:
+    data = item.get("data")
+    if isinstance(data, dict) and "cuit" in data:
+        data["cuit"] = clean_cuit(data["cuit"])
+    return item
+
+
+def _batch_error(ex: Exception) -> str:
+    if isinstance(ex, asyncio.TimeoutError):
+        return "Tiempo de extraccion agotado."
+    if isinstance(ex, BrokenProcessPool):
+        return "El proceso de extraccion termino inesperadamente."
+    return str(ex)
+
+
+def _batch_item(filename: str, minimal: Optional[dict], error: Optional[Exception]) -> dict:
+    if error is not None:
+        return {"file": filename, "status": "error", "error": _batch_error(error)}
+    if "cuit" in minimal:
+        minimal["cuit"] = clean_cuit(minimal["cuit"])
+    return {"file": filename, "status": "ok", "data": minimal}
+
+
+def _debug_info(trace: dict, api_stages: dict, total_seconds: float) -> dict:
+    """Per-request debug payload: stage durations, pages, DPI, OCR confidence and cache hits."""
+    stages = {name: sum(values) for name, values in trace.get("stages", {}).items()}
+    for name, seconds in api_stages.items():
+        stages[name] = stages.get(name, 0.0) + seconds
+    counters = trace.get("counters", {})
+    attrs = trace.get("attrs", {})
+    units = attrs.get("ocr_units") or []
+    confs = [unit["conf"] for unit in units if unit.get("conf") is not None]
+    return {
+        "total_ms": round(total_seconds * 1000, 1),
+        "stages_ms": {name: round(seconds * 1000, 1) for name, seconds in stages.items()},
+        "pages": {"text": int(counters.get("text_pages", 0)), "ocr": int(counters.get("ocr_pages", 0))},
+        "dpi": sorted({unit["dpi"] for unit in units if unit.get("dpi")}),
+        "ocr_conf": round(sum(confs) / len(confs), 1) if confs else None,
+        "ocr_units": units,
+        "cache": {"result": bool(counters.get("result_cache_hit")), "line": bool(counters.get("line_cache_hit"))},
+        "coalesced": bool(attrs.get("coalesced")),
+        "vendor": attrs.get("vendor"),
+        "reader_mode": attrs.get("reader_mode"),
+        "skipped_pages": attrs.get("skipped_pages") or [],
+    }
+
+
+def _server_timing(debug: dict) -> str:
+    """`Server-Timing` value (RFC: name;dur=ms) built from a `_debug_info` payload."""
+    parts = [f"{name};dur={ms}" for name, ms in debug["stages_ms"].items()]
+    for tier, hit in debug["cache"].items():
+        if hit:
+            parts.append(f'cache;desc="{tier}"')
+    parts.append(f"total;dur={debug['total_ms']}")
+    return ", ".join(parts)
+
+
+def _format_item(item: dict, fmt: OutFmt) -> dict:
+    """Batch item with `data` rendered as a kv/ini block when that format was requested."""
+    if item["status"] != "ok" or fmt == OutFmt.json:
+        return item
+    render = to_kv if fmt == OutFmt.kv else to_ini
+    return dict(item, data=render(item["data"]))
+
+
+def _ndjson_line(payload: dict) -> str:
+    return json.dumps(payload, ensure_ascii=False) + "\n"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Per worker, after fork: job workers, then OCR warm-up in the background (see `/ready`)."""
+    start_job_workers()
+    warming = None
+    if WARMUP_ENABLED:
+        warming = asyncio.get_running_loop().run_in_executor(None, warm_worker)
+    else:
+        mark_ready()
+    try:
+        yield
+    finally:
+        stop_job_workers()
+        shutdown_extraction_executor()
+        if warming is not None and not warming.done():
+            warming.cancel()
 
 
 def create_app() -> FastAPI:
-    app = FastAPI(title="Factura Extractor API v6", version="1.2.0")
+    # No warm-up here: importing this module must stay cheap. The fork-safe part runs in the gunicorn
+    # master from app.api.preloaded, and per worker from the lifespan (warm_worker).
+    app = FastAPI(title="Factura Extractor API v6", version="1.2.0", lifespan=lifespan)
     app.add_middleware(
         CORSMiddleware,
         allow_origins=["*"],
@@ -25,106 +131,350 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    @app.middleware("http")
+    async def track_requests(request: Request, call_next):
+        HTTP_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            HTTP_SECONDS.observe(
+                time.perf_counter() - started, method=request.method, route=route, status=status)
+
+    @app.exception_handler(LaneFull)
+    async def lane_full(request: Request, ex: LaneFull) -> JSONResponse:
+        return JSONResponse(
+            {"detail": "Servidor saturado, reintentar mas tarde o usar /jobs.", "lane": ex.lane},
+            status_code=503,
+            headers={"Retry-After": str(ex.retry_after)},
+        )
+
     @app.get("/health")
     async def health() -> dict:
         return {"status": "ok"}
 
+    @app.get("/ready")
+    async def ready() -> JSONResponse:
+        status = warmup_status()
+        return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+    @app.get("/metrics")
+    async def metrics() -> PlainTextResponse:
+        return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+    @app.get("/executor/stats")
+    async def executor_stats() -> dict:
+        return get_extraction_executor().stats()
+
+    @app.get("/cache/stats")
+    async def cache_stats() -> dict:
+        # Las extracciones corren en los procesos del pool OCR: los contadores de las instancias de
+        # cache de este proceso no ven esos lookups, asi que se arman con lo que traen los traces.
+        result = {name: 0 for name in ("memory_hits", "disk_hits", "misses", "stores", "errors")}
+        result.update(cache_event_totals("result"))
+        lookups = result["memory_hits"] + result["disk_hits"] + result["misses"]
+        result["hit_ratio"] = round((result["memory_hits"] + result["disk_hits"]) / lookups, 3) if lookups else 0.0
+        lines = {name: 0 for name in ("hits", "misses", "stores", "errors")}
+        lines.update(cache_event_totals("line"))
+        stats: dict = {"enabled": get_result_cache() is not None, **result}
+        stats["lines"] = {"enabled": get_line_cache() is not None, **lines}
+        return stats
+
     @app.post("/extract", response_model=None)
     async def extract_invoice(
         file: Annotated[UploadFile, File(...)],
         vendor: Annotated[Vendor, Form(...)],
         fmt: Annotated[OutFmt, Query(alias="format")] = OutFmt.json,
         use_ocr: Annotated[Optional[bool], Form()] = None,
+        debug: Annotated[bool, Query()] = False,
     ) -> Response:
         filename = (file.filename or "").lower()
         if not filename.endswith(".pdf"):
             raise HTTPException(
                 status_code=400, detail="Solo se aceptan archivos PDF por el momento.")
 
-        tmp_path = None
+        started = time.perf_counter()
+        api_stages: dict = {}
+        source = None
         try:
-            tmp_path = Uploads.save_temp_pdf(file)
-            if not tmp_path or os.path.getsize(tmp_path) == 0:
+            with record_stage("upload", api_stages):
+                source = Uploads.read_pdf(file)
+            if Uploads.is_empty(source):
                 raise HTTPException(status_code=400, detail="Archivo vacío.")
 
-            minimal = extract_from_pdf(
-                tmp_path,
+            # El executor pasa a ser dueño del upload: lo borra cuando la extraccion termina de verdad,
+            # aunque este request se corte antes (timeout, cliente desconectado).
+            source, owned = None, source
+            minimal, trace = await get_extraction_executor().extract_traced(
+                owned,
                 vendor_hint=vendor.value,
                 cfg_path="vendors.yaml",
                 use_ocr_hint=use_ocr,
+                release=Uploads.release,
             )
 
             if "cuit" in minimal:
                 minimal["cuit"] = clean_cuit(minimal["cuit"])
 
-            if fmt == OutFmt.json:
-                return JSONResponse(minimal)
-            if fmt == OutFmt.kv:
-                return PlainTextResponse(content=to_kv(minimal), media_type="text/plain; charset=utf-8")
-            if fmt == OutFmt.ini:
-                return PlainTextResponse(content=to_ini(minimal), media_type="text/ini; charset=utf-8")
-            return JSONResponse(minimal)
+            with record_stage("format", api_stages):
+                info = _debug_info(trace, api_stages, time.perf_counter() - started)
+                if fmt == OutFmt.kv:
+                    content = to_kv(minimal) + ("\n" + debug_to_kv(info) if debug else "")
+                    response: Response = PlainTextResponse(content=content, media_type="text/plain; charset=utf-8")
+                elif fmt == OutFmt.ini:
+                    content = to_ini(minimal) + ("\n" + debug_to_ini(info) if debug else "")
+                    response = PlainTextResponse(content=content, media_type="text/ini; charset=utf-8")
+                else:
+                    response = JSONResponse({**minimal, "debug": info} if debug else minimal)
+            info = _debug_info(trace, api_stages, time.perf_counter() - started)
+            response.headers["Server-Timing"] = _server_timing(info)
+            return response
         finally:
-            if tmp_path:
-                Uploads.cleanup_temp_file(tmp_path)
+            Uploads.release(source)
 
     @app.post("/extract-batch", response_model=None)
     async def extract_invoice_batch(
         files: Annotated[list[UploadFile], File(...)],
         vendor: Annotated[Vendor, Form(...)],
+        budget: Annotated[UploadBudget, Depends(upload_budget)],
         fmt: Annotated[OutFmt, Query(alias="format")] = OutFmt.json,
-        use_ocr: Annotated[Optional[bool], Form()] = None
+        use_ocr: Annotated[Optional[bool], Form()] = None,
+        accept: Annotated[Optional[str], Header()] = None,
+        debug: Annotated[bool, Query()] = False,
     ) -> Response:
         if not files:
             raise HTTPException(
                 status_code=400, detail="No se enviarn archivos.")
+        started = time.perf_counter()
+        api_stages: dict = {}
+        batch_stages: dict = {}  # stage seconds summed over every file, for Server-Timing
+        results: list = [None] * len(files)
+        queued = []  # (index, filename, source) of the PDFs to extract (bytes, or temp path if large)
+        handed = False  # once the executor has the sources, it releases them as each extraction really ends
 
-        temp_paths = []
-        results = []
+        def cleanup() -> None:
+            if handed:
+                return
+            for _, _, source in queued:
+                Uploads.release(source)
 
         try:
-            for file in files:
+            for index, file in enumerate(files):
                 filename = (file.filename or "").lower()
                 if not filename.endswith(".pdf"):
-                    results.append({
+                    results[index] = {
                         "file": filename,
                         "status": "error",
                         "error": "Solo se aceptan PDFs."
-                    })
+                    }
                     continue
-                tmp_path = Uploads.save_temp_pdf(file)
-                temp_paths.append(tmp_path)
+                with record_stage("upload", api_stages):
+                    queued.append((index, filename, Uploads.read_pdf(file, budget)))
+            # Shed the whole batch up front if its lane is already over budget (without a hint, the lane
+            # of the first PDF's probe); admitted items then wait their turn.
+            if queued:
+                executor = get_extraction_executor()
+                lane, _, _ = await executor.plan(queued[0][2], use_ocr)
+                executor.check_admission(lane)
+        except Exception:
+            cleanup()
+            raise
 
-                try:
-                    minimal = extract_from_pdf(
-                        tmp_path,
-                        vendor_hint=vendor.value,
-                        cfg_path="vendors.yaml",
-                        use_ocr_hint=use_ocr
-                    )
+        async def run_batch():
+            nonlocal handed
+            try:
+                handed = True
+                batch = get_extraction_executor().extract_batch(
+                    [source for _, _, source in queued],
+                    vendor_hint=vendor.value,
+                    cfg_path="vendors.yaml",
+                    use_ocr_hint=use_ocr,
+                    release=Uploads.release,
+                )
+                async for position, minimal, error, trace in batch:
+                    index, filename, _ = queued[position]
+                    item = _batch_item(filename, minimal, error)
+                    if trace is not None:
+                        for name, values in trace["stages"].items():
+                            batch_stages[name] = batch_stages.get(name, 0.0) + sum(values)
+                        if debug:
+                            item["debug"] = _debug_info(trace, {}, sum(sum(v) for v in trace["stages"].values()))
+                    yield index, item
+            finally:
+                cleanup()
 
-                    if "cuit" in minimal:
-                        minimal["cuit"] = clean_cuit(minimal["cuit"])
+        if fmt == OutFmt.ndjson or "application/x-ndjson" in (accept or ""):
+            item_fmt = fmt if fmt in (OutFmt.kv, OutFmt.ini) else OutFmt.json
 
-                    results.append({
-                        "file": filename,
-                        "status": "ok",
-                        "data": minimal
-                    })
+            async def lines():
+                started = time.perf_counter()
+                counts = {"ok": 0, "error": 0}
+                pending = [(index, item) for index, item in enumerate(results) if item is not None]
 
-                except Exception as ex:
-                    results.append({
-                        "file": filename,
-                        "status": "error",
-                        "error": str(ex)
-                    })
+                async def finished():
+                    for entry in pending:
+                        yield entry
+                    async for entry in run_batch():
+                        yield entry
 
+                async for index, item in finished():
+                    counts[item["status"]] += 1
+                    yield _ndjson_line({"index": index, **_format_item(item, item_fmt)})
+                yield _ndjson_line({
+                    "summary": True,
+                    "count": len(results),
+                    **counts,
+                    "elapsed_ms": round((time.perf_counter() - started) * 1000),
+                })
+
+            return StreamingResponse(
+                lines(), media_type="application/x-ndjson", background=BackgroundTask(cleanup))
+
+        async for index, item in run_batch():
+            results[index] = item
+
+        with record_stage("format", api_stages):
+            if fmt == OutFmt.kv:
+                response: Response = PlainTextResponse(
+                    content=batch_to_kv(results), media_type="text/plain; charset=utf-8")
+            elif fmt == OutFmt.ini:
+                response = PlainTextResponse(content=batch_to_ini(results), media_type="text/ini; charset=utf-8")
+            else:
+                response = JSONResponse({"count": len(results), "results": results})
+        totals = _debug_info({"stages": {name: [sec] for name, sec in batch_stages.items()}}, api_stages,
+                             time.perf_counter() - started)
+        response.headers["Server-Timing"] = _server_timing(totals)
+        return response
+
+    @app.post("/extract-archive", response_model=None)
+    async def extract_invoice_archive(
+        file: Annotated[UploadFile, File(...)],
+        vendor: Annotated[Vendor, Form(...)],
+        fmt: Annotated[OutFmt, Query(alias="format")] = OutFmt.json,
+        use_ocr: Annotated[Optional[bool], Form()] = None,
+        as_job: Annotated[bool, Query(alias="job")] = False,
+    ) -> Response:
+        kind = Archives.kind(file.file)
+        if kind is None:
+            raise HTTPException(status_code=400, detail="El archivo debe ser un ZIP o TAR (.tar, .tar.gz, .tgz).")
+
+        if as_job:
+            count = 0
+
+            def entries():
+                nonlocal count
+                for _, name, source, error in Archives.iter_entries(file.file, kind):
+                    count += 1
+                    yield name, source, error
+
+            job_id = await run_in_threadpool(
+                get_job_queue().enqueue, entries(),
+                vendor_hint=vendor.value, use_ocr_hint=use_ocr, cfg_path="vendors.yaml")
+            return JSONResponse({"job_id": job_id, "status": "queued", "count": count}, status_code=202)
+
+        # No PDF read yet to probe: without a hint the archive is admitted against the reader's default lane.
+        get_extraction_executor().check_admission(choose_lane(use_ocr))
+        item_fmt = fmt if fmt in (OutFmt.kv, OutFmt.ini) else OutFmt.json
+        # The response body outlives this handler, and FastAPI closes the upload when it returns: stream from a copy
+        # the response owns (closed when the body ends, or by the background task if it never starts).
+        archive = await run_in_threadpool(Archives.spool, file.file)
+
+        async def lines():
+            started = time.perf_counter()
+            counts = {"ok": 0, "error": 0}
+            skipped = []  # non-PDF / unreadable entries, reported as soon as the next line goes out
+
+            async def pdfs():
+                async for index, name, source, error in Archives.stream_entries(archive, kind):
+                    if error is not None or source is None:
+                        skipped.append((index, {"file": name, "status": "error", "error": error}))
+                        continue
+                    yield (index, name), source
+
+            def flush():
+                while skipped:
+                    index, item = skipped.pop(0)
+                    counts["error"] += 1
+                    yield _ndjson_line({"index": index, **item})
+
+            try:
+                # Each PDF pulled from the archive belongs to the executor, which releases it when its extraction ends.
+                batch = get_extraction_executor().extract_stream(
+                    pdfs(), vendor_hint=vendor.value, cfg_path="vendors.yaml", use_ocr_hint=use_ocr,
+                    release=Uploads.release)
+                async for (index, name), minimal, error, _ in batch:
+                    for line in flush():
+                        yield line
+                    item = _batch_item(name, minimal, error)
+                    counts[item["status"]] += 1
+                    yield _ndjson_line({"index": index, **_format_item(item, item_fmt)})
+                for line in flush():
+                    yield line
+                yield _ndjson_line({
+                    "summary": True,
+                    "count": counts["ok"] + counts["error"],
+                    **counts,
+                    "elapsed_ms": round((time.perf_counter() - started) * 1000),
+                })
+            finally:
+                archive.close()
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson", background=BackgroundTask(archive.close))
+
+    @app.post("/jobs", status_code=202)
+    async def create_job(
+        files: Annotated[list[UploadFile], File(...)],
+        vendor: Annotated[Vendor, Form(...)],
+        budget: Annotated[UploadBudget, Depends(upload_budget)],
+        use_ocr: Annotated[Optional[bool], Form()] = None,
+    ) -> dict:
+        if not files:
+            raise HTTPException(
+                status_code=400, detail="No se enviarn archivos.")
+
+        entries = []
+        try:
+            for file in files:
+                filename = (file.filename or "").lower()
+                if not filename.endswith(".pdf"):
+                    entries.append((filename, None, "Solo se aceptan PDFs."))
+                    continue
+                entries.append((filename, Uploads.read_pdf(file, budget), None))
+            job_id = await run_in_threadpool(
+                get_job_queue().enqueue,
+                entries, vendor_hint=vendor.value, use_ocr_hint=use_ocr, cfg_path="vendors.yaml")
         finally:
-            for path in temp_paths:
-                if path:
-                    Uploads.cleanup_temp_file(path)
+            # enqueue moves/writes the uploads into the spool dir; anything left here was not queued
+            for _, source, _ in entries:
+                Uploads.release(source)
+
+        return {"job_id": job_id, "status": "queued", "count": len(entries)}
+
+    @app.get("/jobs/{job_id}")
+    async def get_job(job_id: str) -> dict:
+        job = get_job_queue().get_job(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job inexistente.")
+        job["results"] = [_clean_item(item) for item in job["results"]]
+        return job
+
+    @app.get("/jobs/{job_id}/results")
+    async def get_job_results(job_id: str, follow: bool = False) -> StreamingResponse:
+        queue = get_job_queue()
+        if queue.get_job(job_id) is None:
+            raise HTTPException(status_code=404, detail="Job inexistente.")
+
+        def lines():
+            for item in queue.iter_results(job_id, follow=follow):
+                yield _ndjson_line(_clean_item(item))
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
 
-        return JSONResponse({"count": len(results), "results": results})
     return app
 
 
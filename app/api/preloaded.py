@@ -0,0 +1,13 @@
+"""Entry point for `gunicorn --preload` (Dockerfile prod): the app plus the fork-safe warm-up.
+
+Importing it runs `preload()` once in the gunicorn master, so the workers inherit the loaded stack.
+`app.api.main` itself stays cheap to import (tests, scripts, uvicorn); there each worker warms up in
+its lifespan instead.
+"""
+from app.api.main import app
+from app.services.warmup import WARMUP_ENABLED, preload
+
+if WARMUP_ENABLED:
+    preload()
+
+__all__ = ["app"]
@@ -2,8 +2,39 @@
 import os
 import tempfile
 import time
+from typing import Optional, Union
 from fastapi import UploadFile, HTTPException
 
+# PDFs de hasta este tamaño quedan en memoria (bytes) y nunca tocan disco; los mayores van a un temporal.
+UPLOAD_MEMORY_MAX_MB = float(os.environ.get("UPLOAD_MEMORY_MAX_MB", "4"))
+_UPLOAD_MEMORY_MAX_BYTES = int(UPLOAD_MEMORY_MAX_MB * 1024 * 1024)
+# Tope de memoria por request sumando todos sus archivos: agotado, el resto de los PDFs va a temporales.
+UPLOAD_REQUEST_MEMORY_MB = float(os.environ.get("UPLOAD_REQUEST_MEMORY_MB", "16"))
+_UPLOAD_REQUEST_MEMORY_BYTES = int(UPLOAD_REQUEST_MEMORY_MB * 1024 * 1024)
+
+
+class UploadBudget:
+    """
+    Bytes de memoria que le quedan a un request para mantener sus PDFs como bytes. Se cobra el tamaño
+    real de cada archivo que se queda en memoria; los que no entran van a un temporal.
+    """
+
+    def __init__(self, total: int = _UPLOAD_REQUEST_MEMORY_BYTES):
+        self.remaining = total
+
+    def take(self, size: int) -> bool:
+        """Reserva `size` bytes si entran enteros en lo que queda; si no, no reserva nada."""
+        if size > self.remaining:
+            return False
+        self.remaining -= size
+        return True
+
+
+def upload_budget() -> UploadBudget:
+    """Dependencia de FastAPI: un presupuesto nuevo por request (UPLOAD_REQUEST_MEMORY_MB)."""
+    return UploadBudget()
+
+
 class Uploads:
     """Servicio para manejar archivos temporales subidos."""
 
@@ -32,6 +63,43 @@ class Uploads:
                 status_code=500, detail=f"Error guardando archivo temporal: {str(e)}"
             )
 
+    @staticmethod
+    def _upload_size(file: UploadFile) -> int:
+        size = getattr(file, "size", None)
+        if size is not None:
+            return size
+        file.file.seek(0, os.SEEK_END)
+        size = file.file.tell()
+        file.file.seek(0)
+        return size
+
+    @staticmethod
+    def read_pdf(file: UploadFile, budget: Optional[UploadBudget] = None) -> Union[bytes, str]:
+        """
+        Valida que el archivo sea PDF y devuelve sus bytes si no supera UPLOAD_MEMORY_MAX_MB y entra en
+        el presupuesto del request (`budget`, si se pasa); si no, lo guarda como archivo temporal y
+        devuelve la ruta (liberar con `release`).
+        """
+        if not file.filename.lower().endswith(".pdf"):
+            raise HTTPException(status_code=400, detail="El archivo debe ser un PDF")
+        size = Uploads._upload_size(file)
+        if size > _UPLOAD_MEMORY_MAX_BYTES or (budget is not None and not budget.take(size)):
+            return Uploads.save_temp_pdf(file)
+        file.file.seek(0)
+        return file.file.read()
+
+    @staticmethod
+    def is_empty(source: Union[bytes, str, None]) -> bool:
+        if not source:
+            return True
+        return isinstance(source, str) and os.path.getsize(source) == 0
+
+    @staticmethod
+    def release(source: Union[bytes, str, None]) -> None:
+        """Borra el temporal si el upload fue a disco; los uploads en memoria no requieren limpieza."""
+        if isinstance(source, str):
+            Uploads.cleanup_temp_file(source)
+
     @staticmethod
     def cleanup_temp_file(path: str) -> None:
         """
@@ -109,3 +109,71 @@ def to_ini(minimal: Dict[str, Any]) -> str:
             out.append(f"{k}={_num(v)}")
     out.append("")
     return "\n".join(out)
+
+
+def _debug_items(debug: Dict[str, Any]) -> List[str]:
+    items: List[str] = []
+    for stage, ms in (debug.get("stages_ms") or {}).items():
+        items.append(f"stage_{stage}_ms={_num(ms)}")
+    pages = debug.get("pages") or {}
+    items.append(f"pages_text={pages.get('text', 0)}")
+    items.append(f"pages_ocr={pages.get('ocr', 0)}")
+    items.append("dpi=" + ",".join(str(d) for d in debug.get("dpi") or []))
+    items.append(f"ocr_conf={'' if debug.get('ocr_conf') is None else _num(debug['ocr_conf'])}")
+    cache = debug.get("cache") or {}
+    items.append(f"cache_result={'1' if cache.get('result') else '0'}")
+    items.append(f"cache_line={'1' if cache.get('line') else '0'}")
+    items.append(f"vendor={_clean(debug.get('vendor') or '')}")
+    items.append(f"total_ms={_num(debug.get('total_ms', 0))}")
+    return items
+
+
+def debug_to_kv(debug: Dict[str, Any]) -> str:
+    """
+    Bloque `debug_*` (tiempos por etapa, paginas, DPI, confianza OCR, cache) para agregar a `to_kv`.
+    """
+    return "\n".join("debug_" + item for item in _debug_items(debug))
+
+
+def debug_to_ini(debug: Dict[str, Any]) -> str:
+    """
+    Seccion `[debug]` equivalente a `debug_to_kv`.
+    """
+    return "\n".join(["[debug]"] + _debug_items(debug) + [""])
+
+
+def batch_to_kv(results: List[Dict[str, Any]]) -> str:
+    """
+    Resultado de /extract-batch en key=value: cada archivo con prefijo `archivo_<n>_` (1-based, orden de entrada).
+    """
+    lines: List[str] = [f"archivo_count={len(results)}"]
+    for i, item in enumerate(results, start=1):
+        prefix = f"archivo_{i}_"
+        lines.append(f"{prefix}file={_clean(item.get('file', ''))}")
+        if item.get("status") != "ok":
+            lines.append(f"{prefix}status=error")
+            lines.append(f"{prefix}error={_clean(item.get('error', ''))}")
+            continue
+        lines += [prefix + line for line in to_kv(item.get("data") or {}).split("\n")]
+        if item.get("debug"):
+            lines += [prefix + line for line in debug_to_kv(item["debug"]).split("\n")]
+    return "\n".join(lines)
+
+
+def batch_to_ini(results: List[Dict[str, Any]]) -> str:
+    """
+    Resultado de /extract-batch en INI: seccion `[archivo_<n>]` y las de `to_ini` como `[archivo_<n>.<seccion>]`.
+    """
+    out: List[str] = ["[batch]", f"count={len(results)}", ""]
+    for i, item in enumerate(results, start=1):
+        out += [f"[archivo_{i}]", f"file={_clean(item.get('file', ''))}"]
+        if item.get("status") != "ok":
+            out += ["status=error", f"error={_clean(item.get('error', ''))}", ""]
+            continue
+        out += ["status=ok", ""]
+        block = to_ini(item.get("data") or {})
+        if item.get("debug"):
+            block += "\n" + debug_to_ini(item["debug"])
+        for line in block.split("\n"):
+            out.append(f"[archivo_{i}.{line[1:]}" if line.startswith("[") else line)
+    return "\n".join(out)
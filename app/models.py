@@ -10,3 +10,4 @@ class OutFmt(str, Enum):
     json = "json"        # JSON minimal normalizado
     kv = "kv"            # VB6-friendly key=value (plano)
     ini = "ini"          # INI por secciones
+    ndjson = "ndjson"    # Batch: una linea JSON por archivo a medida que termina + resumen
@@ -1,8 +1,36 @@
+"""Folder batch extraction.
+
+`process_folder` returns every result at the end (small folders, library use). For large runs use
+the streaming mode, which appends each result to a JSONL file as soon as it finishes and records it in
+a checkpoint manifest, so a rerun after a crash only processes what is missing:
+
+    python -m app.services.batch_processor invoices/ --output results.jsonl [--chunksize 4] [--workers 7]
+
+For a folder that keeps growing, the incremental mode keeps a SQLite manifest (`folder_manifest`) and
+only extracts new, changed or out-of-date files; `--watch` repeats it by polling:
+
+    python -m app.services.batch_processor /shared/invoices --recursive --incremental [--watch]
+"""
 import os
 import json
-from typing import List, Dict, Optional
+import sys
+import time
+import argparse
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 from multiprocessing import Pool, cpu_count
 from app.services.extractor import extract_from_pdf
+from app.services.folder_manifest import FOLDER_MANIFEST_PATH, FolderManifest, extraction_version
+from app.services.pdf_reader import pdf_page_count
+from app.services.result_cache import file_sha256
+
+# Files handed to each pool worker per round-trip in streaming mode (higher = less IPC, coarser progress).
+BATCH_CHUNKSIZE = max(1, int(os.environ.get("BATCH_CHUNKSIZE", "4")))
+# Seconds between progress lines (and checkpoint fsyncs) in streaming mode.
+BATCH_PROGRESS_SECONDS = float(os.environ.get("BATCH_PROGRESS_SECONDS", "2"))
+# Watch mode: seconds between folder scans, and minimum age of a file's mtime before it is picked up
+# (a PDF still being copied into the folder keeps changing its mtime).
+FOLDER_WATCH_INTERVAL_SECONDS = float(os.environ.get("FOLDER_WATCH_INTERVAL_SECONDS", "30"))
+FOLDER_WATCH_SETTLE_SECONDS = float(os.environ.get("FOLDER_WATCH_SETTLE_SECONDS", "10"))
 
 
 def _process_single(args):
@@ -26,6 +54,72 @@ def _process_single(args):
             "error": str(e)
         }
 
+
+def _process_entry(args) -> Tuple[str, int, Dict]:
+    """(path, pages, result) for the streaming mode: results come back out of order."""
+    pdf_path = args[0]
+    try:
+        pages = pdf_page_count(pdf_path)
+    except Exception:
+        pages = 0
+    return pdf_path, pages, _process_single(args)
+
+
+def _process_tracked(args) -> Tuple[str, Optional[Tuple[int, int, str]], int, Dict]:
+    """Incremental mode: also returns (size, mtime_ns, sha256) as they were when the file was read."""
+    pdf_path = args[0]
+    try:
+        st = os.stat(pdf_path)
+        identity = (st.st_size, st.st_mtime_ns, file_sha256(pdf_path))
+    except OSError as e:
+        return pdf_path, None, 0, {"file": os.path.basename(pdf_path), "status": "error", "error": str(e)}
+    _, pages, result = _process_entry(args)
+    return pdf_path, identity, pages, result
+
+
+def _list_pdfs(folder_path: str, recursive: bool = False) -> List[str]:
+    """PDFs in the folder (and its subfolders, skipping hidden ones, when `recursive`), sorted by path."""
+    if recursive:
+        files = []
+        for root, dirs, names in os.walk(folder_path):
+            dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+            files.extend(os.path.join(root, f) for f in sorted(names) if f.lower().endswith(".pdf"))
+    else:
+        files = [
+            os.path.join(folder_path, f)
+            for f in sorted(os.listdir(folder_path))
+            if f.lower().endswith(".pdf") and os.path.isfile(os.path.join(folder_path, f))
+        ]
+    return files
+
+
+def _settled(files: List[str], min_age_seconds: float) -> List[str]:
+    """Files whose mtime is at least `min_age_seconds` old (the rest may still be being copied)."""
+    if min_age_seconds <= 0:
+        return files
+    cutoff = time.time() - min_age_seconds
+    settled = []
+    for f in files:
+        try:
+            if os.path.getmtime(f) <= cutoff:
+                settled.append(f)
+        except OSError:
+            continue
+    return settled
+
+
+def _imap(fn: Callable, args_list: List[tuple], parallel: bool, max_workers: Optional[int], chunksize: int) -> Iterator:
+    if not args_list:
+        return
+    if not parallel:
+        for args in args_list:
+            yield fn(args)
+        return
+    workers = max_workers or max(1, cpu_count() - 1)
+    with Pool(min(workers, len(args_list))) as pool:
+        yield from pool.imap_unordered(fn, args_list, chunksize=max(1, chunksize))
+
+
 def process_folder(
     folder_path:str,
     vendor_hint: Optional[str] = None,
@@ -39,20 +133,392 @@ def process_folder(
         for f in os.listdir(folder_path)
         if f.lower().endswith(".pdf")
     ]
-    
+
     if not files:
         return []
-    
+
     args_list = [(f, vendor_hint, cfg_path, use_ocr_hint) for f in files]
-    
+
     if parallel:
         workers = max_workers or max(1, cpu_count() - 1)
         with Pool(workers) as pool:
             results = pool.map(_process_single, args_list)
         return results
-    
+
     return [_process_single(args) for args in args_list]
 
+
+def process_folder_stream(
+    files: List[str],
+    vendor_hint: Optional[str] = None,
+    cfg_path: str = "vendors.yaml",
+    use_ocr_hint: Optional[bool] = None,
+    parallel: bool = True,
+    max_workers: Optional[int] = None,
+    chunksize: int = BATCH_CHUNKSIZE,
+) -> Iterator[Tuple[str, int, Dict]]:
+    """Yields (path, pages, result) in completion order (`imap_unordered`); closing the iterator stops the pool."""
+    args_list = [(f, vendor_hint, cfg_path, use_ocr_hint) for f in files]
+    yield from _imap(_process_entry, args_list, parallel, max_workers, chunksize)
+
+
+class BatchCheckpoint:
+    """Append-only manifest (JSONL) of the files already written to the output.
+
+    A file counts as done only while its size and mtime match the recorded ones, so a PDF replaced
+    between runs is processed again. A line cut by a crash is ignored.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._done: Dict[str, Tuple[int, int]] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        self._done[entry["path"]] = (entry["size"], entry["mtime_ns"])
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        self._file = open(path, "a", encoding="utf-8")
+
+    @staticmethod
+    def _stat(path: str) -> Tuple[int, int]:
+        st = os.stat(path)
+        return st.st_size, st.st_mtime_ns
+
+    def is_done(self, path: str) -> bool:
+        recorded = self._done.get(os.path.abspath(path))
+        if recorded is None:
+            return False
+        try:
+            return recorded == self._stat(path)
+        except OSError:
+            return False
+
+    def mark_done(self, path: str) -> None:
+        key = os.path.abspath(path)
+        try:
+            size, mtime_ns = self._stat(path)
+        except OSError:
+            return
+        self._done[key] = (size, mtime_ns)
+        self._file.write(json.dumps({"path": key, "size": size, "mtime_ns": mtime_ns}, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def sync(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+
+
+class BatchProgress:
+    """Counters and throughput of a streaming run."""
+
+    def __init__(self, total: int, skipped: int = 0) -> None:
+        self.total = total
+        self.skipped = skipped
+        self.done = 0
+        self.errors = 0
+        self.pages = 0
+        self.started = time.monotonic()
+
+    def update(self, pages: int, result: Dict) -> None:
+        self.done += 1
+        self.pages += pages
+        if result.get("status") != "ok":
+            self.errors += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return {
+            "total": self.total,
+            "done": self.done,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "pages": self.pages,
+            "elapsed_s": round(elapsed, 1),
+            "files_per_s": round(self.done / elapsed, 2),
+            "pages_per_s": round(self.pages / elapsed, 2),
+        }
+
+    def format(self) -> str:
+        p = self.to_dict()
+        return (
+            f"{p['done']}/{p['total']} files ({p['errors']} errors, {p['skipped']} skipped) "
+            f"{p['files_per_s']} files/s {p['pages_per_s']} pages/s {p['elapsed_s']}s"
+        )
+
+
+def _trim_partial_line(path: str) -> None:
+    """Drops a trailing line without newline (result cut by a crash) before appending to a JSONL file."""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        keep = size
+        while keep > 0:
+            step = min(65536, keep)
+            f.seek(keep - step)
+            block = f.read(step)
+            newline = block.rfind(b"\n")
+            if newline >= 0:
+                keep = keep - step + newline + 1
+                break
+            keep -= step
+        f.truncate(keep)
+
+
+def process_folder_to_jsonl(
+    folder_path: str,
+    output_jsonl: str,
+    vendor_hint: Optional[str] = None,
+    cfg_path: str = "vendors.yaml",
+    use_ocr_hint: Optional[bool] = None,
+    parallel: bool = True,
+    max_workers: Optional[int] = None,
+    chunksize: int = BATCH_CHUNKSIZE,
+    checkpoint_path: Optional[str] = None,
+    resume: bool = True,
+    progress: Optional[Callable[[BatchProgress], None]] = None,
+    progress_seconds: float = BATCH_PROGRESS_SECONDS,
+    recursive: bool = False,
+) -> Dict[str, Any]:
+    """Streaming run: appends one result per line to `output_jsonl` as it finishes and checkpoints it.
+
+    With `resume` the files recorded in the checkpoint (default `<output>.checkpoint`) are skipped;
+    without it, output and checkpoint start empty. A crash between writing a result and its checkpoint
+    line makes that one file run again (at-least-once). Returns the final progress counters.
+    """
+    checkpoint_path = checkpoint_path or output_jsonl + ".checkpoint"
+    if not resume:
+        for path in (output_jsonl, checkpoint_path):
+            if os.path.exists(path):
+                os.remove(path)
+    _trim_partial_line(output_jsonl)
+
+    checkpoint = BatchCheckpoint(checkpoint_path)
+    files = _list_pdfs(folder_path, recursive)
+    pending = [f for f in files if not checkpoint.is_done(f)]
+    state = BatchProgress(total=len(pending), skipped=len(files) - len(pending))
+    last_report = time.monotonic()
+    try:
+        with open(output_jsonl, "a", encoding="utf-8") as out:
+            for pdf_path, pages, result in process_folder_stream(
+                pending, vendor_hint, cfg_path, use_ocr_hint, parallel, max_workers, chunksize
+            ):
+                line = dict(result, path=os.path.relpath(pdf_path, folder_path), pages=pages)
+                out.write(json.dumps(line, ensure_ascii=False) + "\n")
+                out.flush()
+                checkpoint.mark_done(pdf_path)
+                state.update(pages, result)
+                now = time.monotonic()
+                if now - last_report >= progress_seconds:
+                    last_report = now
+                    checkpoint.sync()
+                    if progress:
+                        progress(state)
+            os.fsync(out.fileno())
+    finally:
+        checkpoint.close()
+    if progress:
+        progress(state)
+    return state.to_dict()
+
+
+def process_folder_incremental(
+    folder_path: str,
+    manifest: Optional[FolderManifest] = None,
+    vendor_hint: Optional[str] = None,
+    cfg_path: str = "vendors.yaml",
+    use_ocr_hint: Optional[bool] = None,
+    parallel: bool = True,
+    max_workers: Optional[int] = None,
+    chunksize: int = BATCH_CHUNKSIZE,
+    recursive: bool = False,
+    retry_errors: bool = False,
+    output_jsonl: Optional[str] = None,
+    min_age_seconds: float = 0,
+    progress: Optional[Callable[[BatchProgress], None]] = None,
+    progress_seconds: float = BATCH_PROGRESS_SECONDS,
+) -> Dict[str, Any]:
+    """Extracts only new, changed or out-of-date files and stores each result in the manifest.
+
+    Files that errored are retried only when their content changes, or with `retry_errors`; files
+    modified less than `min_age_seconds` ago are left for a later run (`waiting`). Results of
+    this run are also appended to `output_jsonl` when given; `FolderManifest.iter_results` has the
+    whole folder.
+    """
+    own_manifest = manifest is None
+    manifest = manifest or FolderManifest()
+    try:
+        version = extraction_version(cfg_path, vendor_hint, use_ocr_hint)
+        plan = manifest.plan(
+            _list_pdfs(folder_path, recursive), folder_path, version, retry_errors=retry_errors, recursive=recursive
+        )
+        pending = _settled(plan["process"], min_age_seconds)
+        state = BatchProgress(total=len(pending), skipped=plan["unchanged"] + plan["touched"])
+        args_list = [(f, vendor_hint, cfg_path, use_ocr_hint) for f in pending]
+        last_report = time.monotonic()
+        out = open(output_jsonl, "a", encoding="utf-8") if output_jsonl else None
+        try:
+            for pdf_path, identity, pages, result in _imap(
+                _process_tracked, args_list, parallel, max_workers, chunksize
+            ):
+                if identity is not None:
+                    size, mtime_ns, sha256 = identity
+                    manifest.record(pdf_path, size, mtime_ns, sha256, version, pages, result)
+                if out is not None:
+                    line = dict(result, path=os.path.relpath(pdf_path, folder_path), pages=pages)
+                    out.write(json.dumps(line, ensure_ascii=False) + "\n")
+                    out.flush()
+                state.update(pages, result)
+                now = time.monotonic()
+                if progress and now - last_report >= progress_seconds:
+                    last_report = now
+                    progress(state)
+        finally:
+            if out is not None:
+                out.close()
+    finally:
+        if own_manifest:
+            manifest.close()
+    if progress and state.total:
+        progress(state)
+    return dict(
+        state.to_dict(),
+        unchanged=plan["unchanged"],
+        touched=plan["touched"],
+        removed=plan["removed"],
+        waiting=len(plan["process"]) - len(pending),
+    )
+
+
+def watch_folder(
+    folder_path: str,
+    manifest: Optional[FolderManifest] = None,
+    interval_seconds: float = FOLDER_WATCH_INTERVAL_SECONDS,
+    settle_seconds: float = FOLDER_WATCH_SETTLE_SECONDS,
+    max_passes: Optional[int] = None,
+    on_pass: Optional[Callable[[Dict[str, Any]], None]] = None,
+    **kwargs: Any,
+) -> None:
+    """Polls the folder and runs `process_folder_incremental` on every pass, until interrupted.
+
+    A scan only stats the files (hashing only those whose size or mtime moved), so it stays cheap on
+    large folders. Files younger than `settle_seconds` wait for the next pass.
+    """
+    own_manifest = manifest is None
+    manifest = manifest or FolderManifest()
+    passes = 0
+    try:
+        while max_passes is None or passes < max_passes:
+            summary = process_folder_incremental(
+                folder_path, manifest, min_age_seconds=settle_seconds, **kwargs
+            )
+            passes += 1
+            if on_pass:
+                on_pass(summary)
+            if max_passes is None or passes < max_passes:
+                time.sleep(interval_seconds)
+    finally:
+        if own_manifest:
+            manifest.close()
+
+
 def save_batch_output(results: List[dict], output_json="results.json"):
     with open(output_json, "w", encoding="utf-8") as f:
-        json.dump(results, f, indent=2, ensure_ascii=False)
\ No newline at end of file
+        json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Extract every PDF in a folder to a JSONL file, resumable.")
+    parser.add_argument("folder")
+    parser.add_argument("--output", default=None,
+                        help="JSONL output, appended as files finish (default: results.jsonl; none with --incremental).")
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint manifest (default: <output>.checkpoint).")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start a new output.")
+    parser.add_argument("--cfg", default="vendors.yaml")
+    parser.add_argument("--vendor", default=None)
+    parser.add_argument("--ocr", choices=("auto", "yes", "no"), default="auto")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunksize", type=int, default=BATCH_CHUNKSIZE)
+    parser.add_argument("--serial", action="store_true", help="Run in this process, without a pool.")
+    parser.add_argument("--recursive", action="store_true", help="Include PDFs in subfolders.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only extract new, changed or out-of-date files, tracked in the SQLite manifest.")
+    parser.add_argument("--manifest", default=FOLDER_MANIFEST_PATH, help="Manifest path for --incremental.")
+    parser.add_argument("--retry-errors", action="store_true", help="With --incremental, retry files that failed.")
+    parser.add_argument("--watch", action="store_true", help="With --incremental, keep polling the folder.")
+    parser.add_argument("--interval", type=float, default=FOLDER_WATCH_INTERVAL_SECONDS)
+    parser.add_argument("--export", default=None,
+                        help="With --incremental, write every stored result of the folder to this JSONL file.")
+    args = parser.parse_args(argv)
+    use_ocr_hint = {"auto": None, "yes": True, "no": False}[args.ocr]
+    report = lambda state: print(state.format(), file=sys.stderr)
+
+    if args.incremental or args.watch:
+        manifest = FolderManifest(args.manifest)
+        options = dict(
+            vendor_hint=args.vendor,
+            cfg_path=args.cfg,
+            use_ocr_hint=use_ocr_hint,
+            parallel=not args.serial,
+            max_workers=args.workers,
+            chunksize=args.chunksize,
+            recursive=args.recursive,
+            retry_errors=args.retry_errors,
+            output_jsonl=args.output,
+            progress=report,
+        )
+        try:
+            if args.watch:
+                watch_folder(
+                    args.folder,
+                    manifest,
+                    interval_seconds=args.interval,
+                    on_pass=lambda summary: summary["total"] and print(json.dumps(summary), file=sys.stderr),
+                    **options,
+                )
+            else:
+                print(json.dumps(process_folder_incremental(args.folder, manifest, **options)), file=sys.stderr)
+        except KeyboardInterrupt:
+            pass
+        try:
+            if args.export:
+                with open(args.export, "w", encoding="utf-8") as out:
+                    for result in manifest.iter_results(args.folder):
+                        out.write(json.dumps(result, ensure_ascii=False) + "\n")
+        finally:
+            manifest.close()
+        return 0
+
+    summary = process_folder_to_jsonl(
+        args.folder,
+        args.output or "results.jsonl",
+        vendor_hint=args.vendor,
+        cfg_path=args.cfg,
+        use_ocr_hint=use_ocr_hint,
+        parallel=not args.serial,
+        max_workers=args.workers,
+        chunksize=args.chunksize,
+        checkpoint_path=args.checkpoint,
+        resume=not args.restart,
+        progress=report,
+        recursive=args.recursive,
+    )
+    print(json.dumps(summary), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
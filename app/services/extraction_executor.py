@@ -0,0 +1,714 @@
+"""Runs the blocking `extract_from_pdf` off the event loop, on two lanes sized per API worker.
+
+OCR-bound extractions go to a process pool (tesseract + Python-side line building hold the GIL long
+enough to starve the loop), text-layer extractions to a thread pool. Each lane has its own
+concurrency limit; requests above it wait on the lane and are reported as queue depth in `stats()`.
+Each lane's queue is bounded by a page budget (admission control): a request that does not fit is
+rejected with LaneFull right away, so scanned batches cannot starve cheap text-layer PDFs. Requests
+without an OCR hint are routed by a quick probe of the PDF's text layer (`plan`).
+"""
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+import asyncio
+import copy
+import functools
+import math
+import multiprocessing
+import os
+import threading
+import time
+
+from app.services.extractor import extract_from_pdf
+from app.services.metrics import METRICS, observe_error, observe_trace, traced_call
+from app.services.pdf_reader import (
+    OCR_MAX_CONCURRENCY,
+    PdfLineReader,
+    NeedsOcr,
+    PdfSource,
+    pdf_page_count,
+    probe_text_layer,
+    set_ocr_concurrency,
+)
+from app.services.result_cache import source_sha256
+
+_CPUS = os.cpu_count() or 1
+
+# Process pool for the OCR lane; 0 runs OCR on the thread pool instead (e.g. local dev on Windows).
+EXTRACT_OCR_PROCESSES = max(0, int(os.environ.get("EXTRACT_OCR_PROCESSES", str(max(1, _CPUS // 2)))))
+EXTRACT_TEXT_THREADS = max(1, int(os.environ.get("EXTRACT_TEXT_THREADS", "4")))
+EXTRACT_OCR_CONCURRENCY = max(
+    1, int(os.environ.get("EXTRACT_OCR_CONCURRENCY", str(EXTRACT_OCR_PROCESSES or EXTRACT_TEXT_THREADS)))
+)
+EXTRACT_TEXT_CONCURRENCY = max(1, int(os.environ.get("EXTRACT_TEXT_CONCURRENCY", str(EXTRACT_TEXT_THREADS))))
+# Per /extract-batch request: files extracted at once, and seconds allowed per file (0 = no limit).
+BATCH_MAX_PARALLEL = max(1, int(os.environ.get("BATCH_MAX_PARALLEL", "4")))
+BATCH_FILE_TIMEOUT = float(os.environ.get("BATCH_FILE_TIMEOUT", "90"))
+# "spawn" keeps the children clean of the API worker's threads and event loop.
+EXTRACT_PROCESS_START_METHOD = os.environ.get("EXTRACT_PROCESS_START_METHOD", "spawn")
+# Admission control: pages allowed to wait per lane (a PDF costs its page count). Past that, new
+# extractions are shed with LaneFull (HTTP 503 + Retry-After) instead of queueing until the client
+# gives up. An empty queue always admits, however large the PDF.
+EXTRACT_OCR_QUEUE_PAGES = max(1, int(os.environ.get("EXTRACT_OCR_QUEUE_PAGES", "60")))
+EXTRACT_TEXT_QUEUE_PAGES = max(1, int(os.environ.get("EXTRACT_TEXT_QUEUE_PAGES", "500")))
+
+LANES = ("ocr", "text")
+# Starting seconds-per-page estimates for Retry-After, refined with an EWMA of finished extractions.
+_INITIAL_SECONDS_PER_PAGE = {"ocr": 2.0, "text": 0.02}
+
+
+class LaneFull(Exception):
+    """The lane's queue is over its page budget; the caller should retry after `retry_after` seconds."""
+
+    def __init__(self, lane: str, retry_after: int):
+        super().__init__(f"{lane} lane queue is full")
+        self.lane = lane
+        self.retry_after = retry_after
+
+
+def choose_lane(
+    use_ocr_hint: Optional[bool], reader: Optional[PdfLineReader] = None, text_layer_usable: bool = False
+) -> str:
+    """OCR lane unless the request (or the reader default) asks for the text layer only.
+
+    Without a hint, a PDF whose pages all have a usable text layer goes to the text lane.
+    """
+    if use_ocr_hint is None and text_layer_usable:
+        return "text"
+    prefer_ocr = (reader or PdfLineReader()).prefer_ocr if use_ocr_hint is None else bool(use_ocr_hint)
+    return "ocr" if prefer_ocr else "text"
+
+
+class _Flight:
+    """One extraction shared by identical requests: its task, lane and how many callers still await it."""
+
+    def __init__(self, lane: str) -> None:
+        self.lane = lane
+        self.task: Optional["asyncio.Future[Tuple[Dict[str, Any], Dict[str, Any]]]"] = None
+        self.waiters = 0
+        self.started = False
+
+    def mark_started(self) -> None:
+        self.started = True
+
+
+class ExtractionExecutor:
+    """Process pool (OCR lane) + thread pool (text lane), created lazily, with per-lane limits."""
+
+    def __init__(
+        self,
+        ocr_processes: int = EXTRACT_OCR_PROCESSES,
+        text_threads: int = EXTRACT_TEXT_THREADS,
+        ocr_concurrency: int = EXTRACT_OCR_CONCURRENCY,
+        text_concurrency: int = EXTRACT_TEXT_CONCURRENCY,
+        ocr_queue_pages: int = EXTRACT_OCR_QUEUE_PAGES,
+        text_queue_pages: int = EXTRACT_TEXT_QUEUE_PAGES,
+    ):
+        self.ocr_processes = ocr_processes
+        self.text_threads = text_threads
+        self.limits = {"ocr": ocr_concurrency, "text": text_concurrency}
+        self.queue_limits = {"ocr": ocr_queue_pages, "text": text_queue_pages}
+        self._queued_pages = {lane: 0.0 for lane in LANES}
+        self._seconds_per_page = dict(_INITIAL_SECONDS_PER_PAGE)
+        self._lock = threading.Lock()
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._slots: Dict[str, asyncio.Semaphore] = {}
+        self._counters = {
+            lane: {
+                "waiting": 0,
+                "running": 0,
+                "completed": 0,
+                "failed": 0,
+                "timeouts": 0,
+                "crash_retries": 0,
+                "pool_restarts": 0,
+                "rejected": 0,
+                "requeued": 0,
+            }
+            for lane in LANES
+        }
+        # Single-flight: extraction key -> flight shared by every identical request in progress.
+        self._inflight: Dict[str, _Flight] = {}
+        self._flights = {"leaders": 0, "coalesced": 0, "probed_text": 0, "abandoned": 0}
+        self._reader_fingerprint: Optional[str] = None
+
+    def _pool(self, lane: str) -> Executor:
+        with self._lock:
+            if lane == "ocr" and self.ocr_processes > 0:
+                if self._process_pool is None:
+                    # OCR_MAX_CONCURRENCY is the worker's budget of tesseract runs, split between the children.
+                    self._process_pool = ProcessPoolExecutor(
+                        max_workers=self.ocr_processes,
+                        mp_context=multiprocessing.get_context(EXTRACT_PROCESS_START_METHOD),
+                        initializer=set_ocr_concurrency,
+                        initargs=(max(1, OCR_MAX_CONCURRENCY // self.ocr_processes),),
+                    )
+                return self._process_pool
+            if self._thread_pool is None:
+                self._thread_pool = ThreadPoolExecutor(
+                    max_workers=self.text_threads + (0 if self.ocr_processes else self.limits["ocr"]),
+                    thread_name_prefix="extract",
+                )
+            return self._thread_pool
+
+    def _reset_process_pool(self, broken: Executor) -> None:
+        """A crashed child breaks the whole ProcessPoolExecutor; the next request gets a fresh one."""
+        with self._lock:
+            if self._process_pool is broken:
+                self._process_pool = None
+                self._counters["ocr"]["pool_restarts"] += 1
+        broken.shutdown(wait=False)
+
+    def _slot(self, lane: str) -> asyncio.Semaphore:
+        if lane not in self._slots:
+            self._slots[lane] = asyncio.Semaphore(self.limits[lane])
+        return self._slots[lane]
+
+    def _count(self, lane: str, name: str, delta: int = 1) -> None:
+        with self._lock:
+            self._counters[lane][name] += delta
+
+    def _retry_after(self, lane: str, cost: float) -> int:
+        wait = (self._queued_pages[lane] + cost) * self._seconds_per_page[lane] / self.limits[lane]
+        return max(1, math.ceil(wait))
+
+    def _over_budget(self, lane: str, cost: float) -> Optional[LaneFull]:
+        """LaneFull if `cost` more pages would push the lane's queue over its budget (caller holds the lock)."""
+        queued = self._queued_pages[lane]
+        if queued > 0 and queued + cost > self.queue_limits[lane]:
+            self._counters[lane]["rejected"] += 1
+            ADMISSION_REJECTED.inc(lane=lane)
+            return LaneFull(lane, self._retry_after(lane, cost))
+        return None
+
+    def check_admission(self, lane: str, cost: float = 1.0) -> None:
+        """Raises LaneFull when the lane cannot take `cost` more pages right now."""
+        with self._lock:
+            full = self._over_budget(lane, cost)
+        if full is not None:
+            raise full
+
+    def _enqueue(self, lane: str, cost: float, shed: bool) -> None:
+        with self._lock:
+            full = self._over_budget(lane, cost) if shed else None
+            if full is None:
+                self._queued_pages[lane] += cost
+                self._counters[lane]["waiting"] += 1
+        if full is not None:
+            raise full
+
+    def _dequeue(self, lane: str, cost: float) -> None:
+        with self._lock:
+            self._queued_pages[lane] -= cost
+            self._counters[lane]["waiting"] -= 1
+
+    def _observe_seconds(self, lane: str, cost: float, seconds: float) -> None:
+        with self._lock:
+            self._seconds_per_page[lane] = 0.8 * self._seconds_per_page[lane] + 0.2 * seconds / max(cost, 1.0)
+
+    async def page_cost(self, pdf_path: PdfSource) -> int:
+        """Admission cost of a PDF: its page count (cheap, no rendering), at least 1."""
+        return max(1, await asyncio.to_thread(pdf_page_count, pdf_path))
+
+    async def plan(self, pdf_path: PdfSource, use_ocr_hint: Optional[bool]) -> Tuple[str, Optional[bool], int]:
+        """(lane, OCR hint to extract with, page cost) of a new extraction.
+
+        Without a hint and with an OCR-first reader in "document" mode, every page's text layer is
+        scored off the loop: only a PDF whose pages are all usable runs on the text lane with
+        `use_ocr_hint=False`. Anything else keeps `use_ocr_hint=None` on the OCR lane, so mixed PDFs
+        and the hybrid/roi/priority reader modes read exactly as without the probe.
+        """
+        reader = PdfLineReader()
+        if use_ocr_hint is None and reader.prefer_ocr and reader.mode == "document":
+            pages, usable = await asyncio.to_thread(probe_text_layer, pdf_path)
+            if usable:
+                self._flights["probed_text"] += 1
+                return choose_lane(None, reader, text_layer_usable=True), False, max(1, pages)
+            return choose_lane(None, reader), None, max(1, pages)
+        return choose_lane(use_ocr_hint, reader), use_ocr_hint, await self.page_cost(pdf_path)
+
+    def run(
+        self,
+        lane: str,
+        fn: Callable[..., Any],
+        *args: Any,
+        timeout: Optional[float] = None,
+        cost: float = 1.0,
+        shed: bool = False,
+        on_start: Optional[Callable[[], None]] = None,
+        on_finish: Optional[Callable[[], None]] = None,
+        **kwargs: Any,
+    ) -> "asyncio.Future[Any]":
+        """Task running `fn(*args, **kwargs)` on the lane's pool; `fn` must be picklable for the OCR lane.
+
+        `cost` (pages) is added to the lane's queue when `run` is called, not when the task first
+        runs, so concurrent arrivals cannot all slip under the budget. With `shed`, a call that does not
+        fit raises LaneFull right here.
+
+        `timeout` bounds the execution only, from the moment the lane slot is acquired (`on_start`);
+        time spent queued does not count. On timeout the task fails with `asyncio.TimeoutError` right
+        away, but the lane slot stays taken until the work really finishes, so abandoned extractions
+        still count against the limit. `on_finish` is called once nothing of this call runs anymore
+        (then, or right away when cancelled while queued). A call that lost its process to another
+        task's crash (BrokenProcessPool) is retried once on a fresh pool, so one crashing PDF does not
+        fail the innocent ones sharing the pool.
+        """
+        self._enqueue(lane, cost, shed)
+        state = {"queued": True, "detached": False, "finished": False}
+
+        def dequeue() -> None:
+            if state["queued"]:
+                state["queued"] = False
+                self._dequeue(lane, cost)
+
+        def finish() -> None:
+            if not state["finished"]:
+                state["finished"] = True
+                if on_finish is not None:
+                    on_finish()
+
+        def done(_: "asyncio.Future[Any]") -> None:
+            dequeue()  # a task cancelled before its first step never runs its own cleanup
+            if not state["detached"]:
+                finish()
+
+        task = asyncio.ensure_future(
+            self._run_queued(lane, functools.partial(fn, *args, **kwargs), timeout, cost, state, dequeue, on_start, finish)
+        )
+        task.add_done_callback(done)
+        return task
+
+    async def _run_queued(
+        self,
+        lane: str,
+        call: Callable[[], Any],
+        timeout: Optional[float],
+        cost: float,
+        state: Dict[str, bool],
+        dequeue: Callable[[], None],
+        on_start: Optional[Callable[[], None]],
+        finish: Callable[[], None],
+    ) -> Any:
+        try:
+            await self._slot(lane).acquire()
+        finally:
+            dequeue()
+        if on_start is not None:
+            on_start()
+        self._count(lane, "running")
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+
+        def release() -> None:
+            self._count(lane, "running", -1)
+            self._slot(lane).release()
+            finish()
+
+        retried = False
+        try:
+            while True:
+                pool = self._pool(lane)
+                future = None
+                try:
+                    future = pool.submit(call)
+                    result = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+                except (asyncio.TimeoutError, asyncio.CancelledError) as ex:
+                    if isinstance(ex, asyncio.TimeoutError):
+                        self._count(lane, "timeouts")
+                    if future is not None and not future.cancel():
+                        future.add_done_callback(lambda _: loop.call_soon_threadsafe(release))
+                        state["detached"] = True
+                    raise
+                except BrokenProcessPool:
+                    self._reset_process_pool(pool)
+                    if retried:
+                        raise
+                    retried = True
+                    self._count(lane, "crash_retries")
+                    continue
+                self._count(lane, "completed")
+                self._observe_seconds(lane, cost, time.perf_counter() - started)
+                return result
+        except NeedsOcr:
+            self._count(lane, "requeued")
+            raise
+        except BaseException:
+            self._count(lane, "failed")
+            raise
+        finally:
+            if not state["detached"]:
+                release()
+
+    def _flight_key(
+        self, content_sha256: str, vendor_hint: Optional[str], cfg_path: str, use_ocr_hint: Optional[bool]
+    ) -> str:
+        if self._reader_fingerprint is None:
+            self._reader_fingerprint = PdfLineReader().fingerprint()
+        return "|".join(
+            [
+                content_sha256,
+                (vendor_hint or "").upper(),
+                cfg_path,
+                "none" if use_ocr_hint is None else str(bool(use_ocr_hint)),
+                self._reader_fingerprint,
+            ]
+        )
+
+    async def extract(
+        self,
+        pdf_path: PdfSource,
+        vendor_hint: Optional[str] = None,
+        cfg_path: str = "vendors.yaml",
+        use_ocr_hint: Optional[bool] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """`extract_from_pdf` on the lane matching the request's OCR hint (see `extract_traced`)."""
+        minimal, _ = await self.extract_traced(pdf_path, vendor_hint, cfg_path, use_ocr_hint, timeout)
+        return minimal
+
+    async def extract_traced(
+        self,
+        pdf_path: PdfSource,
+        vendor_hint: Optional[str] = None,
+        cfg_path: str = "vendors.yaml",
+        use_ocr_hint: Optional[bool] = None,
+        timeout: Optional[float] = None,
+        shed: bool = True,
+        release: Optional[Callable[[PdfSource], None]] = None,
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """`extract_from_pdf` plus its trace (stage durations, pages, cache hits; see app.services.metrics).
+
+        The trace is merged into the process metrics once per extraction, when it lands.
+
+        Identical concurrent requests (same PDF content and parameters, e.g. client retries or
+        duplicate files in a batch) are coalesced: the first one runs the extraction and the rest
+        await the same task. Each caller gets its own copy of the result. A caller that disconnects
+        does not cancel an extraction that is already running; one still queued is dropped once no
+        caller awaits it anymore. `timeout` bounds the extraction itself, not the wait for a slot.
+
+        A new (non-coalesced) extraction is admitted on its lane at the cost of its page count; with
+        `shed` it raises LaneFull when the lane queue is over budget (followers add no load, never shed).
+
+        With `release`, the executor owns `pdf_path` and calls `release(pdf_path)` once it is no longer
+        read: after the extraction's work really ends for the leader (even if every caller gave up),
+        when this call returns otherwise.
+        """
+        owned = False
+        try:
+            if isinstance(pdf_path, (bytes, bytearray, memoryview)):
+                content_sha256 = source_sha256(pdf_path)
+            else:
+                content_sha256 = await asyncio.to_thread(source_sha256, pdf_path)
+            key = self._flight_key(content_sha256, vendor_hint, cfg_path, use_ocr_hint)
+            flight = self._inflight.get(key)
+            coalesced = flight is not None
+            if flight is None:
+                lane, extract_hint, cost = await self.plan(pdf_path, use_ocr_hint)
+                flight = self._inflight.get(key)  # an identical request may have started while probing
+                coalesced = flight is not None
+            if flight is None:
+                flight = self._start_flight(
+                    key, lane, pdf_path, vendor_hint, cfg_path, extract_hint, timeout, cost, shed, release
+                )
+                owned = True
+            else:
+                self._flights["coalesced"] += 1
+            result = await self._await_flight(key, flight)
+        finally:
+            if release is not None and not owned:
+                release(pdf_path)
+        minimal, trace = copy.deepcopy(result)
+        if coalesced:
+            trace["attrs"]["coalesced"] = True
+        return minimal, trace
+
+    def _start_flight(
+        self,
+        key: str,
+        lane: str,
+        pdf_path: PdfSource,
+        vendor_hint: Optional[str],
+        cfg_path: str,
+        use_ocr_hint: Optional[bool],
+        timeout: Optional[float],
+        cost: float,
+        shed: bool,
+        release: Optional[Callable[[PdfSource], None]],
+    ) -> _Flight:
+        flight = _Flight(lane)
+        flight.task = asyncio.ensure_future(
+            self._fly(flight, pdf_path, vendor_hint, cfg_path, use_ocr_hint, timeout, cost, shed, release)
+        )
+        self._flights["leaders"] += 1
+        self._inflight[key] = flight
+
+        def land(done: "asyncio.Future[Tuple[Dict[str, Any], Dict[str, Any]]]") -> None:
+            if self._inflight.get(key) is flight:
+                del self._inflight[key]
+            if done.cancelled():
+                return
+            error = done.exception()  # retrieved here too, in case every caller gave up waiting
+            if error is not None:
+                observe_error(error, vendor_hint)
+            else:
+                observe_trace(done.result()[1])
+
+        flight.task.add_done_callback(land)
+        return flight
+
+    async def _fly(
+        self,
+        flight: _Flight,
+        pdf_path: PdfSource,
+        vendor_hint: Optional[str],
+        cfg_path: str,
+        use_ocr_hint: Optional[bool],
+        timeout: Optional[float],
+        cost: float,
+        shed: bool,
+        release: Optional[Callable[[PdfSource], None]],
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Runs the flight on its lane. The text lane never OCRs in the API process: a PDF that turns out
+        to need OCR (NeedsOcr) is queued again on the OCR lane, whose children split OCR_MAX_CONCURRENCY.
+
+        `release(pdf_path)` is called once this coroutine is over and no run is still working on the
+        source (a timed-out run keeps it until its work really ends).
+        """
+        runs = {"active": 0, "closed": False, "released": False}
+
+        def settle() -> None:
+            if release is not None and runs["closed"] and not runs["active"] and not runs["released"]:
+                runs["released"] = True
+                release(pdf_path)
+
+        def finished() -> None:
+            runs["active"] -= 1
+            settle()
+
+        def run_on(lane: str, lane_shed: bool, allow_ocr: bool) -> "asyncio.Future[Any]":
+            runs["active"] += 1
+            return self.run(
+                lane,
+                traced_call,
+                extract_from_pdf,
+                pdf_path,
+                timeout=timeout,
+                cost=cost,
+                shed=lane_shed,
+                on_start=flight.mark_started,
+                on_finish=finished,
+                vendor_hint=vendor_hint,
+                cfg_path=cfg_path,
+                use_ocr_hint=use_ocr_hint,
+                allow_ocr=allow_ocr,
+            )
+
+        try:
+            if flight.lane == "text":
+                try:
+                    return await run_on("text", shed, False)
+                except NeedsOcr:
+                    # Already admitted once: the OCR lane queues it without shedding. Until it gets
+                    # a slot there, callers giving up drop it like any other queued flight.
+                    pass
+                flight.lane = "ocr"
+                flight.started = False
+                return await run_on("ocr", False, True)
+            return await run_on(flight.lane, shed, True)
+        finally:
+            runs["closed"] = True
+            settle()
+
+    async def _await_flight(self, key: str, flight: _Flight) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Waits for the flight; the last caller to give up on a flight still queued cancels it."""
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.started and not flight.task.done():
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+                self._flights["abandoned"] += 1
+                flight.task.cancel()
+
+    async def extract_batch(
+        self,
+        pdf_paths: List[PdfSource],
+        vendor_hint: Optional[str] = None,
+        cfg_path: str = "vendors.yaml",
+        use_ocr_hint: Optional[bool] = None,
+        max_parallel: int = BATCH_MAX_PARALLEL,
+        timeout: Optional[float] = BATCH_FILE_TIMEOUT or None,
+        release: Optional[Callable[[PdfSource], None]] = None,
+    ) -> AsyncIterator[Tuple[int, Optional[Dict[str, Any]], Optional[Exception], Optional[Dict[str, Any]]]]:
+        """Yields (index, result, error, trace) per file as each one finishes, at most `max_parallel` at a time.
+
+        Failures (including timeouts and crashed children) are yielded, never raised, so one file
+        cannot sink the batch. Files not yet finished are cancelled if the consumer stops early.
+        With `release`, every source is released once no longer read (see `extract_traced`).
+        """
+        gate = asyncio.Semaphore(max(1, max_parallel))
+
+        async def one(index: int, pdf_path: PdfSource, handed: Dict[str, bool]) -> Tuple[Any, ...]:
+            async with gate:
+                handed["done"] = True
+                try:
+                    minimal, trace = await self.extract_traced(
+                        pdf_path, vendor_hint, cfg_path, use_ocr_hint, timeout, shed=False, release=release)
+                    return index, minimal, None, trace
+                except Exception as ex:
+                    return index, None, ex, None
+
+        tasks = [self._owning_task(one, index, path, release) for index, path in enumerate(pdf_paths)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def extract_stream(
+        self,
+        sources: AsyncIterator[Tuple[Any, PdfSource]],
+        vendor_hint: Optional[str] = None,
+        cfg_path: str = "vendors.yaml",
+        use_ocr_hint: Optional[bool] = None,
+        max_parallel: int = BATCH_MAX_PARALLEL,
+        timeout: Optional[float] = BATCH_FILE_TIMEOUT or None,
+        release: Optional[Callable[[PdfSource], None]] = None,
+    ) -> AsyncIterator[Tuple[Any, Optional[Dict[str, Any]], Optional[Exception], Optional[Dict[str, Any]]]]:
+        """`extract_batch` over an async stream of (key, pdf) pairs of unknown length (e.g. archive entries).
+
+        The next source is pulled only when one of the `max_parallel` slots is free, so a producer
+        that reads lazily is never more than `max_parallel` files ahead of the extraction. With
+        `release`, every source pulled from the stream is released once no longer read.
+        """
+        async def one(key: Any, pdf_path: PdfSource, handed: Dict[str, bool]) -> Tuple[Any, ...]:
+            handed["done"] = True
+            try:
+                minimal, trace = await self.extract_traced(
+                    pdf_path, vendor_hint, cfg_path, use_ocr_hint, timeout, shed=False, release=release)
+                return key, minimal, None, trace
+            except Exception as ex:
+                return key, None, ex, None
+
+        iterator = sources.__aiter__()
+        exhausted = False
+        pending: set = set()
+        try:
+            while True:
+                while not exhausted and len(pending) < max(1, max_parallel):
+                    try:
+                        key, pdf_path = await iterator.__anext__()
+                    except StopAsyncIteration:
+                        exhausted = True
+                        break
+                    pending.add(self._owning_task(one, key, pdf_path, release))
+                if not pending:
+                    return
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    @staticmethod
+    def _owning_task(
+        one: Callable[..., Any], key: Any, pdf_path: PdfSource, release: Optional[Callable[[PdfSource], None]]
+    ) -> "asyncio.Future[Any]":
+        """Task for `one(key, pdf_path, handed)`; releases the source if it ends before handing it to `extract_traced`."""
+        handed = {"done": False}
+        task = asyncio.ensure_future(one(key, pdf_path, handed))
+        if release is not None:
+            task.add_done_callback(lambda _: None if handed["done"] else release(pdf_path))
+        return task
+
+    def queue_depth(self) -> int:
+        with self._lock:
+            return sum(c["waiting"] for c in self._counters.values())
+
+    def warm_up(self, fn: Callable[[], Any]) -> List[Any]:
+        """Starts the OCR lane's processes now and runs `fn` on them, one call per process (blocking).
+
+        With the spawn start method every child re-imports the extraction stack; doing that at
+        startup instead of on the first OCR request keeps it out of request latency.
+        """
+        if self.ocr_processes <= 0:
+            return []
+        pool = self._pool("ocr")
+        futures = [pool.submit(fn) for _ in range(self.ocr_processes)]
+        return [future.result() for future in futures]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lanes = {
+                lane: dict(
+                    self._counters[lane],
+                    limit=self.limits[lane],
+                    queued_pages=self._queued_pages[lane],
+                    queue_limit_pages=self.queue_limits[lane],
+                    seconds_per_page=round(self._seconds_per_page[lane], 3),
+                )
+                for lane in LANES
+            }
+        lanes["ocr"]["backend"] = "process" if self.ocr_processes > 0 else "thread"
+        lanes["ocr"]["workers"] = self.ocr_processes or self.limits["ocr"]
+        lanes["text"]["backend"] = "thread"
+        lanes["text"]["workers"] = self.text_threads
+        return {
+            "pid": os.getpid(),
+            "queue_depth": sum(v["waiting"] for v in lanes.values()),
+            "lanes": lanes,
+            "single_flight": dict(self._flights, in_flight=len(self._inflight)),
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            pools = [p for p in (self._process_pool, self._thread_pool) if p is not None]
+            self._process_pool = None
+            self._thread_pool = None
+        for pool in pools:
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+
+_EXECUTOR: Optional[ExtractionExecutor] = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def _lane_gauge(counter: str) -> Callable[[], Dict[Tuple[str, ...], float]]:
+    def read() -> Dict[Tuple[str, ...], float]:
+        if _EXECUTOR is None:
+            return {}
+        lanes = _EXECUTOR.stats()["lanes"]
+        return {(lane,): lanes[lane][counter] for lane in LANES}
+
+    return read
+
+
+METRICS.gauge("extractor_queue_depth", "Extractions waiting for a lane slot.", ["lane"], _lane_gauge("waiting"))
+METRICS.gauge("extractor_lane_running", "Extractions running on each lane.", ["lane"], _lane_gauge("running"))
+METRICS.gauge("extractor_queue_pages", "Pages waiting for a lane slot (admission cost).", ["lane"], _lane_gauge("queued_pages"))
+ADMISSION_REJECTED = METRICS.counter(
+    "extractor_admission_rejected_total", "Extractions shed because the lane queue was over its page budget.", ["lane"]
+)
+
+
+def get_extraction_executor() -> ExtractionExecutor:
+    """Process-wide executor of this API worker (pools start on first use, not at import)."""
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        with _EXECUTOR_LOCK:
+            if _EXECUTOR is None:
+                _EXECUTOR = ExtractionExecutor()
+    return _EXECUTOR
+
+
+def shutdown_extraction_executor() -> None:
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        executor, _EXECUTOR = _EXECUTOR, None
+    if executor is not None:
+        executor.shutdown(wait=False)
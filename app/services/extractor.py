@@ -1,4 +1,5 @@
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import os
 
 from app.services.fallback_totals import fallback_totals
 from app.services.metadata_extractor import (
@@ -7,7 +8,11 @@ from app.services.metadata_extractor import (
     extract_header_common,
     extract_names_and_cuits,
 )
-from app.services.pdf_reader import PdfLineReader
+from app.services.line_cache import LineCache, get_line_cache
+from app.services.metrics import stage, trace_count, trace_set, use_trace
+from app.services.page_tokens import TokenStore
+from app.services.pdf_reader import PdfLineReader, PdfSource, read_failed
+from app.services.result_cache import ResultCache, get_result_cache, source_sha256
 from app.services.tax_normalizer import build_minimal_payload, validate_and_repair
 from app.services.vendor_config import load_vendor_config
 from app.vendors import REGISTRY
@@ -16,8 +21,15 @@ from app.vendors import REGISTRY
 class InvoiceExtractor:
     """Coordinates PDF reading, vendor detection and normalization to minimal payload."""
 
-    def __init__(self, reader: Optional[PdfLineReader] = None):
+    def __init__(
+        self,
+        reader: Optional[PdfLineReader] = None,
+        cache: Optional[ResultCache] = None,
+        line_cache: Optional[LineCache] = None,
+    ):
         self.reader = reader or PdfLineReader()
+        self.cache = cache
+        self.line_cache = line_cache
 
     @staticmethod
     def _build_base_out(header: Dict[str, Any], parties: Dict[str, Any]) -> Dict[str, Any]:
@@ -42,44 +54,182 @@ class InvoiceExtractor:
 
     def extract(
         self,
-        pdf_path: str,
+        pdf_path: PdfSource,
         vendor_hint: Optional[str] = None,
         cfg_path: str = "vendors.yaml",
         use_ocr_hint: Optional[bool] = None,
     ) -> Dict[str, Any]:
-        lines, used_ocr = self.reader.read(pdf_path, use_ocr_hint=use_ocr_hint)
-        header = extract_header_common(lines)
+        trace_set("vendor", (vendor_hint or "").upper() or None)
+        pdf_sha256 = source_sha256(pdf_path) if (self.cache or self.line_cache) else None
+        if self.cache is None:
+            return self._extract(pdf_path, vendor_hint, cfg_path, use_ocr_hint, pdf_sha256)[0]
+        key = self.cache.make_key(pdf_sha256, vendor_hint, use_ocr_hint, cfg_path, self.reader.fingerprint())
+        cached = self.cache.get(key)
+        if cached is not None:
+            trace_count("result_cache_hit")
+            trace_set("used_ocr", bool(cached.get("ocr")))
+            return cached
+        minimal, cacheable = self._extract(pdf_path, vendor_hint, cfg_path, use_ocr_hint, pdf_sha256)
+        if cacheable:
+            self.cache.put(key, minimal)
+        return minimal
+
+    def _extract(
+        self,
+        pdf_path: PdfSource,
+        vendor_hint: Optional[str],
+        cfg_path: str,
+        use_ocr_hint: Optional[bool],
+        pdf_sha256: Optional[str] = None,
+    ) -> Tuple[Dict[str, Any], bool]:
+        """Minimal payload, and whether it may be cached: no lines or a failed render/OCR may be transient."""
         cfg = load_vendor_config(cfg_path)
-        vendor_guess = (vendor_hint or "").upper() or detect_vendor_basic(lines, cfg["detect"]["names"]) or None
-        parties_tuple = extract_names_and_cuits(lines, vendor_guess)
+        regions = cfg["ocr_regions"].get((vendor_hint or "").upper())
+
+        def is_sufficient(partial_lines: List[str], partial_ocr: bool) -> bool:
+            # Trial parses of a priority-mode read count as one stage, not as extra header/handler runs.
+            with stage("sufficiency_check"), use_trace(None):
+                return self._is_complete(self._build_out(partial_lines, partial_ocr, {}, vendor_hint, cfg))
+
+        lines, used_ocr, reader_debug, layout = self._read_lines(
+            pdf_path, use_ocr_hint, regions, pdf_sha256, vendor_hint, is_sufficient
+        )
+        self._trace_reader(lines, reader_debug)
+        minimal = self.parse_lines(lines, used_ocr, reader_debug, vendor_hint, cfg, layout)
+        return minimal, bool(lines) and not read_failed(reader_debug)
+
+    @staticmethod
+    def _trace_reader(lines: List[str], reader_debug: Dict[str, Any]) -> None:
+        """Reader facts for the per-request debug payload (mode, DPI and confidence per OCR unit)."""
+        units = reader_debug.get("ocr_units") or reader_debug.get("regions") or []
+        trace_set("reader_mode", reader_debug.get("reader_mode"))
+        trace_set("lines_count", len(lines))
+        trace_set("ocr_units", [{k: unit.get(k) for k in ("page", "name", "dpi", "conf") if k in unit} for unit in units])
+        if reader_debug.get("skipped_pages"):
+            trace_set("skipped_pages", reader_debug["skipped_pages"])
+
+    @staticmethod
+    def _is_complete(out: Dict[str, Any]) -> bool:
+        """Required fields present and no accounting mismatch/estimated total after validate_and_repair."""
+        if not (out.get("numero") and out.get("fecha") and out.get("cuit_proveedor")):
+            return False
+        return not out.get("warnings")
+
+    def _read_lines(
+        self,
+        pdf_path: PdfSource,
+        use_ocr_hint: Optional[bool],
+        regions: Optional[List[Dict[str, Any]]],
+        pdf_sha256: Optional[str],
+        vendor_hint: Optional[str],
+        is_sufficient: Optional[Callable[[List[str], bool], bool]] = None,
+    ) -> Tuple[List[str], bool, Dict[str, Any], Optional[TokenStore]]:
+        def read() -> Tuple[List[str], bool, Dict[str, Any], Optional[TokenStore]]:
+            return self.reader.read_layout(
+                pdf_path, use_ocr_hint=use_ocr_hint, regions=regions, is_sufficient=is_sufficient
+            )
+
+        if self.line_cache is None or pdf_sha256 is None:
+            return read()
+        reader_fingerprint = self.reader.fingerprint()
+        key = self.line_cache.make_key(pdf_sha256, reader_fingerprint, use_ocr_hint, regions)
+        cached = self.line_cache.get(key)
+        if cached is not None:
+            trace_count("line_cache_hit")
+            return cached
+        lines, used_ocr, reader_debug, layout = read()
+        # A priority-mode read that skipped pages depends on the handler/rules that judged it sufficient
+        # (is_sufficient), which are not part of the key: only complete, error-free reads are reusable.
+        if lines and not reader_debug.get("skipped_pages") and not read_failed(reader_debug):
+            self.line_cache.put(
+                key,
+                pdf_sha256,
+                reader_fingerprint,
+                lines,
+                used_ocr,
+                reader_debug,
+                source=os.path.basename(pdf_path) if isinstance(pdf_path, str) else None,
+                vendor_hint=vendor_hint,
+                use_ocr_hint=use_ocr_hint,
+                tokens=layout,
+            )
+        return lines, used_ocr, reader_debug, layout
+
+    def parse_lines(
+        self,
+        lines: List[str],
+        used_ocr: bool,
+        reader_debug: Dict[str, Any],
+        vendor_hint: Optional[str],
+        cfg: Dict[str, Any],
+        layout: Optional[TokenStore] = None,
+    ) -> Dict[str, Any]:
+        """Header extraction, vendor handler and normalization over already-read lines (no PDF access)."""
+        out = self._build_out(lines, used_ocr, reader_debug, vendor_hint, cfg, layout)
+        with stage("payload"):
+            minimal = build_minimal_payload(out, prefer_cuit="proveedor")
+        minimal["ocr"] = bool(used_ocr)
+        trace_set("vendor", out["debug"]["vendor"])
+        trace_set("used_ocr", bool(used_ocr))
+        return minimal
+
+    def _build_out(
+        self,
+        lines: List[str],
+        used_ocr: bool,
+        reader_debug: Dict[str, Any],
+        vendor_hint: Optional[str],
+        cfg: Dict[str, Any],
+        layout: Optional[TokenStore] = None,
+    ) -> Dict[str, Any]:
+        with stage("vendor_detect"):
+            vendor_guess = (vendor_hint or "").upper() or detect_vendor_basic(lines, cfg["detect"]["names"]) or None
+        with stage("header"):
+            header = extract_header_common(lines)
+            parties_tuple = extract_names_and_cuits(lines, vendor_guess)
         parties = {
             "proveedor": parties_tuple[0],
             "cuit_proveedor": parties_tuple[1],
             "cliente": parties_tuple[2],
             "cuit_cliente": parties_tuple[3],
         }
-        vendor = vendor_guess or detect_vendor_by_cuit(parties["cuit_proveedor"], cfg["detect"]["cuits"])
+        vendor = vendor_guess
+        if not vendor:
+            with stage("vendor_detect_cuit"):
+                vendor = detect_vendor_by_cuit(parties["cuit_proveedor"], cfg["detect"]["cuits"])
 
         out = self._build_base_out(header, parties)
         out["debug"] = {"vendor": vendor or "UNKNOWN", "lines_count": len(lines), "used_ocr": bool(used_ocr)}
+        out["debug"].update(reader_debug)
 
+        # Positioned tokens for same-baseline lookups; handlers fall back to line scans without them.
+        out["layout"] = layout if layout else None
         handler = REGISTRY.get((vendor or "").upper())
-        if handler:
-            handler(lines, out)
-        else:
-            fallback_totals(lines, out)
+        with stage("handler"):
+            if handler:
+                handler(lines, out)
+            else:
+                fallback_totals(lines, out)
+        out.pop("layout", None)
 
-        validate_and_repair(out)
-        minimal = build_minimal_payload(out, prefer_cuit="proveedor")
-        minimal["ocr"] = bool(used_ocr)
-        return minimal
+        with stage("normalize"):
+            validate_and_repair(out)
+        return out
 
 
 def extract_from_pdf(
-    pdf_path: str,
+    pdf_path: PdfSource,
     vendor_hint: Optional[str] = None,
     cfg_path: str = "vendors.yaml",
     use_ocr_hint: Optional[bool] = None,
+    allow_ocr: bool = True,
 ) -> Dict[str, Any]:
-    """Compatibility wrapper used by API endpoint."""
-    return InvoiceExtractor().extract(pdf_path, vendor_hint=vendor_hint, cfg_path=cfg_path, use_ocr_hint=use_ocr_hint)
+    """Compatibility wrapper used by API endpoint and batch processor (goes through the result/line caches).
+
+    `pdf_path` may also be the PDF bytes (uploads kept in memory). With `allow_ocr=False` a PDF without
+    a text layer raises NeedsOcr instead of being OCR'd in this process.
+    """
+    extractor = InvoiceExtractor(
+        reader=PdfLineReader(allow_ocr=allow_ocr), cache=get_result_cache(), line_cache=get_line_cache()
+    )
+    return extractor.extract(pdf_path, vendor_hint=vendor_hint, cfg_path=cfg_path, use_ocr_hint=use_ocr_hint)
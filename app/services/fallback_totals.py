@@ -14,6 +14,15 @@ def _normalize_ocr_keyword(text: str) -> str:
 def fallback_totals(lines: List[str], out: Dict[str, Any]) -> None:
     start = max(0, len(lines) - 150)
     tail = lines[start:]
+    layout = out.get("layout")
+
+    def amount_after(i: int, keyword: str) -> Optional[float]:
+        # Same baseline as the label when layout tokens are available, else the forward line scan.
+        if layout is not None:
+            v = layout.amount_right_of(keyword, start + i)
+            if v is not None:
+                return v
+        return first_amount_forward(tail, i)
     sub = iva = perc = tot = None
     iva_items: List[Dict[str, Optional[float]]] = []
     perc_items: List[Dict[str, Optional[float]]] = []
@@ -21,21 +30,22 @@ def fallback_totals(lines: List[str], out: Dict[str, Any]) -> None:
     for i, line in enumerate(tail):
         up_key = _normalize_ocr_keyword(line.upper())
         if sub is None and "SUBTOTAL" in up_key:
-            v = first_amount_forward(tail, i)
+            v = amount_after(i, "SUBTOTAL")
             if v is not None:
                 sub = v
         if "IVA" in up_key:
-            v = first_amount_forward(tail, i)
+            v = amount_after(i, "IVA")
             if v is not None:
                 iva = (iva or 0.0) + v
                 iva_items.append({"alicuota": None, "monto": v})
-        if any(k in up_key for k in ["PERC", "PERCEP", "IIBB", "INGRESOS BRUTOS", "ARBA", "AGIP"]):
-            v = first_amount_forward(tail, i)
+        perc_key = next((k for k in ["PERC", "PERCEP", "IIBB", "INGRESOS BRUTOS", "ARBA", "AGIP"] if k in up_key), None)
+        if perc_key:
+            v = amount_after(i, perc_key.split()[-1])
             if v is not None:
                 perc = (perc or 0.0) + v
                 perc_items.append({"desc": line, "monto": v})
         if "TOTAL" in up_key:
-            v = first_amount_forward(tail, i)
+            v = amount_after(i, "TOTAL")
             if v is not None:
                 tot = v
     out["subtotal"] = sub
@@ -0,0 +1,181 @@
+"""SQLite manifest of the PDFs already extracted from a folder, for incremental batch runs.
+
+One row per absolute path: size, mtime, SHA-256, extraction version, status and the result itself.
+`plan` decides what a run has to process: new files, files whose content changed (a touched file
+with the same hash only gets its mtime updated) and files extracted with an older version of the
+code, vendors.yaml, reader settings or hints.
+"""
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from app.services.pdf_reader import PdfLineReader
+from app.services.result_cache import code_fingerprint, config_fingerprint, file_sha256
+
+FOLDER_MANIFEST_PATH = os.environ.get("FOLDER_MANIFEST_PATH") or os.path.join(
+    tempfile.gettempdir(), "extractor-cache", "folders.sqlite"
+)
+
+
+def extraction_version(
+    cfg_path: str = "vendors.yaml",
+    vendor_hint: Optional[str] = None,
+    use_ocr_hint: Optional[bool] = None,
+) -> str:
+    """Everything a stored result depends on besides the PDF bytes (same inputs as the result cache key)."""
+    parts = [
+        code_fingerprint(),
+        config_fingerprint(cfg_path),
+        PdfLineReader().fingerprint(),
+        (vendor_hint or "").upper(),
+        "none" if use_ocr_hint is None else str(bool(use_ocr_hint)),
+    ]
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()[:16]
+
+
+class FolderManifest:
+    """Per-path record of extracted files. Writes come from a single process (the batch runner)."""
+
+    def __init__(self, path: str = FOLDER_MANIFEST_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, sha256 TEXT NOT NULL, "
+            "version TEXT NOT NULL, status TEXT NOT NULL, pages INTEGER NOT NULL DEFAULT 0, "
+            "result TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _prefix(folder: str) -> str:
+        return os.path.join(os.path.abspath(folder), "")
+
+    def _rows(self, folder: str) -> Dict[str, Tuple[int, int, str, str, str]]:
+        prefix = self._prefix(folder)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, size, mtime_ns, sha256, version, status FROM files WHERE substr(path, 1, ?) = ?",
+                (len(prefix), prefix),
+            ).fetchall()
+        return {row[0]: tuple(row[1:]) for row in rows}
+
+    def plan(
+        self,
+        files: List[str],
+        folder: str,
+        version: str,
+        retry_errors: bool = False,
+        prune: bool = True,
+        recursive: bool = False,
+    ) -> Dict[str, Any]:
+        """Splits `files` into what must be extracted and what is up to date.
+
+        Returns {"process": [paths], "unchanged": n, "touched": n, "removed": n}; `removed` are rows of
+        files that no longer exist under `folder` (deleted from the manifest when `prune`). When `files`
+        was not listed `recursive`ly, rows in subfolders are out of scope and never count as removed.
+        """
+        known = self._rows(folder)
+        process: List[str] = []
+        unchanged = touched = 0
+        seen = set()
+        for path in files:
+            key = os.path.abspath(path)
+            seen.add(key)
+            row = known.get(key)
+            if row is None:
+                process.append(path)
+                continue
+            size, mtime_ns, sha256, row_version, status = row
+            if row_version != version or (retry_errors and status != "ok"):
+                process.append(path)
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if (st.st_size, st.st_mtime_ns) == (size, mtime_ns):
+                unchanged += 1
+                continue
+            try:
+                same = st.st_size == size and file_sha256(path) == sha256
+            except OSError:
+                continue
+            if not same:
+                process.append(path)
+                continue
+            touched += 1
+            with self._lock:
+                self._conn.execute("UPDATE files SET mtime_ns = ? WHERE path = ?", (st.st_mtime_ns, key))
+        top = os.path.abspath(folder)
+        removed = [
+            path for path in known if path not in seen and (recursive or os.path.dirname(path) == top)
+        ]
+        with self._lock:
+            if prune and removed:
+                self._conn.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in removed])
+            self._conn.commit()
+        return {"process": process, "unchanged": unchanged, "touched": touched, "removed": len(removed)}
+
+    def record(
+        self,
+        path: str,
+        size: int,
+        mtime_ns: int,
+        sha256: str,
+        version: str,
+        pages: int,
+        result: Dict[str, Any],
+    ) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, sha256, version, status, pages, result, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    os.path.abspath(path),
+                    size,
+                    mtime_ns,
+                    sha256,
+                    version,
+                    result.get("status", "error"),
+                    pages,
+                    json.dumps(result, ensure_ascii=False),
+                    time.time(),
+                ),
+            )
+            self._conn.commit()
+
+    def iter_results(self, folder: str) -> Iterator[Dict[str, Any]]:
+        """Stored results under `folder` (current state of the whole folder, not only the last run)."""
+        prefix = self._prefix(folder)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, sha256, pages, result FROM files WHERE substr(path, 1, ?) = ? ORDER BY path",
+                (len(prefix), prefix),
+            ).fetchall()
+        for path, sha256, pages, result in rows:
+            yield dict(json.loads(result), path=os.path.relpath(path, prefix), sha256=sha256, pages=pages)
+
+    def stats(self, folder: Optional[str] = None) -> Dict[str, int]:
+        query = "SELECT status, COUNT(*) FROM files"
+        params: Tuple[Any, ...] = ()
+        if folder is not None:
+            prefix = self._prefix(folder)
+            query += " WHERE substr(path, 1, ?) = ?"
+            params = (len(prefix), prefix)
+        with self._lock:
+            rows = self._conn.execute(query + " GROUP BY status", params).fetchall()
+        return {status: count for status, count in rows}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
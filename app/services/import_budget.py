@@ -0,0 +1,82 @@
+"""Import-time budget for the API entry point, measured with `python -X importtime` in a fresh interpreter.
+
+    python -m app.services.import_budget [--module app.api.main] [--budget-ms 1500] [--top 15]
+
+Exits 1 when the cumulative import time of the module exceeds the budget, or when a dependency that
+must load on first use (fitz, PIL, pdf2image, pytesseract, tesserocr, vendor handlers) shows up in
+its import graph. The import runs with the caller's environment, warm-up defaults included, so it
+measures what `uvicorn app.api.main:app` and the tests pay.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+IMPORT_BUDGET_MS = float(os.environ.get("IMPORT_BUDGET_MS", "1500"))
+# Module name prefixes that must not be imported eagerly by the entry point.
+LAZY_MODULES = ("fitz", "pymupdf", "PIL", "pdf2image", "pytesseract", "tesserocr", "app.vendors.handlers_")
+
+# (module, self microseconds, cumulative microseconds), in -X importtime order.
+ImportRow = Tuple[str, int, int]
+
+
+def measure_imports(module: str) -> List[ImportRow]:
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    if proc.returncode != 0:
+        lines = proc.stderr.strip().splitlines()
+        raise RuntimeError(lines[-1] if lines else f"import {module} failed")
+    rows: List[ImportRow] = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        rows.append((parts[2].strip(), int(parts[0]), int(parts[1])))
+    return rows
+
+
+def check_import_budget(module: str = "app.api.main", budget_ms: float = IMPORT_BUDGET_MS, top: int = 15) -> Dict[str, Any]:
+    rows = measure_imports(module)
+    total_us = next((cumulative for name, _, cumulative in rows if name == module), 0)
+    eager = sorted({name for name, _, _ in rows if name.startswith(LAZY_MODULES)})
+    slowest = sorted(rows, key=lambda row: row[2], reverse=True)
+    return {
+        "module": module,
+        "total_ms": round(total_us / 1000, 1),
+        "budget_ms": budget_ms,
+        "eager_heavy_imports": eager,
+        "ok": total_us / 1000 <= budget_ms and not eager,
+        "slowest": [
+            {"module": name, "self_ms": round(own / 1000, 1), "cumulative_ms": round(cumulative / 1000, 1)}
+            for name, own, cumulative in [row for row in slowest if row[0] != module][:top]
+        ],
+    }
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Check the import-time budget of the API entry point.")
+    parser.add_argument("--module", default="app.api.main")
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args(argv)
+    report = check_import_budget(args.module, args.budget_ms, args.top)
+    print(json.dumps(report, indent=2))
+    if report["eager_heavy_imports"]:
+        print(f"{args.module} imports lazy dependencies eagerly: {', '.join(report['eager_heavy_imports'])}",
+              file=sys.stderr)
+    if report["total_ms"] > args.budget_ms:
+        print(f"{args.module} import took {report['total_ms']} ms (budget {args.budget_ms} ms)", file=sys.stderr)
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,529 @@
+"""Persistent job queue for asynchronous extractions (`POST /jobs`), on a local SQLite file in WAL mode.
+
+Each uploaded PDF is one item. Workers claim items with a lease (visibility timeout) that they keep
+extending while the extraction runs; an item whose lease expires (worker crashed, container killed)
+becomes claimable again, up to JOB_MAX_ATTEMPTS. Failed extractions are retried with exponential
+backoff. Uploaded files live in JOB_SPOOL_DIR until their item reaches a final state.
+
+Workers run as threads inside each API worker (JOB_WORKERS) or standalone:
+
+    python -m app.services.job_queue --workers 2
+
+Either way a worker thread only claims items and waits: the extraction itself is submitted to the
+ExtractionExecutor (OCR process pool, lanes, single-flight) on an event loop, never run in the thread.
+"""
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import os
+import shutil
+import socket
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+from app.services.extraction_executor import get_extraction_executor, shutdown_extraction_executor
+from app.services.extractor import extract_from_pdf
+from app.services.metrics import METRICS, observe_error, observe_trace, traced_call
+
+JOB_QUEUE_PATH = os.environ.get("JOB_QUEUE_PATH") or os.path.join(tempfile.gettempdir(), "extractor-jobs", "jobs.sqlite")
+JOB_SPOOL_DIR = os.environ.get("JOB_SPOOL_DIR") or os.path.join(os.path.dirname(JOB_QUEUE_PATH), "files")
+JOB_WORKERS = max(0, int(os.environ.get("JOB_WORKERS", "1")))
+JOB_VISIBILITY_TIMEOUT = float(os.environ.get("JOB_VISIBILITY_TIMEOUT", "300"))
+JOB_MAX_ATTEMPTS = max(1, int(os.environ.get("JOB_MAX_ATTEMPTS", "3")))
+JOB_RETRY_BACKOFF_SECONDS = float(os.environ.get("JOB_RETRY_BACKOFF_SECONDS", "5"))
+JOB_POLL_SECONDS = float(os.environ.get("JOB_POLL_SECONDS", "1"))
+JOB_RETENTION_SECONDS = int(os.environ.get("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+
+FINAL_STATUSES = ("ok", "error")
+
+_HOST = socket.gethostname()
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except Exception:
+        return True
+    return True
+
+
+class JobQueue:
+    """SQLite-backed job/item store with leases; a connection per operation, safe across processes."""
+
+    def __init__(
+        self,
+        path: str = JOB_QUEUE_PATH,
+        spool_dir: str = JOB_SPOOL_DIR,
+        visibility_timeout: float = JOB_VISIBILITY_TIMEOUT,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+        retry_backoff: float = JOB_RETRY_BACKOFF_SECONDS,
+    ):
+        self.path = path
+        self.spool_dir = spool_dir
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self._schema_ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._schema_ready:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        if not self._schema_ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, vendor_hint TEXT, use_ocr_hint TEXT, cfg_path TEXT NOT NULL, "
+                "count INTEGER NOT NULL, created REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS items ("
+                "job_id TEXT NOT NULL, idx INTEGER NOT NULL, filename TEXT, path TEXT, status TEXT NOT NULL, "
+                "attempts INTEGER NOT NULL DEFAULT 0, available_at REAL NOT NULL, lease_until REAL, worker TEXT, "
+                "result TEXT, error TEXT, updated REAL NOT NULL, PRIMARY KEY (job_id, idx))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS items_ready ON items(status, available_at)")
+            self._schema_ready = True
+        return conn
+
+    def enqueue(
+        self,
+        files: Iterable[Tuple[str, Optional[Union[str, bytes]], Optional[str]]],
+        vendor_hint: Optional[str] = None,
+        use_ocr_hint: Optional[bool] = None,
+        cfg_path: str = "vendors.yaml",
+    ) -> str:
+        """Creates a job from (filename, source, error) entries; sources (temp paths or in-memory bytes)
+        are moved/written into the spool dir.
+
+        Entries with an error (e.g. not a PDF) are stored already failed so results keep input order.
+        `files` may be a lazy iterator (archive entries): each source is spooled as it is produced.
+        """
+        job_id = uuid.uuid4().hex
+        os.makedirs(self.spool_dir, exist_ok=True)
+        now = time.time()
+        rows = []
+        try:
+            for idx, (filename, source, error) in enumerate(files):
+                path = None
+                if source and not error:
+                    path = os.path.join(self.spool_dir, f"{job_id}-{idx}.pdf")
+                    if isinstance(source, bytes):
+                        with open(path, "wb") as f:
+                            f.write(source)
+                    else:
+                        shutil.move(source, path)
+                status = "error" if error or not path else "queued"
+                rows.append((job_id, idx, filename, path, status, now, error, now))
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute(
+                    "INSERT INTO jobs (id, vendor_hint, use_ocr_hint, cfg_path, count, created) VALUES (?, ?, ?, ?, ?, ?)",
+                    (job_id, vendor_hint, None if use_ocr_hint is None else str(bool(use_ocr_hint)), cfg_path, len(rows), now),
+                )
+                conn.executemany(
+                    "INSERT INTO items (job_id, idx, filename, path, status, available_at, error, updated) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                conn.execute("COMMIT")
+            finally:
+                conn.close()
+        except BaseException:
+            # No job row was committed: nothing would ever claim (or drop) the files spooled so far.
+            for name in os.listdir(self.spool_dir):
+                if name.startswith(f"{job_id}-"):
+                    self._drop_file(os.path.join(self.spool_dir, name))
+            raise
+        return job_id
+
+    def claim(self, worker: str) -> Optional[Dict[str, Any]]:
+        """Leases the next ready item (queued, or running with an expired lease) to `worker`."""
+        conn = self._connect()
+        try:
+            while True:
+                now = time.time()
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute(
+                    "SELECT i.job_id, i.idx, i.filename, i.path, i.status, i.attempts, "
+                    "j.vendor_hint, j.use_ocr_hint, j.cfg_path "
+                    "FROM items i JOIN jobs j ON j.id = i.job_id "
+                    "WHERE (i.status = 'queued' AND i.available_at <= ?) OR (i.status = 'running' AND i.lease_until < ?) "
+                    "ORDER BY i.available_at, i.job_id, i.idx LIMIT 1",
+                    (now, now),
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                job_id, idx, filename, path, status, attempts, vendor_hint, use_ocr_hint, cfg_path = row
+                if status == "running" and attempts >= self.max_attempts:
+                    conn.execute(
+                        "UPDATE items SET status = 'error', error = ?, lease_until = NULL, updated = ? "
+                        "WHERE job_id = ? AND idx = ?",
+                        (f"lease expired after {attempts} attempts", now, job_id, idx),
+                    )
+                    conn.execute("COMMIT")
+                    self._drop_file(path)
+                    continue
+                conn.execute(
+                    "UPDATE items SET status = 'running', attempts = attempts + 1, lease_until = ?, worker = ?, "
+                    "updated = ? WHERE job_id = ? AND idx = ?",
+                    (now + self.visibility_timeout, worker, now, job_id, idx),
+                )
+                conn.execute("COMMIT")
+                return {
+                    "job_id": job_id,
+                    "idx": idx,
+                    "filename": filename,
+                    "path": path,
+                    "attempt": attempts + 1,
+                    "vendor_hint": vendor_hint,
+                    "use_ocr_hint": None if use_ocr_hint is None else use_ocr_hint == "True",
+                    "cfg_path": cfg_path,
+                }
+        finally:
+            conn.close()
+
+    def _update_owned(self, item: Dict[str, Any], worker: str, sql: str, params: Tuple[Any, ...]) -> bool:
+        """Runs an UPDATE only while `worker` still holds the lease (a reclaimed item is not overwritten)."""
+        conn = self._connect()
+        try:
+            cur = conn.execute(
+                sql + " WHERE job_id = ? AND idx = ? AND status = 'running' AND worker = ?",
+                params + (item["job_id"], item["idx"], worker),
+            )
+            return cur.rowcount == 1
+        finally:
+            conn.close()
+
+    def heartbeat(self, item: Dict[str, Any], worker: str) -> bool:
+        return self._update_owned(item, worker, "UPDATE items SET lease_until = ?", (time.time() + self.visibility_timeout,))
+
+    def complete(self, item: Dict[str, Any], worker: str, result: Dict[str, Any]) -> None:
+        if self._update_owned(
+            item,
+            worker,
+            "UPDATE items SET status = 'ok', result = ?, error = NULL, lease_until = NULL, updated = ?",
+            (json.dumps(result, ensure_ascii=False), time.time()),
+        ):
+            self._drop_file(item["path"])
+
+    def fail(self, item: Dict[str, Any], worker: str, error: str) -> None:
+        """Requeues with exponential backoff while attempts remain, otherwise marks the item as failed."""
+        now = time.time()
+        if item["attempt"] < self.max_attempts:
+            delay = self.retry_backoff * (2 ** (item["attempt"] - 1))
+            self._update_owned(
+                item,
+                worker,
+                "UPDATE items SET status = 'queued', available_at = ?, lease_until = NULL, error = ?, updated = ?",
+                (now + delay, error, now),
+            )
+            return
+        if self._update_owned(
+            item, worker, "UPDATE items SET status = 'error', error = ?, lease_until = NULL, updated = ?", (error, now)
+        ):
+            self._drop_file(item["path"])
+
+    def recover_orphans(self) -> int:
+        """Expires the leases held by dead processes of this host, so their items are retried right away."""
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT job_id, idx, worker FROM items WHERE status = 'running'").fetchall()
+            orphans = []
+            for job_id, idx, worker in rows:
+                host, _, rest = (worker or "").partition(":")
+                pid = rest.partition(":")[0]
+                if host == _HOST and pid.isdigit() and not _pid_alive(int(pid)):
+                    orphans.append((job_id, idx, worker))
+            for job_id, idx, worker in orphans:
+                conn.execute(
+                    "UPDATE items SET lease_until = 0 WHERE job_id = ? AND idx = ? AND status = 'running' AND worker = ?",
+                    (job_id, idx, worker),
+                )
+            return len(orphans)
+        finally:
+            conn.close()
+
+    def _drop_file(self, path: Optional[str]) -> None:
+        if path:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _item_out(filename: str, status: str, result: Optional[str], error: Optional[str]) -> Dict[str, Any]:
+        if status == "ok":
+            return {"file": filename, "status": "ok", "data": json.loads(result or "{}")}
+        return {"file": filename, "status": "error", "error": error}
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job status with per-status counts and the results finished so far, in input order."""
+        conn = self._connect()
+        try:
+            job = conn.execute("SELECT count, created FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if job is None:
+                return None
+            rows = conn.execute(
+                "SELECT filename, status, result, error FROM items WHERE job_id = ? ORDER BY idx", (job_id,)
+            ).fetchall()
+        finally:
+            conn.close()
+        counts = {"queued": 0, "running": 0, "ok": 0, "error": 0}
+        for _, status, _, _ in rows:
+            counts[status] += 1
+        if counts["queued"] + counts["running"] == 0:
+            status = "done"
+        elif counts["running"] or counts["ok"] or counts["error"]:
+            status = "running"
+        else:
+            status = "queued"
+        return {
+            "job_id": job_id,
+            "status": status,
+            "count": job[0],
+            "created": job[1],
+            **counts,
+            "results": [self._item_out(*row) for row in rows if row[1] in FINAL_STATUSES],
+        }
+
+    def iter_results(self, job_id: str, follow: bool = False, poll: float = JOB_POLL_SECONDS) -> Iterator[Dict[str, Any]]:
+        """Yields finished items as they complete (each once, tagged with `index`); `follow` waits for the rest."""
+        sent = set()
+        while True:
+            conn = self._connect()
+            try:
+                rows = conn.execute(
+                    "SELECT idx, filename, status, result, error FROM items WHERE job_id = ? ORDER BY updated, idx",
+                    (job_id,),
+                ).fetchall()
+            finally:
+                conn.close()
+            pending = False
+            for idx, filename, status, result, error in rows:
+                if status not in FINAL_STATUSES:
+                    pending = True
+                elif idx not in sent:
+                    sent.add(idx)
+                    yield dict(self._item_out(filename, status, result, error), index=idx)
+            if not (follow and pending):
+                return
+            time.sleep(poll)
+
+    def stats(self) -> Dict[str, Any]:
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT status, COUNT(*) FROM items GROUP BY status").fetchall()
+            jobs = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+        finally:
+            conn.close()
+        counts = {"queued": 0, "running": 0, "ok": 0, "error": 0}
+        counts.update(dict(rows))
+        return {"jobs": jobs, "items": counts}
+
+    def purge(self, older_than: float = JOB_RETENTION_SECONDS) -> int:
+        """Deletes finished jobs created more than `older_than` seconds ago."""
+        cutoff = time.time() - older_than
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            ids = [
+                row[0]
+                for row in conn.execute(
+                    "SELECT id FROM jobs WHERE created < ? AND NOT EXISTS "
+                    "(SELECT 1 FROM items WHERE job_id = jobs.id AND status IN ('queued', 'running'))",
+                    (cutoff,),
+                )
+            ]
+            for job_id in ids:
+                conn.execute("DELETE FROM items WHERE job_id = ?", (job_id,))
+                conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            conn.execute("COMMIT")
+            return len(ids)
+        finally:
+            conn.close()
+
+
+def run_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Extracts in the calling thread (library use and tests; workers go through `executor_runner`)."""
+    try:
+        minimal, trace = traced_call(
+            extract_from_pdf,
+            item["path"],
+            vendor_hint=item["vendor_hint"],
+            cfg_path=item["cfg_path"],
+            use_ocr_hint=item["use_ocr_hint"],
+        )
+    except Exception as ex:
+        observe_error(ex, item["vendor_hint"])
+        raise
+    observe_trace(trace)
+    return minimal
+
+
+def executor_runner(
+    loop: asyncio.AbstractEventLoop, timeout: Optional[float] = JOB_VISIBILITY_TIMEOUT
+) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """Item runner that submits the extraction to the ExtractionExecutor on `loop` and blocks for the result.
+
+    Items are never shed (`shed=False`): they already waited in the job queue, they wait for a lane slot
+    like batch files do. Metrics are recorded by the executor when the extraction lands. The worker keeps
+    renewing the lease while it waits, so the wait is capped at `timeout` (one lease period, slot wait
+    included): past it the extraction is cancelled and the item fails into its retry backoff.
+    """
+    def extract(item: Dict[str, Any]) -> Dict[str, Any]:
+        future = asyncio.run_coroutine_threadsafe(
+            get_extraction_executor().extract_traced(
+                item["path"],
+                vendor_hint=item["vendor_hint"],
+                cfg_path=item["cfg_path"],
+                use_ocr_hint=item["use_ocr_hint"],
+                shed=False,
+            ),
+            loop,
+        )
+        try:
+            minimal, _ = future.result(timeout=timeout or None)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise TimeoutError(f"extraction took longer than {timeout:g}s (job lease)") from None
+        return minimal
+
+    return extract
+
+
+class JobWorker(threading.Thread):
+    """Claims and processes items until stopped; extends its lease every visibility_timeout / 3 seconds."""
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        number: int = 0,
+        extract: Callable[[Dict[str, Any]], Dict[str, Any]] = run_item,
+        poll: float = JOB_POLL_SECONDS,
+    ):
+        super().__init__(name=f"job-worker-{number}", daemon=True)
+        self.queue = queue
+        self.worker_id = f"{_HOST}:{os.getpid()}:{number}"
+        self.extract = extract
+        self.poll = poll
+        self._stopping = threading.Event()
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    def _keep_lease(self, item: Dict[str, Any], done: threading.Event) -> None:
+        interval = max(1.0, self.queue.visibility_timeout / 3)
+        while not done.wait(interval):
+            if not self.queue.heartbeat(item, self.worker_id):
+                return
+
+    def process(self, item: Dict[str, Any]) -> None:
+        done = threading.Event()
+        keeper = threading.Thread(target=self._keep_lease, args=(item, done), daemon=True)
+        keeper.start()
+        try:
+            result = self.extract(item)
+        except Exception as ex:
+            self.queue.fail(item, self.worker_id, str(ex))
+        else:
+            self.queue.complete(item, self.worker_id, result)
+        finally:
+            done.set()
+
+    def run(self) -> None:
+        last_purge = 0.0
+        while not self._stopping.is_set():
+            try:
+                if time.time() - last_purge > 3600:
+                    last_purge = time.time()
+                    self.queue.recover_orphans()
+                    self.queue.purge()
+                item = self.queue.claim(self.worker_id)
+            except sqlite3.Error:
+                item = None
+            if item is None:
+                self._stopping.wait(self.poll)
+                continue
+            self.process(item)
+
+
+_QUEUE: Optional[JobQueue] = None
+_QUEUE_LOCK = threading.Lock()
+_WORKERS: List[JobWorker] = []
+
+
+def get_job_queue() -> JobQueue:
+    global _QUEUE
+    if _QUEUE is None:
+        with _QUEUE_LOCK:
+            if _QUEUE is None:
+                _QUEUE = JobQueue()
+    return _QUEUE
+
+
+def _job_items_gauge() -> Dict[Tuple[str, ...], float]:
+    if _QUEUE is None:
+        return {}
+    return {(status,): count for status, count in _QUEUE.stats()["items"].items()}
+
+
+METRICS.gauge("extractor_job_items", "Job queue items by status (queued/running/ok/error).", ["status"], _job_items_gauge)
+
+
+def start_job_workers(count: int = JOB_WORKERS, loop: Optional[asyncio.AbstractEventLoop] = None) -> List[JobWorker]:
+    """Starts `count` worker threads in this process (idempotent), extracting on `loop`'s executor.
+
+    Without `loop` (called from a coroutine, e.g. the API lifespan) the running loop is used.
+    """
+    loop = loop or asyncio.get_running_loop()
+    queue = get_job_queue()
+    with _QUEUE_LOCK:
+        if not _WORKERS:
+            for number in range(count):
+                worker = JobWorker(queue, number, extract=executor_runner(loop, queue.visibility_timeout))
+                worker.start()
+                _WORKERS.append(worker)
+    return list(_WORKERS)
+
+
+def stop_job_workers() -> None:
+    with _QUEUE_LOCK:
+        workers = list(_WORKERS)
+        _WORKERS.clear()
+    for worker in workers:
+        worker.stop()
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Process queued extraction jobs outside the API.")
+    parser.add_argument("--workers", type=int, default=max(1, JOB_WORKERS))
+    args = parser.parse_args(argv)
+    # The executor's lanes live on an event loop: run one in a background thread for the workers.
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="job-executor-loop", daemon=True).start()
+    workers = start_job_workers(args.workers, loop)
+    print(f"{len(workers)} job workers on {get_job_queue().path}", file=sys.stderr)
+    try:
+        while any(worker.is_alive() for worker in workers):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stop_job_workers()
+    finally:
+        shutdown_extraction_executor()
+        loop.call_soon_threadsafe(loop.stop)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+"""Persisted cache of `PdfLineReader` output (normalized lines + used_ocr), separate from parsing.
+
+Handlers, normalization rules and vendors.yaml can change without invalidating it: only the PDF
+bytes, the reader settings and the reader code itself are part of the key. Entries are stored as
+zlib-compressed JSON in a local SQLite file (positioned tokens, when the reader produced them, in a
+side table), and `iter_entries` lets `reextract` rerun parsing over
+the whole cached corpus without OCR.
+"""
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+
+from app.services.metrics import trace_count
+from app.services.page_tokens import TokenStore
+
+LINE_CACHE_ENABLED = os.environ.get("LINE_CACHE_ENABLED", "1").lower() in ("1", "true", "yes")
+LINE_CACHE_PATH = os.environ.get("LINE_CACHE_PATH") or os.path.join(
+    tempfile.gettempdir(), "extractor-cache", "lines.sqlite"
+)
+LINE_CACHE_MAX_MB = float(os.environ.get("LINE_CACHE_MAX_MB", "512"))
+LINE_CACHE_TTL_SECONDS = int(os.environ.get("LINE_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+
+_SERVICES_DIR = os.path.dirname(os.path.abspath(__file__))
+_READER_SOURCES = ("pdf_reader.py", "page_tokens.py", "text_utils.py")
+
+_READER_CODE_FINGERPRINT: Optional[str] = None
+
+
+def reader_code_fingerprint() -> str:
+    """Hash of the reader sources, so a change in OCR/normalization code re-reads the PDFs."""
+    global _READER_CODE_FINGERPRINT
+    if _READER_CODE_FINGERPRINT is None:
+        digest = hashlib.sha256()
+        for name in _READER_SOURCES:
+            with open(os.path.join(_SERVICES_DIR, name), "rb") as f:
+                digest.update(f.read())
+        _READER_CODE_FINGERPRINT = digest.hexdigest()[:16]
+    return _READER_CODE_FINGERPRINT
+
+
+def _pack(lines: List[str], used_ocr: bool, debug: Dict[str, Any]) -> bytes:
+    payload = {"lines": lines, "used_ocr": bool(used_ocr), "debug": debug}
+    return zlib.compress(json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 6)
+
+
+def _unpack(blob: bytes) -> Tuple[List[str], bool, Dict[str, Any]]:
+    payload = json.loads(zlib.decompress(blob).decode("utf-8"))
+    return payload["lines"], bool(payload["used_ocr"]), payload.get("debug") or {}
+
+
+class LineCache:
+    """SQLite-backed store of reader output. Failures never break an extraction."""
+
+    def __init__(
+        self,
+        path: str = LINE_CACHE_PATH,
+        max_mb: float = LINE_CACHE_MAX_MB,
+        ttl_seconds: int = LINE_CACHE_TTL_SECONDS,
+    ):
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "errors": 0}
+        self._schema_ready = False
+
+    @staticmethod
+    def make_key(
+        pdf_sha256: str,
+        reader_fingerprint: str,
+        use_ocr_hint: Optional[bool],
+        regions: Optional[List[Dict[str, Any]]] = None,
+    ) -> str:
+        parts = [
+            pdf_sha256,
+            reader_fingerprint,
+            reader_code_fingerprint(),
+            "none" if use_ocr_hint is None else str(bool(use_ocr_hint)),
+            json.dumps(regions, sort_keys=True) if regions else "",
+        ]
+        return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5)
+        if not self._schema_ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS lines ("
+                "key TEXT PRIMARY KEY, pdf_sha256 TEXT NOT NULL, reader TEXT NOT NULL, "
+                "source TEXT, vendor_hint TEXT, use_ocr_hint TEXT, blob BLOB NOT NULL, created REAL NOT NULL, "
+                "size INTEGER NOT NULL DEFAULT 0, accessed REAL NOT NULL DEFAULT 0)"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS tokens (key TEXT PRIMARY KEY, blob BLOB NOT NULL)")
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(lines)")}
+            if "accessed" not in columns:
+                # Files written before eviction existed: backfill size (lines + tokens) and recency.
+                conn.execute("ALTER TABLE lines ADD COLUMN size INTEGER NOT NULL DEFAULT 0")
+                conn.execute("ALTER TABLE lines ADD COLUMN accessed REAL NOT NULL DEFAULT 0")
+                conn.execute(
+                    "UPDATE lines SET accessed = created, size = length(blob) + "
+                    "COALESCE((SELECT length(t.blob) FROM tokens t WHERE t.key = lines.key), 0)"
+                )
+                conn.commit()
+            conn.execute("CREATE INDEX IF NOT EXISTS lines_accessed ON lines(accessed)")
+            self._schema_ready = True
+        return conn
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+        trace_count(f"line_cache_{name}")
+
+    def get(self, key: str) -> Optional[Tuple[List[str], bool, Dict[str, Any], Optional[TokenStore]]]:
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT l.blob, t.blob, l.created FROM lines l LEFT JOIN tokens t ON t.key = l.key WHERE l.key = ?",
+                    (key,),
+                ).fetchone()
+                now = time.time()
+                if row is not None and self.ttl_seconds and now - row[2] > self.ttl_seconds:
+                    self._delete(conn, [key])
+                    conn.commit()
+                    row = None
+                elif row is not None:
+                    conn.execute("UPDATE lines SET accessed = ? WHERE key = ?", (now, key))
+                    conn.commit()
+            finally:
+                conn.close()
+        except Exception:
+            self._count("errors")
+            return None
+        if row is None:
+            self._count("misses")
+            return None
+        self._count("hits")
+        lines, used_ocr, debug = _unpack(row[0])
+        return lines, used_ocr, debug, TokenStore.from_bytes(row[1]) if row[1] is not None else None
+
+    def put(
+        self,
+        key: str,
+        pdf_sha256: str,
+        reader_fingerprint: str,
+        lines: List[str],
+        used_ocr: bool,
+        debug: Dict[str, Any],
+        source: Optional[str] = None,
+        vendor_hint: Optional[str] = None,
+        use_ocr_hint: Optional[bool] = None,
+        tokens: Optional[TokenStore] = None,
+    ) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            blob = _pack(lines, used_ocr, debug)
+            tokens_blob = tokens.to_bytes() if tokens else None
+            conn = self._connect()
+            try:
+                now = time.time()
+                conn.execute(
+                    "INSERT OR REPLACE INTO lines "
+                    "(key, pdf_sha256, reader, source, vendor_hint, use_ocr_hint, blob, created, size, accessed) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        key,
+                        pdf_sha256,
+                        reader_fingerprint,
+                        source,
+                        (vendor_hint or "").upper() or None,
+                        None if use_ocr_hint is None else str(bool(use_ocr_hint)),
+                        blob,
+                        now,
+                        len(blob) + len(tokens_blob or b""),
+                        now,
+                    ),
+                )
+                if tokens_blob is not None:
+                    conn.execute("INSERT OR REPLACE INTO tokens (key, blob) VALUES (?, ?)", (key, tokens_blob))
+                else:
+                    conn.execute("DELETE FROM tokens WHERE key = ?", (key,))
+                self._evict(conn, now)
+                conn.commit()
+            finally:
+                conn.close()
+            self._count("stores")
+        except Exception:
+            self._count("errors")
+
+    @staticmethod
+    def _delete(conn: sqlite3.Connection, keys: List[str]) -> None:
+        conn.executemany("DELETE FROM lines WHERE key = ?", [(key,) for key in keys])
+        conn.executemany("DELETE FROM tokens WHERE key = ?", [(key,) for key in keys])
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        """Drops expired reads, then least recently used ones until lines + tokens fit in max_bytes."""
+        if self.ttl_seconds:
+            expired = conn.execute("SELECT key FROM lines WHERE created < ?", (now - self.ttl_seconds,)).fetchall()
+            self._delete(conn, [key for (key,) in expired])
+        if not self.max_bytes:
+            return
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM lines").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        freed = 0
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM lines ORDER BY accessed ASC"):
+            if total - freed <= self.max_bytes:
+                break
+            doomed.append(key)
+            freed += size
+        self._delete(conn, doomed)
+
+    def iter_entries(self, reader_fingerprint: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Yields every unexpired cached read (optionally only for one reader configuration), oldest first."""
+        if not os.path.exists(self.path):
+            return
+        conn = self._connect()
+        try:
+            query = (
+                "SELECT l.pdf_sha256, l.reader, l.source, l.vendor_hint, l.use_ocr_hint, l.blob, t.blob "
+                "FROM lines l LEFT JOIN tokens t ON t.key = l.key"
+            )
+            query += " WHERE l.created >= ?"
+            params: Tuple[Any, ...] = (time.time() - self.ttl_seconds if self.ttl_seconds else 0,)
+            if reader_fingerprint is not None:
+                query += " AND l.reader = ?"
+                params += (reader_fingerprint,)
+            rows = conn.execute(query + " ORDER BY l.created", params)
+            for sha, reader, source, vendor_hint, use_ocr_hint, blob, tokens_blob in rows:
+                lines, used_ocr, debug = _unpack(blob)
+                yield {
+                    "pdf_sha256": sha,
+                    "reader": reader,
+                    "source": source,
+                    "vendor_hint": vendor_hint,
+                    "use_ocr_hint": None if use_ocr_hint is None else use_ocr_hint == "True",
+                    "lines": lines,
+                    "used_ocr": used_ocr,
+                    "debug": debug,
+                    "layout": TokenStore.from_bytes(tokens_blob) if tokens_blob is not None else None,
+                }
+        finally:
+            conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._counters)
+
+
+_CACHE: Optional[LineCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_line_cache() -> Optional[LineCache]:
+    """Process-wide line cache, or None when LINE_CACHE_ENABLED is off."""
+    global _CACHE
+    if not LINE_CACHE_ENABLED:
+        return None
+    if _CACHE is None:
+        with _CACHE_LOCK:
+            if _CACHE is None:
+                _CACHE = LineCache()
+    return _CACHE
@@ -0,0 +1,334 @@
+"""In-process metrics (counters, gauges, histograms) rendered in the Prometheus text format, plus
+per-extraction traces.
+
+Extraction stages often run in a worker process of the OCR lane, so they are not recorded into the
+registry directly: `stage()` / `trace_count()` / `trace_set()` write into the `Trace` active in the
+current thread, the executor returns that trace (a plain dict) with the result, and the API process
+merges it with `observe_trace`. Without an active trace (scripts, batch_processor) the helpers are
+no-ops.
+"""
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+import math
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self.samples()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def values(self) -> Dict[LabelValues, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """Set directly, or computed at scrape time by `callback` (returning {label values: value})."""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        callback: Optional[Callable[[], Dict[LabelValues, float]]] = None,
+    ):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+        self.callback = callback
+
+    def set(self, value: float, **labels: Any) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        if self.callback is not None:
+            try:
+                values.update(self.callback())
+            except Exception:
+                pass
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(v)}" for key, v in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._series.setdefault(key, ([0] * len(self.buckets), [0.0]))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            total[0] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, list(counts), total[0]) for key, (counts, total) in self._series.items())
+        lines: List[str] = []
+        for key, counts, total in series:
+            for bound, count in zip(self.buckets, counts):
+                le = ("le", _format_value(bound))
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {counts[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> Any:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        callback: Optional[Callable[[], Dict[LabelValues, float]]] = None,
+    ) -> Gauge:
+        return self._register(Gauge(name, documentation, labels, callback))
+
+    def histogram(
+        self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+STAGE_SECONDS = METRICS.histogram(
+    "extractor_stage_seconds", "Duration of each extraction stage (OCR per page/region).", ["stage"]
+)
+EXTRACTIONS = METRICS.counter(
+    "extractor_extractions_total", "Finished extractions by vendor, path and status.", ["vendor", "path", "status"]
+)
+ERRORS = METRICS.counter("extractor_errors_total", "Failed extractions by error class.", ["error_class"])
+PAGES = METRICS.counter("extractor_pages_total", "PDF pages read, by path (text layer or OCR).", ["path"])
+CACHE_HITS = METRICS.counter("extractor_cache_hits_total", "Extraction cache hits by tier.", ["cache"])
+CACHE_EVENTS = METRICS.counter(
+    "extractor_cache_events_total", "Cache lookups, stores and errors by tier and event.", ["cache", "event"]
+)
+HTTP_IN_FLIGHT = METRICS.gauge("extractor_http_requests_in_flight", "HTTP requests being served by this worker.")
+HTTP_IN_FLIGHT.set(0)
+HTTP_SECONDS = METRICS.histogram(
+    "extractor_http_request_seconds", "HTTP request latency by route and status.", ["method", "route", "status"]
+)
+
+
+class Trace:
+    """Stage durations, counters and attributes of one extraction; thread-safe (OCR page workers)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.stages: Dict[str, List[float]] = {}
+        self.counters: Dict[str, float] = {}
+        self.attrs: Dict[str, Any] = {}
+
+    def observe(self, stage_name: str, seconds: float) -> None:
+        with self._lock:
+            self.stages.setdefault(stage_name, []).append(seconds)
+
+    def count(self, name: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0.0) + amount
+
+    def set(self, name: str, value: Any) -> None:
+        with self._lock:
+            self.attrs[name] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "stages": {name: list(values) for name, values in self.stages.items()},
+                "counters": dict(self.counters),
+                "attrs": dict(self.attrs),
+            }
+
+
+_local = threading.local()
+
+
+def current_trace() -> Optional[Trace]:
+    return getattr(_local, "trace", None)
+
+
+@contextmanager
+def use_trace(trace: Optional[Trace]) -> Iterator[Optional[Trace]]:
+    """Makes `trace` the active one in this thread (e.g. inside an OCR page worker thread)."""
+    previous = current_trace()
+    _local.trace = trace
+    try:
+        yield trace
+    finally:
+        _local.trace = previous
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    trace = current_trace()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.observe(name, time.perf_counter() - started)
+
+
+@contextmanager
+def record_stage(name: str, into: Optional[Dict[str, float]] = None) -> Iterator[None]:
+    """Times a stage that runs in the API process itself (upload, formatting) straight into the histogram.
+
+    `into` also accumulates the seconds under `name` (per-request debug / Server-Timing).
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        if into is not None:
+            into[name] = into.get(name, 0.0) + elapsed
+
+
+def trace_count(name: str, amount: float = 1.0) -> None:
+    trace = current_trace()
+    if trace is not None:
+        trace.count(name, amount)
+
+
+def trace_set(name: str, value: Any) -> None:
+    trace = current_trace()
+    if trace is not None:
+        trace.set(name, value)
+
+
+def observe_trace(trace: Dict[str, Any]) -> None:
+    """Merges a finished extraction trace (`Trace.to_dict()`) into the process registry."""
+    for name, values in trace.get("stages", {}).items():
+        for seconds in values:
+            STAGE_SECONDS.observe(seconds, stage=name)
+    counters = trace.get("counters", {})
+    for path in ("text", "ocr"):
+        if counters.get(f"{path}_pages"):
+            PAGES.inc(counters[f"{path}_pages"], path=path)
+    for cache in ("result", "line"):
+        if counters.get(f"{cache}_cache_hit"):
+            CACHE_HITS.inc(counters[f"{cache}_cache_hit"], cache=cache)
+        prefix = f"{cache}_cache_"
+        for name, amount in counters.items():
+            if name.startswith(prefix) and name != f"{cache}_cache_hit":
+                CACHE_EVENTS.inc(amount, cache=cache, event=name[len(prefix):])
+    attrs = trace.get("attrs", {})
+    if counters.get("result_cache_hit"):
+        path = "cache"
+    else:
+        path = "ocr" if attrs.get("used_ocr") else "text"
+    EXTRACTIONS.inc(vendor=attrs.get("vendor") or "UNKNOWN", path=path, status="ok")
+
+
+def cache_event_totals(cache: str) -> Dict[str, int]:
+    """Merged cache counters of one tier, as reported by the traces of every extraction of this worker."""
+    return {event: int(value) for (tier, event), value in CACHE_EVENTS.values().items() if tier == cache}
+
+
+def observe_error(error: BaseException, vendor_hint: Optional[str] = None) -> None:
+    ERRORS.inc(error_class=type(error).__name__)
+    EXTRACTIONS.inc(vendor=(vendor_hint or "UNKNOWN").upper(), path="unknown", status="error")
+
+
+def traced_call(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Tuple[Any, Dict[str, Any]]:
+    """Runs `fn` under a fresh trace (picklable entry point for the OCR process pool)."""
+    trace = Trace()
+    with use_trace(trace):
+        result = fn(*args, **kwargs)
+    return result, trace.to_dict()
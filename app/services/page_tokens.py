@@ -0,0 +1,192 @@
+"""Compact, array-backed store of positioned tokens (words) kept alongside the reader lines.
+
+Coordinates are PDF points (1/72 in, origin top-left of the page) for both sources: tesseract word
+boxes are scaled from pixels, fitz words already are in points. Each token remembers the index of the
+reader line it was flushed into, so handlers can jump from "line i has the label" to "the number right
+of that label on the same baseline" with dictionary lookups instead of windowed rescans.
+"""
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+import struct
+import zlib
+
+from app.services.text_utils import NUM_ANY, parse_number_smart
+
+# Height (points) of the row buckets used for same-baseline lookups.
+ROW_BUCKET_PT = 4.0
+
+_ARRAYS = (
+    ("page", "H"),
+    ("block", "H"),
+    ("line", "H"),
+    ("line_idx", "i"),
+    ("x0", "f"),
+    ("y0", "f"),
+    ("x1", "f"),
+    ("y1", "f"),
+    ("conf", "b"),
+    ("starts", "I"),
+    ("ends", "I"),
+)
+
+
+def _label_key(text: str) -> str:
+    return text.upper().strip(" :.$")
+
+
+class TokenStore:
+    """Tokens as parallel typed arrays plus one text buffer; indexes are built lazily on first query."""
+
+    def __init__(self) -> None:
+        for name, code in _ARRAYS:
+            setattr(self, name, array(code))
+        self._chunks: List[str] = []
+        self._size = 0
+        self._text: Optional[str] = None
+        self._rows: Optional[Dict[Tuple[int, int], List[int]]] = None
+        self._by_line: Optional[Dict[int, List[int]]] = None
+
+    def __len__(self) -> int:
+        return len(self.page)
+
+    def add(
+        self,
+        page: int,
+        block: int,
+        line: int,
+        line_idx: int,
+        bbox: Tuple[float, float, float, float],
+        conf: int,
+        text: str,
+    ) -> None:
+        self.page.append(max(0, min(page, 0xFFFF)))
+        self.block.append(max(0, min(block, 0xFFFF)))
+        self.line.append(max(0, min(line, 0xFFFF)))
+        self.line_idx.append(line_idx)
+        self.x0.append(bbox[0])
+        self.y0.append(bbox[1])
+        self.x1.append(bbox[2])
+        self.y1.append(bbox[3])
+        self.conf.append(max(-1, min(int(conf), 100)))
+        self.starts.append(self._size)
+        self._chunks.append(text)
+        self._size += len(text)
+        self.ends.append(self._size)
+        self._text = None
+        self._rows = None
+        self._by_line = None
+
+    def extend(self, other: "TokenStore", line_offset: int = 0) -> None:
+        """Appends another store (e.g. the next page), shifting its line indexes by `line_offset`."""
+        for i in range(len(other)):
+            line_idx = other.line_idx[i]
+            self.add(
+                other.page[i],
+                other.block[i],
+                other.line[i],
+                line_idx + line_offset if line_idx >= 0 else -1,
+                other.bbox(i),
+                other.conf[i],
+                other.text(i),
+            )
+
+    def _buffer(self) -> str:
+        if self._text is None:
+            self._text = "".join(self._chunks)
+            self._chunks = [self._text]
+        return self._text
+
+    def text(self, i: int) -> str:
+        return self._buffer()[self.starts[i]:self.ends[i]]
+
+    def bbox(self, i: int) -> Tuple[float, float, float, float]:
+        return self.x0[i], self.y0[i], self.x1[i], self.y1[i]
+
+    def _index(self) -> None:
+        rows: Dict[Tuple[int, int], List[int]] = {}
+        by_line: Dict[int, List[int]] = {}
+        for i in range(len(self)):
+            center = (self.y0[i] + self.y1[i]) / 2
+            rows.setdefault((self.page[i], int(center // ROW_BUCKET_PT)), []).append(i)
+            if self.line_idx[i] >= 0:
+                by_line.setdefault(self.line_idx[i], []).append(i)
+        self._rows = rows
+        self._by_line = by_line
+
+    def tokens_on_line(self, line_idx: int) -> List[int]:
+        if self._by_line is None:
+            self._index()
+        return list(self._by_line.get(line_idx, ()))  # type: ignore[union-attr]
+
+    def same_baseline(self, i: int) -> List[int]:
+        """Tokens of the same page whose vertical center is within half a token height of token i, by x."""
+        if self._rows is None:
+            self._index()
+        center = (self.y0[i] + self.y1[i]) / 2
+        tol = max(1.0, (self.y1[i] - self.y0[i]) / 2)
+        first = int((center - tol) // ROW_BUCKET_PT)
+        last = int((center + tol) // ROW_BUCKET_PT)
+        found: List[int] = []
+        for bucket in range(first, last + 1):
+            for j in self._rows.get((self.page[i], bucket), ()):  # type: ignore[union-attr]
+                if abs((self.y0[j] + self.y1[j]) / 2 - center) <= tol:
+                    found.append(j)
+        found.sort(key=lambda j: self.x0[j])
+        return found
+
+    def find_label(self, keyword: str, line_idx: Optional[int] = None) -> Optional[int]:
+        """Index of the last token containing `keyword` (on reader line `line_idx` when given)."""
+        needle = keyword.upper()
+        candidates: Iterable[int] = self.tokens_on_line(line_idx) if line_idx is not None else range(len(self))
+        match = None
+        for i in candidates:
+            if needle in _label_key(self.text(i)):
+                match = i
+        return match
+
+    def value_right_of(self, keyword: str, line_idx: Optional[int] = None, last: bool = False) -> Optional[str]:
+        """First (or `last`) amount to the right of the label on the same baseline (percentages are skipped)."""
+        label = self.find_label(keyword, line_idx)
+        if label is None:
+            return None
+        row = [j for j in self.same_baseline(label) if j != label and self.x0[j] >= self.x1[label] - 1.0]
+        found = None
+        for pos, j in enumerate(row):
+            token = self.text(j)
+            if "%" in token or (pos + 1 < len(row) and self.text(row[pos + 1]).startswith("%")):
+                continue
+            match = NUM_ANY.search(token)
+            if match:
+                found = match.group(0)
+                if not last:
+                    break
+        return found
+
+    def amount_right_of(self, keyword: str, line_idx: Optional[int] = None, last: bool = False) -> Optional[float]:
+        value = self.value_right_of(keyword, line_idx, last)
+        return parse_number_smart(value) if value is not None else None
+
+    def to_bytes(self) -> bytes:
+        """Compact serialization (zlib over the raw arrays) for the line cache."""
+        parts = [struct.pack("<I", len(self))]
+        for name, _ in _ARRAYS:
+            parts.append(getattr(self, name).tobytes())
+        parts.append(self._buffer().encode("utf-8"))
+        return zlib.compress(b"".join(parts), 6)
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> "TokenStore":
+        raw = zlib.decompress(blob)
+        (count,) = struct.unpack_from("<I", raw, 0)
+        offset = 4
+        store = cls()
+        for name, code in _ARRAYS:
+            arr = array(code)
+            size = arr.itemsize * count
+            arr.frombytes(raw[offset:offset + size])
+            setattr(store, name, arr)
+            offset += size
+        store._text = raw[offset:].decode("utf-8")
+        store._chunks = [store._text]
+        store._size = len(store._text)
+        return store
@@ -1,10 +1,21 @@
-"""PDF readers: plain text extraction (fitz) and OCR (pdf2image + pytesseract)."""
-from typing import Any, List, Optional, Tuple
+"""PDF readers: plain text extraction (fitz) and OCR (fitz pixmaps or pdf2image + pytesseract).
+
+Every reader accepts a `PdfSource`: a file path, or the PDF bytes themselves for uploads kept in memory.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+import importlib.util
+import math
 import os
 import platform
+import queue
+import re
 import shutil
+import threading
 
-from app.services.text_utils import norm_line
+from app.services.metrics import current_trace, stage, trace_count, use_trace
+from app.services.page_tokens import TokenStore
+from app.services.text_utils import NUM_ANY, RE_CUIT, norm_line
 
 def _import_fitz():
     try:
@@ -15,10 +26,18 @@ def _import_fitz():
 
 def _import_pdf2image():
     try:
-        from pdf2image import convert_from_path as _convert
-        return _convert
+        from pdf2image import convert_from_bytes as _from_bytes, convert_from_path as _convert
+        return _convert, _from_bytes
     except Exception:
-        return None
+        return None, None
+
+
+def _import_pdfinfo():
+    try:
+        from pdf2image import pdfinfo_from_bytes as _info_bytes, pdfinfo_from_path as _pdfinfo
+        return _pdfinfo, _info_bytes
+    except Exception:
+        return None, None
 
 
 def _import_pillow_image():
@@ -29,11 +48,84 @@ def _import_pillow_image():
         return None
 
 
-fitz = _import_fitz()
-convert_from_path = _import_pdf2image()
-Image = _import_pillow_image()
+# Heavy dependencies, imported by `load_dependencies()` on first use instead of at import time (cold start);
+# the worker warm-up calls it explicitly.
+fitz: Any = None
+convert_from_path: Any = None
+convert_from_bytes: Any = None
+pdfinfo_from_path: Any = None
+pdfinfo_from_bytes: Any = None
+Image: Any = None
+pytesseract: Any = None
+image_to_data: Any = None
+_DEPS_LOADED = False
+_DEPS_LOCK = threading.Lock()
+
+
+def load_dependencies() -> None:
+    """Imports fitz, pdf2image, PIL and pytesseract (and locates tesseract) once, on first use."""
+    global fitz, convert_from_path, convert_from_bytes, pdfinfo_from_path, pdfinfo_from_bytes, Image
+    global pytesseract, image_to_data, _DEPS_LOADED
+    if _DEPS_LOADED:
+        return
+    with _DEPS_LOCK:
+        if _DEPS_LOADED:
+            return
+        fitz = _import_fitz()
+        convert_from_path, convert_from_bytes = _import_pdf2image()
+        pdfinfo_from_path, pdfinfo_from_bytes = _import_pdfinfo()
+        Image = _import_pillow_image()
+        pytesseract, image_to_data = _load_pytesseract()
+        _DEPS_LOADED = True
+
+
+# A PDF on disk (path) or in memory (bytes of an upload kept in RAM).
+PdfSource = Union[str, bytes]
+
+
+def _open_pdf(source: PdfSource) -> Any:
+    """fitz document from a path or from in-memory bytes (no temp file)."""
+    load_dependencies()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return fitz.open(stream=source, filetype="pdf")
+    return fitz.open(source)
+
 POPPLER_PATH = os.environ.get("POPPLER_PATH")
 
+# "fitz": render pages in-process with PyMuPDF pixmaps; "pdf2image": pdftoppm subprocess.
+# The other backend is used as fallback when the configured one is unavailable or fails.
+RASTERIZER = os.environ.get("PDF_RASTERIZER", "fitz").lower()
+
+# "document": one text/OCR decision for the whole PDF; "hybrid": decided page by page;
+# "roi": OCR only the declared page regions (header band, totals block);
+# "priority": OCR first and last page, and middle pages only if the caller needs them.
+READER_MODE = os.environ.get("PDF_READER_MODE", "document").lower()
+# Pages OCR'd concurrently per request, and cap on concurrent tesseract runs per API worker. The
+# semaphore only exists per process: the extraction executor splits the cap between its OCR child
+# processes with `set_ocr_concurrency` (see EXTRACT_OCR_PROCESSES).
+OCR_PAGE_WORKERS = max(1, int(os.environ.get("OCR_PAGE_WORKERS", "1")))
+OCR_MAX_CONCURRENCY = max(1, int(os.environ.get("OCR_MAX_CONCURRENCY", str(os.cpu_count() or 1))))
+_OCR_SLOTS = threading.BoundedSemaphore(OCR_MAX_CONCURRENCY)
+# "auto": resident libtesseract engine (tesserocr) when installed, else pytesseract CLI per page.
+OCR_ENGINE = os.environ.get("OCR_ENGINE", "auto").lower()
+OCR_LANG = os.environ.get("OCR_LANG", "spa+eng")
+# Generic regions used in "roi" mode when the vendor does not declare `ocr_regions` in vendors.yaml.
+# box = [x0, y0, x1, y1] as fractions of the page size.
+DEFAULT_OCR_REGIONS: List[Dict[str, Any]] = [
+    {"name": "header", "page": "first", "box": [0.0, 0.0, 1.0, 0.4]},
+    {"name": "totals", "page": "last", "box": [0.0, 0.5, 1.0, 1.0]},
+]
+# Adaptive DPI: OCR at OCR_LOW_DPI first and re-OCR at the reader DPI only the pages/regions whose
+# mean confidence on numeric tokens is below OCR_MIN_NUMERIC_CONF.
+OCR_ADAPTIVE_DPI = os.environ.get("OCR_ADAPTIVE_DPI", "0").lower() in ("1", "true", "yes")
+OCR_LOW_DPI = int(os.environ.get("OCR_LOW_DPI", "150"))
+OCR_MIN_NUMERIC_CONF = float(os.environ.get("OCR_MIN_NUMERIC_CONF", "80"))
+# Per-request ceiling (MB) for rendered page images alive at once; 0 disables it. Split across the
+# page workers, a page that would not fit is rendered at a lower DPI (fitz backend).
+OCR_MEMORY_LIMIT_MB = float(os.environ.get("OCR_MEMORY_LIMIT_MB", "0"))
+TEXT_PAGE_MIN_CHARS = int(os.environ.get("TEXT_PAGE_MIN_CHARS", "80"))
+TEXT_PAGE_MIN_VALID_RATIO = float(os.environ.get("TEXT_PAGE_MIN_VALID_RATIO", "0.85"))
+
 
 def _resolve_tesseract_path() -> Optional[str]:
     """Heuristics to locate tesseract."""
@@ -81,7 +173,173 @@ def _load_pytesseract() -> Tuple[Optional[Any], Optional[Any]]:
     return None, None
 
 
-pytesseract, image_to_data = _load_pytesseract()
+_TSV_INT_COLUMNS = ("level", "page_num", "block_num", "par_num", "line_num", "word_num", "left", "top", "width", "height")
+
+
+class PytesseractEngine:
+    """Runs the tesseract CLI per image (temp file + process spawn + traineddata load each call)."""
+
+    name = "pytesseract"
+
+    def image_to_data(self, image: Any) -> Optional[Dict[str, List[Any]]]:
+        if pytesseract is None or image_to_data is None:
+            return None
+        return pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT, lang=OCR_LANG)
+
+    def image_to_string(self, image: Any) -> str:
+        if pytesseract is None:
+            return ""
+        return pytesseract.image_to_string(image, lang=OCR_LANG)
+
+
+def set_ocr_concurrency(limit: int) -> None:
+    """Resizes this process's tesseract slots; called once at start-up (OCR child process initializer)."""
+    global OCR_MAX_CONCURRENCY, _OCR_SLOTS
+    OCR_MAX_CONCURRENCY = max(1, limit)
+    _OCR_SLOTS = threading.BoundedSemaphore(OCR_MAX_CONCURRENCY)
+
+
+class TesserocrEngine:
+    """Long-lived libtesseract handles (tesserocr); language models are loaded once per handle.
+
+    Handles are not thread-safe, so they are pooled and checked out per image. The pool grows
+    lazily up to OCR_MAX_CONCURRENCY handles, which matches this process's OCR slot count.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self, module: Any, size: Optional[int] = None):
+        self._tesserocr = module
+        self._size = max(1, size or OCR_MAX_CONCURRENCY)
+        self._created = 0
+        self._pool: "queue.LifoQueue[Any]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+
+    def _new_api(self) -> Any:
+        kwargs: Dict[str, Any] = {"lang": OCR_LANG}
+        tessdata = os.environ.get("TESSDATA_PREFIX")
+        if tessdata and os.path.isdir(tessdata):
+            kwargs["path"] = tessdata
+        return self._tesserocr.PyTessBaseAPI(**kwargs)
+
+    def _acquire(self) -> Any:
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self._size:
+                self._created += 1
+                try:
+                    return self._new_api()
+                except Exception:
+                    self._created -= 1
+                    raise
+        return self._pool.get()
+
+    def _run(self, image: Any, fn_name: str) -> Any:
+        api = self._acquire()
+        try:
+            api.SetImage(image)
+            return getattr(api, fn_name)()
+        finally:
+            api.Clear()
+            self._pool.put(api)
+
+    def warm_up(self) -> None:
+        """Creates one handle so the traineddata load happens before the first request."""
+        self._pool.put(self._acquire())
+
+    def image_to_data(self, image: Any) -> Optional[Dict[str, List[Any]]]:
+        api = self._acquire()
+        try:
+            api.SetImage(image)
+            api.Recognize()
+            tsv = api.GetTSVText(0)
+        finally:
+            api.Clear()
+            self._pool.put(api)
+        return _parse_tsv(tsv)
+
+    def image_to_string(self, image: Any) -> str:
+        return self._run(image, "GetUTF8Text") or ""
+
+
+def _parse_tsv(tsv: str) -> Dict[str, List[Any]]:
+    """Parses tesseract TSV rows into the same dict layout as pytesseract.Output.DICT."""
+    columns = _TSV_INT_COLUMNS + ("conf", "text")
+    data: Dict[str, List[Any]] = {col: [] for col in columns}
+    for row in (tsv or "").splitlines():
+        parts = row.split("\t")
+        if len(parts) < len(columns) or parts[0] == "level":
+            continue
+        for col, raw in zip(_TSV_INT_COLUMNS, parts):
+            data[col].append(int(raw))
+        data["conf"].append(float(parts[10]))
+        data["text"].append("\t".join(parts[11:]))
+    return data
+
+
+def _build_ocr_engine() -> Optional[Any]:
+    load_dependencies()
+    if OCR_ENGINE in ("auto", "tesserocr"):
+        try:
+            import tesserocr as _tesserocr
+            return TesserocrEngine(_tesserocr)
+        except Exception:
+            if OCR_ENGINE == "tesserocr" and pytesseract is None:
+                return None
+    if pytesseract is not None:
+        return PytesseractEngine()
+    return None
+
+
+_ENGINE: Optional[Any] = None
+_ENGINE_LOCK = threading.Lock()
+
+
+def get_ocr_engine() -> Optional[Any]:
+    """Process-wide OCR engine, created on first use (after fork, so handles are never shared)."""
+    global _ENGINE
+    if _ENGINE is None:
+        with _ENGINE_LOCK:
+            if _ENGINE is None:
+                _ENGINE = _build_ocr_engine()
+    return _ENGINE
+
+
+_ENGINE_NAME: Optional[str] = None
+
+
+def ocr_engine_name() -> str:
+    """Engine `get_ocr_engine` would pick per OCR_ENGINE and the installed modules, without importing
+    or building it (cache keys are computed on the API event loop)."""
+    global _ENGINE_NAME
+    if _ENGINE_NAME is None:
+        if OCR_ENGINE in ("auto", "tesserocr") and importlib.util.find_spec("tesserocr") is not None:
+            _ENGINE_NAME = "tesserocr"
+        elif importlib.util.find_spec("pytesseract") is not None:
+            _ENGINE_NAME = "pytesseract"
+        else:
+            _ENGINE_NAME = "none"
+    return _ENGINE_NAME
+
+
+def ocr_self_test() -> Dict[str, Any]:
+    """OCRs a tiny generated image so the engine, traineddata and tesseract binary are loaded up front."""
+    load_dependencies()
+    engine = get_ocr_engine()
+    if engine is None or Image is None:
+        return {"engine": None, "ok": False}
+    from PIL import ImageDraw
+
+    if hasattr(engine, "warm_up"):
+        engine.warm_up()
+    image = Image.new("L", (240, 48), 255)
+    ImageDraw.Draw(image).text((8, 16), "FACTURA 0001-00001234", fill=0)
+    with _OCR_SLOTS:
+        text = engine.image_to_string(image)
+    return {"engine": engine.name, "ok": True, "text": norm_line(text)}
 
 
 def _normalize_non_empty(lines: List[str]) -> List[str]:
@@ -93,38 +351,318 @@ def _normalize_non_empty(lines: List[str]) -> List[str]:
     return normalized
 
 
-def read_pdf_text(pdf_path: str) -> List[str]:
-    """Extracts text without OCR using fitz."""
+def iter_pdf_text_pages(pdf_path: PdfSource) -> Iterator[List[str]]:
+    """Yields the text-layer lines of each page (fitz), one page at a time."""
+    load_dependencies()
     if fitz is None:
+        return
+    with _open_pdf(pdf_path) as doc:
+        for page in doc:
+            txt = page.get_text("text") or ""
+            yield _normalize_non_empty(txt.splitlines())
+
+
+def _page_word_tokens(page: Any, page_number: int, lines: List[str]) -> TokenStore:
+    """Positioned words of a text-layer page; each (block, line) group is matched to its reader line."""
+    store = TokenStore()
+    groups: Dict[Tuple[int, int], List[Any]] = {}
+    for word in page.get_text("words"):
+        groups.setdefault((word[5], word[6]), []).append(word)
+    cursor = 0
+    for (block, line), words in groups.items():
+        joined = norm_line(" ".join(w[4] for w in words))
+        line_idx = -1
+        for candidate in range(cursor, min(len(lines), cursor + 5)):
+            if lines[candidate] == joined:
+                line_idx = candidate
+                cursor = candidate + 1
+                break
+        for w in words:
+            store.add(page_number, block, line, line_idx, (w[0], w[1], w[2], w[3]), 100, w[4])
+    return store
+
+
+def read_pdf_pages_layout(pdf_path: PdfSource) -> List[Tuple[List[str], TokenStore]]:
+    """Same as `read_pdf_pages`, plus the positioned words of each page."""
+    load_dependencies()
+    if fitz is None:
+        return []
+    try:
+        pages: List[Tuple[List[str], TokenStore]] = []
+        with stage("text_read"), _open_pdf(pdf_path) as doc:
+            for page_number, page in enumerate(doc, start=1):
+                lines = _normalize_non_empty((page.get_text("text") or "").splitlines())
+                pages.append((lines, _page_word_tokens(page, page_number, lines)))
+        trace_count("text_pages", len(pages))
+        return pages
+    except Exception:
         return []
+
+
+def read_pdf_pages(pdf_path: PdfSource) -> List[List[str]]:
+    """Extracts text without OCR using fitz, one list of lines per page."""
+    try:
+        return list(iter_pdf_text_pages(pdf_path))
+    except Exception:
+        return []
+
+
+def read_pdf_text(pdf_path: PdfSource) -> List[str]:
+    """Extracts text without OCR using fitz."""
+    lines: List[str] = []
     try:
-        raw_lines: List[str] = []
-        with fitz.open(pdf_path) as doc:
-            for page in doc:
-                txt = page.get_text("text")
-                if txt:
-                    raw_lines.extend(txt.splitlines())
-        return _normalize_non_empty(raw_lines)
+        for page_lines in iter_pdf_text_pages(pdf_path):
+            lines.extend(page_lines)
     except Exception:
         return []
+    return lines
+
+
+# Characters expected in a sane text layer; broken font encodings show up as symbols/boxes.
+_VALID_TEXT_CHAR = re.compile(r"[\w\s.,:;/$%()\-+#°ºª'\"&*]")
+
+
+def score_text_page(lines: List[str]) -> Dict[str, Any]:
+    """Scores a page text layer to decide if it can be used without OCR."""
+    text = "".join(lines)
+    chars = len(text.replace(" ", ""))
+    valid = len(_VALID_TEXT_CHAR.findall(text.replace(" ", "")))
+    valid_ratio = (valid / chars) if chars else 0.0
+    has_amounts = any(NUM_ANY.search(line) for line in lines)
+    has_cuits = any(RE_CUIT.search(line) for line in lines)
+    usable = (
+        chars >= TEXT_PAGE_MIN_CHARS
+        and valid_ratio >= TEXT_PAGE_MIN_VALID_RATIO
+        and (has_amounts or has_cuits)
+    )
+    return {
+        "chars": chars,
+        "valid_ratio": round(valid_ratio, 3),
+        "has_amounts": has_amounts,
+        "has_cuits": has_cuits,
+        "usable": usable,
+    }
 
 
 def _ocr_dependencies_ready() -> bool:
-    return convert_from_path is not None and pytesseract is not None and Image is not None
+    load_dependencies()
+    rasterizer_ready = fitz is not None or convert_from_path is not None
+    return rasterizer_ready and Image is not None and get_ocr_engine() is not None
+
 
+def _dpi_within_budget(width_pt: float, height_pt: float, dpi: int, max_bytes: Optional[int]) -> int:
+    """Highest DPI <= dpi whose grayscale render of a width x height (points) area fits in max_bytes."""
+    area = width_pt * height_pt
+    if not max_bytes or area <= 0:
+        return dpi
+    return max(1, min(dpi, int(72 * math.sqrt(max_bytes / area))))
 
-def _convert_pdf_to_images(pdf_path: str, dpi: int) -> List[Any]:
+
+def _pixmap_to_image(pix: Any, dpi: int) -> Any:
+    image = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+    image.info["dpi"] = (dpi, dpi)
+    return image
+
+
+def _render_with_fitz(
+    pdf_path: PdfSource,
+    dpi: int,
+    first_page: Optional[int] = None,
+    last_page: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+) -> List[Any]:
+    """Renders pages to grayscale PIL images straight from the pixmap buffer (no subprocess, no temp files)."""
+    load_dependencies()
+    if fitz is None or Image is None:
+        return []
+    try:
+        images: List[Any] = []
+        with _open_pdf(pdf_path) as doc:
+            start = max(1, first_page or 1)
+            end = min(doc.page_count, last_page or doc.page_count)
+            for page_number in range(start, end + 1):
+                page = doc.load_page(page_number - 1)
+                page_dpi = _dpi_within_budget(page.rect.width, page.rect.height, dpi, max_bytes)
+                pix = page.get_pixmap(dpi=page_dpi, colorspace=fitz.csGRAY, alpha=False)
+                images.append(_pixmap_to_image(pix, page_dpi))
+                pix = None
+        return images
+    except Exception:
+        return []
+
+
+def _render_with_pdf2image(
+    pdf_path: PdfSource, dpi: int, first_page: Optional[int] = None, last_page: Optional[int] = None
+) -> List[Any]:
+    load_dependencies()
     if not convert_from_path or not Image:
         return []
     try:
-        kwargs = {"dpi": dpi}
+        kwargs: Dict[str, Any] = {"dpi": dpi}
+        if first_page is not None:
+            kwargs["first_page"] = first_page
+        if last_page is not None:
+            kwargs["last_page"] = last_page
         if POPPLER_PATH:
             kwargs["poppler_path"] = POPPLER_PATH
+        if isinstance(pdf_path, (bytes, bytearray, memoryview)):
+            return convert_from_bytes(bytes(pdf_path), **kwargs)
         return convert_from_path(pdf_path, **kwargs)
     except Exception:
         return []
 
 
+_RASTERIZERS = {"fitz": _render_with_fitz, "pdf2image": _render_with_pdf2image}
+
+
+def _convert_pdf_to_images(
+    pdf_path: PdfSource,
+    dpi: int,
+    first_page: Optional[int] = None,
+    last_page: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+) -> List[Any]:
+    """Renders pages with the configured backend. `max_bytes` (per page) is only honoured by fitz."""
+    primary = RASTERIZER if RASTERIZER in _RASTERIZERS else "fitz"
+    order = [primary] + [name for name in _RASTERIZERS if name != primary]
+    for name in order:
+        if name == "fitz":
+            images = _render_with_fitz(pdf_path, dpi, first_page, last_page, max_bytes=max_bytes)
+        else:
+            images = _RASTERIZERS[name](pdf_path, dpi, first_page, last_page)
+        if images:
+            return images
+    return []
+
+
+def _resolve_region_page(selector: Any, page_count: int) -> Optional[int]:
+    if selector in (None, "first"):
+        number = 1
+    elif selector == "last":
+        number = page_count
+    else:
+        try:
+            number = int(selector)
+        except (TypeError, ValueError):
+            return None
+        if number < 0:
+            number = page_count + 1 + number
+    return number if 1 <= number <= page_count else None
+
+
+def plan_ocr_regions(regions: List[Dict[str, Any]], page_count: int) -> List[Dict[str, Any]]:
+    """Resolves page selectors and merges overlapping boxes of the same page (so no line is OCR'd twice).
+
+    Regions come back in reading order: by page, then top to bottom.
+    """
+    resolved: List[Dict[str, Any]] = []
+    for region in regions:
+        page_number = _resolve_region_page(region.get("page"), page_count)
+        box = [min(1.0, max(0.0, float(v))) for v in (region.get("box") or [0.0, 0.0, 1.0, 1.0])[:4]]
+        if page_number is None or len(box) != 4 or box[2] <= box[0] or box[3] <= box[1]:
+            continue
+        resolved.append({"name": str(region.get("name") or "region"), "page": page_number, "box": box})
+    resolved.sort(key=lambda r: (r["page"], r["box"][1]))
+    merged: List[Dict[str, Any]] = []
+    for region in resolved:
+        prev = merged[-1] if merged else None
+        if prev and prev["page"] == region["page"] and region["box"][1] <= prev["box"][3]:
+            prev["box"] = [
+                min(prev["box"][0], region["box"][0]),
+                prev["box"][1],
+                max(prev["box"][2], region["box"][2]),
+                max(prev["box"][3], region["box"][3]),
+            ]
+            prev["name"] = f"{prev['name']}+{region['name']}"
+            continue
+        merged.append(dict(region))
+    return merged
+
+
+def pdf_page_count(pdf_path: PdfSource) -> int:
+    """Page count without rendering or text extraction (fitz only parses the page tree; poppler as fallback)."""
+    load_dependencies()
+    if fitz is not None:
+        try:
+            with _open_pdf(pdf_path) as doc:
+                return doc.page_count
+        except Exception:
+            pass
+    if pdfinfo_from_path is not None:
+        try:
+            kwargs = {"poppler_path": POPPLER_PATH} if POPPLER_PATH else {}
+            if isinstance(pdf_path, (bytes, bytearray, memoryview)):
+                return int(pdfinfo_from_bytes(bytes(pdf_path), **kwargs).get("Pages") or 0)
+            return int(pdfinfo_from_path(pdf_path, **kwargs).get("Pages") or 0)
+        except Exception:
+            pass
+    return 0
+
+
+def probe_text_layer(pdf_path: PdfSource) -> Tuple[int, bool]:
+    """(page count, whether every page has a usable text layer per `score_text_page`).
+
+    One fitz open and no rendering; stops at the first page that would need OCR, so a digital page 1
+    followed by scanned pages is never reported as text-only.
+    """
+    load_dependencies()
+    if fitz is not None:
+        try:
+            with _open_pdf(pdf_path) as doc:
+                if doc.page_count == 0:
+                    return 0, False
+                for index in range(doc.page_count):
+                    lines = _normalize_non_empty((doc[index].get_text("text") or "").splitlines())
+                    if not score_text_page(lines)["usable"]:
+                        return doc.page_count, False
+                return doc.page_count, True
+        except Exception:
+            pass
+    return pdf_page_count(pdf_path), False
+
+
+def _render_regions(
+    pdf_path: PdfSource, dpi: int, plan: List[Dict[str, Any]], max_bytes: Optional[int] = None
+) -> List[Any]:
+    """Renders only the clip of each planned region (fitz), or crops a full render (pdf2image)."""
+    load_dependencies()
+    if fitz is not None and Image is not None and RASTERIZER != "pdf2image":
+        try:
+            images: List[Any] = []
+            with _open_pdf(pdf_path) as doc:
+                for region in plan:
+                    page = doc.load_page(region["page"] - 1)
+                    rect = page.rect
+                    x0, y0, x1, y1 = region["box"]
+                    clip = fitz.Rect(
+                        rect.x0 + x0 * rect.width,
+                        rect.y0 + y0 * rect.height,
+                        rect.x0 + x1 * rect.width,
+                        rect.y0 + y1 * rect.height,
+                    )
+                    clip_dpi = _dpi_within_budget(clip.width, clip.height, dpi, max_bytes)
+                    pix = page.get_pixmap(dpi=clip_dpi, clip=clip, colorspace=fitz.csGRAY, alpha=False)
+                    image = _pixmap_to_image(pix, clip_dpi)
+                    image.info["origin"] = (clip.x0 - rect.x0, clip.y0 - rect.y0)
+                    images.append(image)
+                    pix = None
+            return images
+        except Exception:
+            pass
+    images = []
+    for region in plan:
+        pages = _convert_pdf_to_images(pdf_path, dpi, first_page=region["page"], last_page=region["page"])
+        if not pages:
+            return []
+        width, height = pages[0].size
+        x0, y0, x1, y1 = region["box"]
+        left, top = int(x0 * width), int(y0 * height)
+        cropped = pages[0].crop((left, top, int(x1 * width), int(y1 * height)))
+        cropped.info["origin"] = (left * 72.0 / dpi, top * 72.0 / dpi)
+        images.append(cropped)
+    return images
+
+
 def _flush_buffer(buffer: List[str], collector: List[str]) -> None:
     if not buffer:
         return
@@ -133,87 +671,532 @@ def _flush_buffer(buffer: List[str], collector: List[str]) -> None:
         collector.append(line)
 
 
-def _extract_lines_with_data(image: Any) -> List[str]:
-    if pytesseract is None:
-        return []
-    try:
-        data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT, lang="spa+eng")
-    except Exception:
-        return _extract_lines_with_string(image)
+def _add_data_tokens(
+    data: Dict[str, List[Any]],
+    indexes: List[int],
+    line_idx: int,
+    tokens: TokenStore,
+    page: int,
+    scale: float,
+    origin: Tuple[float, float],
+) -> None:
+    for idx in indexes:
+        try:
+            left = data["left"][idx] * scale + origin[0]
+            top = data["top"][idx] * scale + origin[1]
+            bbox = (left, top, left + data["width"][idx] * scale, top + data["height"][idx] * scale)
+        except (KeyError, IndexError, TypeError):
+            continue
+        tokens.add(
+            page,
+            int(data.get("block_num", [0] * (idx + 1))[idx]),
+            int(data.get("line_num", [0] * (idx + 1))[idx]),
+            line_idx,
+            bbox,
+            int(float(data["conf"][idx])),
+            data["text"][idx].strip(),
+        )
+
+
+def _lines_and_conf_from_data(
+    data: Dict[str, List[Any]],
+    tokens: Optional[TokenStore] = None,
+    page: int = 0,
+    scale: float = 1.0,
+    origin: Tuple[float, float] = (0.0, 0.0),
+) -> Tuple[List[str], Optional[float]]:
+    """Groups tokens into lines and computes the mean confidence of numeric tokens (None when the unit
+    has no numeric token, which is what DPI escalation keys on).
+
+    When `tokens` is given, word boxes (scaled to points by `scale`, shifted by `origin`) are added to it
+    with the index of the line they end up in.
+    """
     text_lines: List[str] = []
     total_tokens = len(data.get("text", []))
     current_line: Optional[int] = None
     buffer: List[str] = []
+    buffer_idx: List[int] = []
+    numeric_confs: List[int] = []
+
+    def flush() -> None:
+        before = len(text_lines)
+        _flush_buffer(buffer, text_lines)
+        if tokens is not None and len(text_lines) > before:
+            _add_data_tokens(data, buffer_idx, before, tokens, page, scale, origin)
+
     for idx in range(total_tokens):
         token = data["text"][idx].strip()
         conf_raw = data["conf"][idx]
         try:
             confidence = int(conf_raw)
         except Exception:
-            confidence = -1
+            try:
+                confidence = int(float(conf_raw))
+            except Exception:
+                confidence = -1
         if confidence < 0 or not token:
             continue
+        if any(ch.isdigit() for ch in token):
+            numeric_confs.append(confidence)
         line_num = data.get("line_num", [1] * total_tokens)[idx]
         if current_line is None:
             current_line = line_num
         if line_num != current_line:
-            _flush_buffer(buffer, text_lines)
+            flush()
             buffer = [token]
+            buffer_idx = [idx]
             current_line = line_num
         else:
             buffer.append(token)
-    _flush_buffer(buffer, text_lines)
-    return text_lines
+            buffer_idx.append(idx)
+    flush()
+    mean_conf = round(sum(numeric_confs) / len(numeric_confs), 1) if numeric_confs else None
+    return text_lines, mean_conf
 
 
-def _extract_lines_with_string(image: Any) -> List[str]:
-    if pytesseract is None:
-        return []
+def _extract_lines_and_conf(
+    image: Any, tokens: Optional[TokenStore] = None, page: int = 0, errors: Optional[List[str]] = None
+) -> Tuple[List[str], Optional[float]]:
+    """OCR lines and mean numeric confidence; engine failures (not blank pages) are appended to `errors`."""
+    engine = get_ocr_engine()
+    if engine is None:
+        if errors is not None:
+            errors.append("no_ocr_engine")
+        return [], None
     try:
-        txt = pytesseract.image_to_string(image, lang="spa+eng")
+        data = engine.image_to_data(image)
     except Exception:
+        data = None
+    if not data:
+        return _extract_lines_with_string(image, errors), None
+    info = getattr(image, "info", None) or {}
+    dpi = (info.get("dpi") or (72,))[0] or 72
+    return _lines_and_conf_from_data(data, tokens, page, 72.0 / dpi, info.get("origin", (0.0, 0.0)))
+
+
+def _extract_lines_with_data(image: Any) -> List[str]:
+    return _extract_lines_and_conf(image)[0]
+
+
+def _extract_lines_with_string(image: Any, errors: Optional[List[str]] = None) -> List[str]:
+    engine = get_ocr_engine()
+    if engine is None:
+        return []
+    try:
+        txt = engine.image_to_string(image)
+    except Exception as ex:
+        if errors is not None:
+            errors.append(f"ocr_failed: {type(ex).__name__}")
         return []
     return _normalize_non_empty(txt.splitlines())
 
 
 def _extract_lines_from_image(image: Any) -> List[str]:
-    if pytesseract is None:
+    if get_ocr_engine() is None:
         return []
-    if image_to_data is not None:
-        return _extract_lines_with_data(image)
-    return _extract_lines_with_string(image)
+    return _extract_lines_with_data(image)
 
 
-def ocr_pdf_to_lines(pdf_path: str, dpi: int = 150) -> List[str]:
-    if not _ocr_dependencies_ready():
+def _current_rss_mb() -> Optional[float]:
+    """Resident set size of this process (Linux /proc), None where unavailable."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return round(resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+    except Exception:
+        return None
+
+
+def _render_unit(pdf_path: PdfSource, unit: Dict[str, Any], dpi: int, max_bytes: Optional[int] = None) -> Optional[Any]:
+    """Renders one OCR unit: a whole page, or a region of it when the unit has a `box`."""
+    with stage("rasterize"):
+        if unit.get("box"):
+            images = _render_regions(pdf_path, dpi, [unit], max_bytes=max_bytes)
+        else:
+            images = _convert_pdf_to_images(
+                pdf_path, dpi, first_page=unit["page"], last_page=unit["page"], max_bytes=max_bytes
+            )
+    return images[0] if images else None
+
+
+def _ocr_unit(
+    pdf_path: PdfSource, unit: Dict[str, Any], dpi: int, max_bytes: Optional[int] = None
+) -> Tuple[List[str], Dict[str, Any]]:
+    """Renders, OCRs and releases one unit. Returns its lines and stats (dpi, conf, rss_mb; "error" when
+    rendering or the OCR engine failed, as opposed to a blank unit)."""
+    image = _render_unit(pdf_path, unit, dpi, max_bytes=max_bytes)
+    if image is None:
+        return [], {"dpi": dpi, "conf": None, "error": "render_failed"}
+    info = getattr(image, "info", None)
+    if info is not None and "dpi" not in info:
+        info["dpi"] = (dpi, dpi)
+    stats: Dict[str, Any] = {"dpi": (info or {}).get("dpi", (dpi,))[0]}
+    stats["rss_mb"] = _current_rss_mb()
+    tokens = TokenStore()
+    errors: List[str] = []
+    with _OCR_SLOTS, stage("ocr_page"):
+        lines, stats["conf"] = _extract_lines_and_conf(image, tokens, unit["page"], errors)
+    if errors:
+        stats["error"] = errors[0]
+    trace_count("ocr_pages")
+    stats["tokens"] = tokens
+    image = None
+    return lines, stats
+
+
+def _map_units(fn: Any, units: List[Dict[str, Any]], workers: Optional[int]) -> List[Any]:
+    """Applies fn to each unit, in parallel when allowed; results keep the input order."""
+    workers = min(max(1, workers or OCR_PAGE_WORKERS), len(units) or 1)
+    if workers == 1:
+        return [fn(unit) for unit in units]
+    trace = current_trace()
+
+    def traced(unit: Dict[str, Any]) -> Any:
+        with use_trace(trace):
+            return fn(unit)
+
+    # tesseract runs outside the GIL (subprocess or released by tesserocr), so threads are enough.
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr-page") as pool:
+        return list(pool.map(traced, units))
+
+
+def _needs_escalation(info: Dict[str, Any], lines: List[str]) -> bool:
+    """Low numeric confidence, no numeric tokens at all, or no lines: worth a higher-DPI retry (unless
+    there is no OCR engine to retry with)."""
+    if info.get("error") == "no_ocr_engine":
+        return False
+    return not lines or info["conf"] is None or info["conf"] < OCR_MIN_NUMERIC_CONF
+
+
+def ocr_pdf_units(
+    pdf_path: PdfSource,
+    units: List[Dict[str, Any]],
+    dpi: int = 150,
+    workers: Optional[int] = None,
+    escalate_dpi: Optional[int] = None,
+) -> List[Tuple[Dict[str, Any], List[str]]]:
+    """OCRs pages/regions ({"page": n, "box": optional, "name": optional}), each rendered, OCR'd and
+    released on its own. Returns (unit info, lines) pairs in input order; unit info records dpi, conf,
+    rss_mb and the unit TokenStore under "tokens".
+
+    With `escalate_dpi`, units whose numeric-token confidence is below OCR_MIN_NUMERIC_CONF, that
+    have no numeric tokens or that produced no lines are re-rendered and re-OCR'd at that DPI.
+    """
+    if not units or not _ocr_dependencies_ready():
         return []
-    images = _convert_pdf_to_images(pdf_path, dpi)
+    # At most `workers` units are rendered at once, so the memory ceiling is split between them.
+    effective_workers = min(max(1, workers or OCR_PAGE_WORKERS), len(units))
+    max_bytes = int(OCR_MEMORY_LIMIT_MB * 1024 * 1024 / effective_workers) if OCR_MEMORY_LIMIT_MB > 0 else None
+    results = _map_units(lambda unit: _ocr_unit(pdf_path, unit, dpi, max_bytes), units, workers)
+    infos = [dict(unit, **stats) for unit, (_, stats) in zip(units, results)]
+    lines_per_unit = [lines for lines, _ in results]
+    if escalate_dpi and escalate_dpi > dpi:
+        retry = [i for i, info in enumerate(infos) if _needs_escalation(info, lines_per_unit[i])]
+        retried = _map_units(lambda i: _ocr_unit(pdf_path, units[i], escalate_dpi, max_bytes), retry, workers)
+        for i, (lines, stats) in zip(retry, retried):
+            if lines:
+                lines_per_unit[i] = lines
+                infos[i].pop("error", None)
+                infos[i].update(stats)
+    return list(zip(infos, lines_per_unit))
+
+
+def iter_ocr_pages(
+    pdf_path: PdfSource,
+    dpi: int = 150,
+    workers: Optional[int] = None,
+    escalate_dpi: Optional[int] = None,
+    page_numbers: Optional[List[int]] = None,
+) -> Iterator[Tuple[Dict[str, Any], List[str]]]:
+    """Yields (page info, lines) in page order, OCRing `workers` pages at a time.
+
+    Only the pages of the current batch are ever rendered, so memory does not grow with page count
+    and the consumer can stop early.
+    """
+    if not _ocr_dependencies_ready():
+        return
+    if page_numbers is None:
+        page_numbers = list(range(1, pdf_page_count(pdf_path) + 1))
+    batch = max(1, workers or OCR_PAGE_WORKERS)
+    for start in range(0, len(page_numbers), batch):
+        units = [{"page": n} for n in page_numbers[start:start + batch]]
+        yield from ocr_pdf_units(pdf_path, units, dpi=dpi, workers=workers, escalate_dpi=escalate_dpi)
+
+
+def _flatten(results: List[Tuple[Dict[str, Any], List[str]]]) -> List[str]:
     text_lines: List[str] = []
-    for image in images:
-        text_lines.extend(_extract_lines_from_image(image))
+    for _, lines in results:
+        text_lines.extend(lines)
     return text_lines
 
 
+def ocr_pdf_to_lines(pdf_path: PdfSource, dpi: int = 150, workers: Optional[int] = None) -> List[str]:
+    return _flatten(list(iter_ocr_pages(pdf_path, dpi=dpi, workers=workers)))
+
+
+def ocr_pdf_page_to_lines(pdf_path: PdfSource, page_number: int, dpi: int = 150) -> List[str]:
+    """OCRs a single 1-based page."""
+    return _flatten(ocr_pdf_units(pdf_path, [{"page": page_number}], dpi=dpi, workers=1))
+
+
+def ocr_pdf_pages_to_lines(
+    pdf_path: PdfSource, page_numbers: List[int], dpi: int = 150, workers: Optional[int] = None
+) -> Dict[int, List[str]]:
+    """OCRs a subset of 1-based pages, in parallel when allowed. Returns lines by page number."""
+    units = [{"page": n} for n in page_numbers]
+    return {info["page"]: lines for info, lines in ocr_pdf_units(pdf_path, units, dpi=dpi, workers=workers)}
+
+
+def ocr_pdf_regions_to_lines(
+    pdf_path: PdfSource, regions: List[Dict[str, Any]], dpi: int = 150, workers: Optional[int] = None
+) -> List[Tuple[Dict[str, Any], List[str]]]:
+    """OCRs only the given page regions. Returns (planned region, lines) pairs in reading order."""
+    if not _ocr_dependencies_ready():
+        return []
+    plan = plan_ocr_regions(regions, pdf_page_count(pdf_path))
+    return ocr_pdf_units(pdf_path, plan, dpi=dpi, workers=workers)
+
+
+def _merge_units(results: List[Tuple[Dict[str, Any], List[str]]]) -> Tuple[List[str], List[Dict[str, Any]], TokenStore]:
+    """Flattens unit results into lines, debug-safe infos (tokens removed) and one TokenStore."""
+    lines: List[str] = []
+    infos: List[Dict[str, Any]] = []
+    tokens = TokenStore()
+    for info, unit_lines in results:
+        info = dict(info)
+        unit_tokens = info.pop("tokens", None)
+        if unit_tokens is not None:
+            tokens.extend(unit_tokens, line_offset=len(lines))
+        lines.extend(unit_lines)
+        infos.append(info)
+    return lines, infos, tokens
+
+
+def read_failed(reader_debug: Dict[str, Any]) -> bool:
+    """True when some OCR unit of the read failed to render or OCR (its result is not worth caching)."""
+    units = reader_debug.get("ocr_units") or reader_debug.get("regions") or []
+    return any(unit.get("error") for unit in units)
+
+
+def _peak_rss(units: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Highest RSS seen while a page image was in memory (or at the end of the read)."""
+    samples = [u["rss_mb"] for u in units if u.get("rss_mb") is not None]
+    current = _current_rss_mb()
+    if current is not None:
+        samples.append(current)
+    return {"peak_rss_mb": max(samples)} if samples else {}
+
+
+class NeedsOcr(Exception):
+    """A reader built with `allow_ocr=False` found no text layer: the PDF has to be read on an OCR lane."""
+
+
 class PdfLineReader:
-    """Encapsulates PDF to text/OCR decisions."""
+    """Encapsulates PDF to text/OCR decisions.
 
-    def __init__(self, prefer_ocr: bool = True, dpi: int = 300):
+    With `allow_ocr=False` (text lane of the extraction executor) only the text layer is read, and a
+    PDF that would fall back to OCR raises NeedsOcr instead; the lines of any read that succeeds are
+    the same, so it is not part of the fingerprint.
+    """
+
+    def __init__(
+        self,
+        prefer_ocr: bool = True,
+        dpi: int = 300,
+        mode: Optional[str] = None,
+        ocr_workers: Optional[int] = None,
+        adaptive_dpi: Optional[bool] = None,
+        allow_ocr: bool = True,
+    ):
         self.prefer_ocr = prefer_ocr
+        self.allow_ocr = allow_ocr
         self.dpi = dpi
+        self.mode = (mode or READER_MODE).lower()
+        self.ocr_workers = ocr_workers
+        self.adaptive_dpi = OCR_ADAPTIVE_DPI if adaptive_dpi is None else adaptive_dpi
+
+    def fingerprint(self) -> str:
+        """Settings that change the lines this reader produces (used in cache keys); config only, so it
+        never loads the PDF/OCR stack."""
+        parts = [
+            self.mode,
+            str(self.prefer_ocr),
+            str(self.dpi),
+            f"adaptive={self.adaptive_dpi}:{OCR_LOW_DPI}:{OCR_MIN_NUMERIC_CONF}",
+            f"text={TEXT_PAGE_MIN_CHARS}:{TEXT_PAGE_MIN_VALID_RATIO}",
+            RASTERIZER,
+            ocr_engine_name(),
+            OCR_LANG,
+            str(OCR_MEMORY_LIMIT_MB),
+        ]
+        return "|".join(parts)
 
-    def read(self, pdf_path: str, use_ocr_hint: Optional[bool] = None) -> Tuple[List[str], bool]:
+    def read(self, pdf_path: PdfSource, use_ocr_hint: Optional[bool] = None) -> Tuple[List[str], bool]:
+        lines, used_ocr, _ = self.read_detailed(pdf_path, use_ocr_hint=use_ocr_hint)
+        return lines, used_ocr
+
+    def read_detailed(
+        self,
+        pdf_path: PdfSource,
+        use_ocr_hint: Optional[bool] = None,
+        regions: Optional[List[Dict[str, Any]]] = None,
+        is_sufficient: Optional[Callable[[List[str], bool], bool]] = None,
+    ) -> Tuple[List[str], bool, Dict[str, Any]]:
+        """Same as `read`, plus reader debug info (mode, per-page OCR map, OCR regions, DPI/confidence per
+        OCR'd page or region).
+
+        `regions` only applies in "roi" mode; DEFAULT_OCR_REGIONS is used when not given.
+        `is_sufficient(lines, used_ocr)` only applies in "priority" mode: when it accepts the lines of the
+        first and last pages, the middle pages are never OCR'd.
+        """
+        lines, used_ocr, debug, _ = self.read_layout(pdf_path, use_ocr_hint, regions, is_sufficient)
+        return lines, used_ocr, debug
+
+    def read_layout(
+        self,
+        pdf_path: PdfSource,
+        use_ocr_hint: Optional[bool] = None,
+        regions: Optional[List[Dict[str, Any]]] = None,
+        is_sufficient: Optional[Callable[[List[str], bool], bool]] = None,
+    ) -> Tuple[List[str], bool, Dict[str, Any], TokenStore]:
+        """Same as `read_detailed`, plus the positioned tokens (TokenStore) behind the lines."""
+        if not self.allow_ocr:
+            use_ocr_hint = False
+        prefer_ocr = self.prefer_ocr if use_ocr_hint is None else bool(use_ocr_hint)
+        if self.mode == "priority" and prefer_ocr and is_sufficient is not None:
+            lines, debug, tokens = self._read_priority(pdf_path, is_sufficient)
+            if lines:
+                return lines, True, debug, tokens
+        if self.mode == "roi" and prefer_ocr:
+            lines, region_spans, tokens = self._read_regions(pdf_path, regions or DEFAULT_OCR_REGIONS)
+            if lines:
+                return lines, True, {"reader_mode": "roi", "regions": region_spans, **_peak_rss(region_spans)}, tokens
+        if use_ocr_hint is None and self.mode == "hybrid":
+            lines, used_ocr_pages, ocr_units, tokens = self._read_hybrid(pdf_path)
+            if lines:
+                debug = {
+                    "reader_mode": "hybrid",
+                    "used_ocr_pages": used_ocr_pages,
+                    "ocr_units": ocr_units,
+                    **_peak_rss(ocr_units),
+                }
+                return lines, any(used_ocr_pages.values()), debug, tokens
+        lines, used_ocr, ocr_units, tokens = self._read_document(pdf_path, use_ocr_hint)
+        return lines, used_ocr, {"reader_mode": "document", "ocr_units": ocr_units, **_peak_rss(ocr_units)}, tokens
+
+    def _ocr_units(self, pdf_path: PdfSource, units: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], List[str]]]:
+        if self.adaptive_dpi:
+            return ocr_pdf_units(
+                pdf_path, units, dpi=min(OCR_LOW_DPI, self.dpi), workers=self.ocr_workers, escalate_dpi=self.dpi
+            )
+        return ocr_pdf_units(pdf_path, units, dpi=self.dpi, workers=self.ocr_workers)
+
+    def _ocr_document(self, pdf_path: PdfSource) -> Tuple[List[str], List[Dict[str, Any]], TokenStore]:
+        if self.adaptive_dpi:
+            pages = iter_ocr_pages(
+                pdf_path, dpi=min(OCR_LOW_DPI, self.dpi), workers=self.ocr_workers, escalate_dpi=self.dpi
+            )
+        else:
+            pages = iter_ocr_pages(pdf_path, dpi=self.dpi, workers=self.ocr_workers)
+        lines: List[str] = []
+        infos: List[Dict[str, Any]] = []
+        tokens = TokenStore()
+        for page_result in pages:
+            page_lines, page_infos, page_tokens = _merge_units([page_result])
+            tokens.extend(page_tokens, line_offset=len(lines))
+            lines.extend(page_lines)
+            infos.extend(page_infos)
+        return lines, infos, tokens
+
+    def _read_text(self, pdf_path: PdfSource) -> Tuple[List[str], TokenStore]:
+        lines: List[str] = []
+        tokens = TokenStore()
+        for page_lines, page_tokens in read_pdf_pages_layout(pdf_path):
+            tokens.extend(page_tokens, line_offset=len(lines))
+            lines.extend(page_lines)
+        return lines, tokens
+
+    def _read_document(
+        self, pdf_path: PdfSource, use_ocr_hint: Optional[bool]
+    ) -> Tuple[List[str], bool, List[Dict[str, Any]], TokenStore]:
         prefer_ocr = self.prefer_ocr if use_ocr_hint is None else bool(use_ocr_hint)
+        ocr_units: List[Dict[str, Any]] = []
         if prefer_ocr:
-            lines = ocr_pdf_to_lines(pdf_path, dpi=self.dpi)
+            lines, ocr_units, tokens = self._ocr_document(pdf_path)
             used_ocr = True
             if not lines:
-                lines = read_pdf_text(pdf_path)
+                lines, tokens = self._read_text(pdf_path)
                 used_ocr = False
         else:
-            lines = read_pdf_text(pdf_path)
+            lines, tokens = self._read_text(pdf_path)
             used_ocr = False
             if not lines:
-                lines = ocr_pdf_to_lines(pdf_path, dpi=self.dpi)
+                if not self.allow_ocr:
+                    raise NeedsOcr("no text layer")
+                lines, ocr_units, tokens = self._ocr_document(pdf_path)
                 used_ocr = True if lines else False
-        return lines, used_ocr
+        return lines, used_ocr, ocr_units, tokens
+
+    def _read_hybrid(
+        self, pdf_path: PdfSource
+    ) -> Tuple[List[str], Dict[int, bool], List[Dict[str, Any]], TokenStore]:
+        """Uses the text layer of each page when it scores well, OCR otherwise."""
+        text_pages = read_pdf_pages_layout(pdf_path)
+        to_ocr = [
+            n for n, (page_lines, _) in enumerate(text_pages, start=1) if not score_text_page(page_lines)["usable"]
+        ]
+        ocr_pages = {info["page"]: (info, page_lines) for info, page_lines in self._ocr_units(pdf_path, [{"page": n} for n in to_ocr])}
+        lines: List[str] = []
+        tokens = TokenStore()
+        infos: List[Dict[str, Any]] = []
+        used_ocr_pages: Dict[int, bool] = {}
+        for page_number, (page_lines, page_tokens) in enumerate(text_pages, start=1):
+            ocr_result = ocr_pages.get(page_number)
+            if ocr_result and ocr_result[1]:
+                page_lines, page_infos, page_tokens = _merge_units([ocr_result])
+                infos.extend(page_infos)
+                used_ocr_pages[page_number] = True
+            else:
+                used_ocr_pages[page_number] = False
+            tokens.extend(page_tokens, line_offset=len(lines))
+            lines.extend(page_lines)
+        return lines, used_ocr_pages, infos, tokens
+
+    def _read_regions(
+        self, pdf_path: PdfSource, regions: List[Dict[str, Any]]
+    ) -> Tuple[List[str], List[Dict[str, Any]], TokenStore]:
+        """OCRs the declared regions; each region is tagged with its [start, end) span in the lines."""
+        plan = plan_ocr_regions(regions, pdf_page_count(pdf_path))
+        lines: List[str] = []
+        spans: List[Dict[str, Any]] = []
+        tokens = TokenStore()
+        for region_result in self._ocr_units(pdf_path, plan):
+            region_lines, region_infos, region_tokens = _merge_units([region_result])
+            spans.append(dict(region_infos[0], start=len(lines), end=len(lines) + len(region_lines)))
+            tokens.extend(region_tokens, line_offset=len(lines))
+            lines.extend(region_lines)
+        return lines, spans, tokens
 
+    def _read_priority(
+        self, pdf_path: PdfSource, is_sufficient: Callable[[List[str], bool], bool]
+    ) -> Tuple[List[str], Dict[str, Any], TokenStore]:
+        """OCRs the header page and the totals page first; middle pages only if `is_sufficient` rejects them."""
+        page_count = pdf_page_count(pdf_path)
+        if page_count <= 2:
+            return [], {}, TokenStore()
+        edge_results = self._ocr_units(pdf_path, [{"page": 1}, {"page": page_count}])
+        by_page = {info["page"]: (info, page_lines) for info, page_lines in edge_results}
+        middle = list(range(2, page_count))
+        skipped: List[int] = middle
+        if not is_sufficient(_flatten(edge_results), True):
+            for info, page_lines in self._ocr_units(pdf_path, [{"page": n} for n in middle]):
+                by_page[info["page"]] = (info, page_lines)
+            skipped = []
+        lines, infos, tokens = _merge_units([by_page[n] for n in sorted(by_page)])
+        debug = {
+            "reader_mode": "priority",
+            "ocr_units": infos,
+            "skipped_pages": skipped,
+            **_peak_rss(infos),
+        }
+        return lines, debug, tokens
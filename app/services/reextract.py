@@ -0,0 +1,67 @@
+"""Re-run parsing (header, vendor handler, normalization) over the cached reader output, without OCR.
+
+Usage after changing a handler, a NORMALIZATION_RULES entry or vendors.yaml:
+
+    python -m app.services.reextract --cfg vendors.yaml --output reextract.jsonl
+"""
+from typing import Any, Dict, Iterator, Optional
+import argparse
+import json
+import sys
+
+from app.services.extractor import InvoiceExtractor
+from app.services.line_cache import LineCache, get_line_cache
+from app.services.vendor_config import load_vendor_config
+
+
+def reextract_cached(
+    cfg_path: str = "vendors.yaml",
+    vendor_hint: Optional[str] = None,
+    line_cache: Optional[LineCache] = None,
+    all_readers: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """Yields one batch-style result per cached read.
+
+    By default only reads made with the current reader settings are used; `vendor_hint` overrides
+    the hint stored with each entry.
+    """
+    cache = line_cache or get_line_cache() or LineCache()
+    extractor = InvoiceExtractor()
+    cfg = load_vendor_config(cfg_path)
+    reader_fingerprint = None if all_readers else extractor.reader.fingerprint()
+    for entry in cache.iter_entries(reader_fingerprint):
+        hint = vendor_hint or entry["vendor_hint"]
+        try:
+            data = extractor.parse_lines(
+                entry["lines"], entry["used_ocr"], entry["debug"], hint, cfg, entry["layout"]
+            )
+            yield {"file": entry["source"], "sha256": entry["pdf_sha256"], "status": "ok", "data": data}
+        except Exception as ex:
+            yield {"file": entry["source"], "sha256": entry["pdf_sha256"], "status": "error", "error": str(ex)}
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Re-extract the cached OCR/text corpus without re-reading PDFs.")
+    parser.add_argument("--cfg", default="vendors.yaml")
+    parser.add_argument("--vendor", default=None, help="Vendor hint for every entry (default: the stored one).")
+    parser.add_argument("--cache", default=None, help="Line cache SQLite path (default: LINE_CACHE_PATH).")
+    parser.add_argument("--all-readers", action="store_true", help="Include reads made with other reader settings.")
+    parser.add_argument("--output", default="-", help="JSONL output file ('-' for stdout).")
+    args = parser.parse_args(argv)
+
+    cache = LineCache(args.cache) if args.cache else None
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    count = 0
+    try:
+        for result in reextract_cached(args.cfg, args.vendor, cache, args.all_readers):
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            count += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"{count} entries re-extracted", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+"""Content-addressed cache of extraction results: in-process LRU + SQLite file on local disk.
+
+Keys combine the SHA-256 of the PDF bytes, the request hints, the reader settings and a version
+fingerprint of the parsing code (handlers, normalization rules) and of vendors.yaml, so any code or
+config change naturally misses instead of serving stale results.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Union
+import glob
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from app.services.metrics import trace_count
+
+CACHE_SCHEMA_VERSION = "1"
+
+RESULT_CACHE_ENABLED = os.environ.get("RESULT_CACHE_ENABLED", "1").lower() in ("1", "true", "yes")
+RESULT_CACHE_PATH = os.environ.get("RESULT_CACHE_PATH") or os.path.join(
+    tempfile.gettempdir(), "extractor-cache", "results.sqlite"
+)
+RESULT_CACHE_MEMORY_ITEMS = int(os.environ.get("RESULT_CACHE_MEMORY_ITEMS", "256"))
+RESULT_CACHE_MAX_MB = float(os.environ.get("RESULT_CACHE_MAX_MB", "256"))
+RESULT_CACHE_TTL_SECONDS = int(os.environ.get("RESULT_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_sha256(source: Union[str, bytes]) -> str:
+    """SHA-256 of a PDF given as a path or as in-memory bytes."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(source).hexdigest()
+    return file_sha256(source)
+
+
+_CODE_FINGERPRINT: Optional[str] = None
+
+
+def code_fingerprint() -> str:
+    """Hash of the extraction code (app/services + app/vendors sources); computed once per process."""
+    global _CODE_FINGERPRINT
+    if _CODE_FINGERPRINT is None:
+        digest = hashlib.sha256(CACHE_SCHEMA_VERSION.encode())
+        for pattern in ("services/*.py", "vendors/*.py"):
+            for path in sorted(glob.glob(os.path.join(_APP_DIR, pattern))):
+                digest.update(os.path.basename(path).encode())
+                with open(path, "rb") as f:
+                    digest.update(f.read())
+        _CODE_FINGERPRINT = digest.hexdigest()[:16]
+    return _CODE_FINGERPRINT
+
+
+def config_fingerprint(cfg_path: str) -> str:
+    if not os.path.exists(cfg_path):
+        return "none"
+    with open(cfg_path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+class ResultCache:
+    """Two-tier result cache. Failures in the disk tier never break an extraction."""
+
+    def __init__(
+        self,
+        path: Optional[str] = RESULT_CACHE_PATH,
+        memory_items: int = RESULT_CACHE_MEMORY_ITEMS,
+        max_mb: float = RESULT_CACHE_MAX_MB,
+        ttl_seconds: int = RESULT_CACHE_TTL_SECONDS,
+    ):
+        self.path = path
+        self.memory_items = max(0, memory_items)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.ttl_seconds = ttl_seconds
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "errors": 0}
+        self._schema_ready = False
+
+    @staticmethod
+    def make_key(
+        pdf_sha256: str,
+        vendor_hint: Optional[str],
+        use_ocr_hint: Optional[bool],
+        cfg_path: str,
+        reader_fingerprint: str = "",
+    ) -> str:
+        parts = [
+            pdf_sha256,
+            (vendor_hint or "").upper(),
+            "none" if use_ocr_hint is None else str(bool(use_ocr_hint)),
+            reader_fingerprint,
+            code_fingerprint(),
+            config_fingerprint(cfg_path),
+        ]
+        return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5)
+        if not self._schema_ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, payload TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results(accessed)")
+            self._schema_ready = True
+        return conn
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+        trace_count(f"result_cache_{name}")
+
+    def _remember(self, key: str, payload: str) -> None:
+        if not self.memory_items:
+            return
+        with self._lock:
+            self._memory[key] = payload
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            payload = self._memory.get(key)
+            if payload is not None:
+                self._memory.move_to_end(key)
+        if payload is not None:
+            self._count("memory_hits")
+            return json.loads(payload)
+        payload = self._disk_get(key)
+        if payload is None:
+            self._count("misses")
+            return None
+        self._count("disk_hits")
+        self._remember(key, payload)
+        return json.loads(payload)
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        payload = json.dumps(value, ensure_ascii=False)
+        self._remember(key, payload)
+        self._disk_put(key, payload)
+        self._count("stores")
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        if not self.path:
+            return None
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute("SELECT payload, created FROM results WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                now = time.time()
+                if self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                    conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                    conn.commit()
+                    return None
+                conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+                conn.commit()
+                return row[0]
+            finally:
+                conn.close()
+        except Exception:
+            self._count("errors")
+            return None
+
+    def _disk_put(self, key: str, payload: str) -> None:
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = self._connect()
+            try:
+                now = time.time()
+                conn.execute(
+                    "INSERT OR REPLACE INTO results (key, payload, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                    (key, payload, len(payload.encode("utf-8")), now, now),
+                )
+                self._evict(conn, now)
+                conn.commit()
+            finally:
+                conn.close()
+        except Exception:
+            self._count("errors")
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        """Drops expired rows, then least recently used rows until the table fits in max_bytes."""
+        if self.ttl_seconds:
+            conn.execute("DELETE FROM results WHERE created < ?", (now - self.ttl_seconds,))
+        if not self.max_bytes:
+            return
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        freed = 0
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM results ORDER BY accessed ASC"):
+            if total - freed <= self.max_bytes:
+                break
+            doomed.append((key,))
+            freed += size
+        conn.executemany("DELETE FROM results WHERE key = ?", doomed)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            counters["memory_items"] = len(self._memory)
+        lookups = counters["memory_hits"] + counters["disk_hits"] + counters["misses"]
+        counters["hit_ratio"] = round((counters["memory_hits"] + counters["disk_hits"]) / lookups, 3) if lookups else 0.0
+        return counters
+
+
+_CACHE: Optional[ResultCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """Process-wide cache, or None when RESULT_CACHE_ENABLED is off."""
+    global _CACHE
+    if not RESULT_CACHE_ENABLED:
+        return None
+    if _CACHE is None:
+        with _CACHE_LOCK:
+            if _CACHE is None:
+                _CACHE = ResultCache()
+    return _CACHE
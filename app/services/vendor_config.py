@@ -1,21 +1,47 @@
-"""Load vendor detection config from YAML (names and CUIT mappings)."""
+"""Load vendor detection config from YAML (names, CUIT mappings and optional OCR regions)."""
 
-from typing import Any, Dict
+from typing import Any, Dict, Tuple
 import os
-import yaml
+import threading
+
+# Parsed config per absolute path, with the (mtime, size) it was read at: re-read only when the file changes.
+_CACHE: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+_CACHE_LOCK = threading.Lock()
 
 
 def load_vendor_config(cfg_path: str) -> Dict[str, Any]:
+    """Parsed vendor config, cached per file version; callers must treat it as read-only."""
+    try:
+        st = os.stat(cfg_path)
+    except OSError:
+        return _parse_vendor_config(cfg_path)
+    path = os.path.abspath(cfg_path)
+    version = (st.st_mtime_ns, st.st_size)
+    cached = _CACHE.get(path)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    cfg = _parse_vendor_config(cfg_path)
+    with _CACHE_LOCK:
+        _CACHE[path] = (version, cfg)
+    return cfg
+
+
+def _parse_vendor_config(cfg_path: str) -> Dict[str, Any]:
     if not os.path.exists(cfg_path):
-        return {"detect": {"names": {}, "cuits": {}}}
+        return {"detect": {"names": {}, "cuits": {}}, "ocr_regions": {}}
+    import yaml  # imported on first load, not at app import
+
     with open(cfg_path, "r", encoding="utf-8") as f:
         data = yaml.safe_load(f) or {}
     names: Dict[str, list] = {}
     cuits: Dict[str, str] = {}
+    ocr_regions: Dict[str, list] = {}
     for vid, cfg in (data or {}).items():
         for name in cfg.get("detect", {}).get("names", []):
             names.setdefault(vid.upper(), []).append(name)
         for cuit in cfg.get("detect", {}).get("cuits", []):
             cuits[cuit] = vid.upper()
-    return {"detect": {"names": names, "cuits": cuits}}
+        if cfg.get("ocr_regions"):
+            ocr_regions[vid.upper()] = list(cfg["ocr_regions"])
+    return {"detect": {"names": names, "cuits": cuits}, "ocr_regions": ocr_regions}
 
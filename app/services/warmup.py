@@ -0,0 +1,133 @@
+"""Worker warm-up: imports, vendor config, regex compilation and a self-test OCR before the first request.
+
+Split in two so it works with `gunicorn --preload`:
+
+- `preload()` is fork-safe (imports, YAML parsing, regex/handler code paths over synthetic lines; no
+  threads, pools, sockets, SQLite connections or tesseract handles). `app.api.preloaded` runs it once
+  in the gunicorn master under `--preload` and the workers inherit the result; importing
+  `app.api.main` alone never runs it.
+- `warm_worker()` runs in each worker after fork (lifespan startup): OCR engine + self-test, and the
+  OCR lane's process pool with the same self-test in every child.
+
+`warmup_status()` feeds the readiness endpoint (`/ready`).
+"""
+from typing import Any, Dict, List, Optional
+import os
+import threading
+import time
+
+from app.services.extraction_executor import get_extraction_executor
+from app.services.extractor import InvoiceExtractor
+from app.services.pdf_reader import load_dependencies, ocr_self_test
+from app.services.vendor_config import load_vendor_config
+from app.vendors import REGISTRY
+
+# "0" skips the warm-up entirely (the worker is ready as soon as it starts).
+WARMUP_ENABLED = os.environ.get("WARMUP_ENABLED", "1").lower() in ("1", "true", "yes")
+# Start the OCR lane's processes (and self-test OCR in each one) during warm-up instead of on first use.
+WARMUP_OCR_POOL = os.environ.get("WARMUP_OCR_POOL", "1").lower() in ("1", "true", "yes")
+
+# Synthetic invoice text: enough to walk vendor detection, header regexes, every handler and normalization.
+_SAMPLE_LINES: List[str] = [
+    "FACTURA A",
+    "PIRELLI NEUMATICOS SAIC",
+    "CUIT: 33-50223253-9",
+    "Nro. 0001-00001234",
+    "Fecha: 01/02/2024",
+    "Cliente: EJEMPLO SA",
+    "CUIT: 30-12345678-9",
+    "Subtotal 1.000,00",
+    "IVA 21% 210,00",
+    "Percepcion IIBB 30,00",
+    "Total 1.240,00",
+    "CAE: 12345678901234 Vto. CAE: 11/02/2024",
+]
+
+
+class WarmupState:
+    """Per-process warm-up progress: step durations (ms) and errors, thread-safe."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.status = "pending"
+        self.steps: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self.ocr: Optional[Dict[str, Any]] = None
+        self.pid = os.getpid()
+
+    def run_step(self, name: str, fn: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return fn()
+        except Exception as ex:
+            with self._lock:
+                self.errors[name] = f"{type(ex).__name__}: {ex}"
+            return None
+        finally:
+            with self._lock:
+                self.steps[name] = round((time.perf_counter() - started) * 1000, 1)
+
+    def set_status(self, status: str) -> None:
+        with self._lock:
+            self.status = status
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "status": self.status,
+                "ready": self.status == "ready",
+                "pid": os.getpid(),
+                "preloaded_in": self.pid,
+                "steps_ms": dict(self.steps),
+                "errors": dict(self.errors),
+                "ocr": self.ocr,
+            }
+
+
+_STATE = WarmupState()
+
+
+def _exercise_parsers(cfg_path: str) -> None:
+    """Runs header/vendor/handler/normalize code over synthetic lines so their regexes get compiled."""
+    cfg = load_vendor_config(cfg_path)
+    extractor = InvoiceExtractor()
+    for vendor in [None] + sorted(REGISTRY):
+        extractor.parse_lines(list(_SAMPLE_LINES), False, {}, vendor, cfg)
+
+
+def preload(cfg_path: str = "vendors.yaml") -> Dict[str, Any]:
+    """Fork-safe warm-up (see module docstring); idempotent."""
+    if _STATE.steps.get("parsers") is not None:
+        return _STATE.to_dict()
+    _STATE.set_status("preloading")
+    _STATE.run_step("imports", load_dependencies)
+    _STATE.run_step("vendor_config", lambda: load_vendor_config(cfg_path))
+    _STATE.run_step("parsers", lambda: _exercise_parsers(cfg_path))
+    _STATE.set_status("preloaded")
+    return _STATE.to_dict()
+
+
+def warm_ocr_child() -> Dict[str, Any]:
+    """Runs in an OCR lane child process (must stay a picklable module-level function)."""
+    preload()
+    return dict(ocr_self_test(), pid=os.getpid())
+
+
+def warm_worker(cfg_path: str = "vendors.yaml") -> Dict[str, Any]:
+    """Per-worker warm-up, after fork; blocking, meant for a thread during lifespan startup."""
+    _STATE.set_status("warming")
+    preload(cfg_path)
+    _STATE.ocr = _STATE.run_step("ocr_self_test", ocr_self_test)
+    if WARMUP_OCR_POOL:
+        _STATE.run_step("ocr_pool", lambda: get_extraction_executor().warm_up(warm_ocr_child))
+    _STATE.set_status("ready")
+    return _STATE.to_dict()
+
+
+def mark_ready() -> None:
+    """Warm-up disabled: the worker is ready as soon as it serves."""
+    _STATE.set_status("ready")
+
+
+def warmup_status() -> Dict[str, Any]:
+    return _STATE.to_dict()
@@ -1,12 +1,12 @@
 """
 Vendors package: registry + vendor-specific total extractors.
-Import handlers here to auto-register them on import.
+Handlers are declared here by module name and imported on first use (see HandlerRegistry).
 """
 
 from app.vendors.registry import register, REGISTRY  # re-export
 
-# Side-effect imports to register handlers
-from app.vendors import handlers_pirelli  # noqa: F401
-from app.vendors import handlers_guerrini  # noqa: F401
+# Lazy registration: the module is imported (and its @register runs) the first time the vendor is needed.
+REGISTRY.declare("PIRELLI", "app.vendors.handlers_pirelli")
+REGISTRY.declare("GUERRINI", "app.vendors.handlers_guerrini")
 
 __all__ = ["register", "REGISTRY"]
@@ -56,7 +56,28 @@ def _amount_from_line(line: str, prefer_last: bool = False) -> Optional[float]:
     return parse_number_smart(matches[idx].group(0))
 
 
-def _extract_totals_ocr(lines: List[str], out: Dict[str, Any]) -> bool:
+_PERC_KEYS = ('PERC', 'PERCEP', 'IIBB', 'INGRESOS BRUTOS', 'ARBA', 'AGIP')
+
+
+def _amount_near(
+    layout: Any, keyword: str, line_idx: int, line: str, prefer_last: bool = False, line_fallback: bool = True
+) -> Optional[float]:
+    # Mismo renglon que el rotulo primero (tokens con posicion), despues el numero de la propia linea.
+    if layout is not None:
+        v = layout.amount_right_of(keyword, line_idx, last=prefer_last)
+        if v is not None:
+            return v
+    return _amount_from_line(line, prefer_last) if line_fallback else None
+
+
+def _extract_totals_labeled(
+    lines: List[str], out: Dict[str, Any], layout: Any = None, line_fallback: bool = True
+) -> bool:
+    """
+    Rotulos del bloque de totales (SUBTOTAL, IVA, percepciones, TOTAL) con el importe de cada uno.
+    Con `line_fallback=False` solo se usan los tokens con posicion y hace falta el subtotal junto con
+    el total o el IVA.
+    """
     idx_sub = None
     for i in range(len(lines) - 1, -1, -1):
         if 'SUBTOTAL' in lines[i].upper():
@@ -69,26 +90,32 @@ def _extract_totals_ocr(lines: List[str], out: Dict[str, Any]) -> bool:
     subtotal = iva = perc = total = None
     perc_desc = None
 
-    for line in window:
+    for j, line in enumerate(window):
         up = line.upper()
+        line_idx = idx_sub + j
         if subtotal is None and 'SUBTOTAL' in up:
-            subtotal = _amount_from_line(line)
+            subtotal = _amount_near(layout, 'SUBTOTAL', line_idx, line, line_fallback=line_fallback)
             continue
         if 'IVA' in up and 'RESPONSABLE' not in up:
-            cand = _amount_from_line(line, prefer_last=True)
+            cand = _amount_near(layout, 'IVA', line_idx, line, prefer_last=True, line_fallback=line_fallback)
             if cand is not None:
                 iva = cand
             continue
-        if any(k in up for k in ('PERC', 'PERCEP', 'IIBB', 'INGRESOS BRUTOS', 'ARBA', 'AGIP')):
-            cand = _amount_from_line(line, prefer_last=True)
+        perc_key = next((k for k in _PERC_KEYS if k in up), None)
+        if perc_key:
+            cand = _amount_near(
+                layout, perc_key.split()[-1], line_idx, line, prefer_last=True, line_fallback=line_fallback
+            )
             if cand is not None:
                 perc = cand
                 perc_desc = line.strip()
             continue
         if 'TOTAL' in up:
-            total = _amount_from_line(line)
+            total = _amount_near(layout, 'TOTAL', line_idx, line, line_fallback=line_fallback)
             break
 
+    if not line_fallback and (subtotal is None or (total is None and iva is None)):
+        return False  # sin total ni IVA en el renglon, el total seria el subtotal: que decidan los fallbacks
     if subtotal is None and iva is None and perc is None and total is None:
         return False
 
@@ -110,11 +137,16 @@ def _extract_totals_ocr(lines: List[str], out: Dict[str, Any]) -> bool:
 @register("GUERRINI")
 def extract_totals_guerrini(lines: List[str], out: Dict[str, Any]) -> None:
     used_ocr = bool((out.get("debug") or {}).get("used_ocr"))
+    layout = out.get("layout")
     if used_ocr:
-        handled = _extract_totals_ocr(lines, out)
+        handled = _extract_totals_labeled(lines, out, layout)
         if not handled:
             _extract_totals_numeric(lines, out)
     else:
-        handled = _extract_totals_numeric(lines, out)
+        # Capa de texto: rotulo e importe en el mismo renglon segun los tokens; sin layout (o si no
+        # alcanza), la columna de numeros puros despues del SUBTOTAL y por ultimo los rotulos por linea.
+        handled = layout is not None and _extract_totals_labeled(lines, out, layout, line_fallback=False)
+        if not handled:
+            handled = _extract_totals_numeric(lines, out)
         if not handled:
-            _extract_totals_ocr(lines, out)
+            _extract_totals_labeled(lines, out, layout)
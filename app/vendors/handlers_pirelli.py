@@ -12,8 +12,13 @@ def extract_totals_pirelli(lines: List[str], out: Dict[str, Any]) -> None:
     tail = lines[start:]
     subtotal = iva_total = percep_total = total = None
     iva_items = []; percep_items = []
+    layout = out.get("layout")
 
-    def first_num_near(i: int, span: int = 6) -> Optional[float]:
+    def first_num_near(i: int, keyword: Optional[str] = None, span: int = 6) -> Optional[float]:
+        # Same baseline as the label first (layout tokens), then the windowed scan over the next lines.
+        if layout is not None and keyword:
+            v = layout.amount_right_of(keyword, start + i)
+            if v is not None: return v
         for j in range(i, min(len(tail), i + span + 1)):
             m = NUM_PURE.search(tail[j]) or NUM_ANY.search(tail[j])
             if m:
@@ -24,22 +29,23 @@ def extract_totals_pirelli(lines: List[str], out: Dict[str, Any]) -> None:
     for i, line in enumerate(tail):
         up = line.upper()
         if 'SUBTOTAL' in up and subtotal is None:
-            v = first_num_near(i)
+            v = first_num_near(i, 'SUBTOTAL')
             if v is not None: subtotal = v
         if 'IVA' in up:
             mrate = re.search(r'IVA\s*([\d]{1,2}(?:[.,]\d{1,2})?)', line, re.I)
             alic = mrate.group(1).replace(',', '.') if mrate else None
-            v = first_num_near(i)
+            v = first_num_near(i, 'IVA')
             if v is not None:
                 iva_total = (iva_total or 0.0) + v
                 iva_items.append({"alicuota": alic, "monto": v})
-        if any(k in up for k in ['IIBB', 'PERC', 'RG DGI', 'DN B70', 'NEUQUEN', 'RÍO NEG', 'RIO NEG']):
-            v = first_num_near(i)
+        percep_key = next((k for k in ['IIBB', 'PERC', 'RG DGI', 'DN B70', 'NEUQUEN', 'RÍO NEG', 'RIO NEG'] if k in up), None)
+        if percep_key:
+            v = first_num_near(i, percep_key.split()[-1])
             if v is not None:
                 percep_total = (percep_total or 0.0) + v
                 percep_items.append({"desc": line, "monto": v})
         if 'IMPORTE TOTAL' in up or re.search(r'\bTOTAL\b', up):
-            v = first_num_near(i)
+            v = first_num_near(i, 'TOTAL')
             if v is not None: total = v
 
     out["subtotal"] = subtotal
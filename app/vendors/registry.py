@@ -2,15 +2,57 @@
 # Permite aplicar un registro central de "Proveedores" 
 # y sus funciones de extraccion especificas.
 # Aca se suma nuevos vendedores, sin modificar el core
-from typing import Dict, Callable, Any, List
+import importlib
+import threading
+from typing import Dict, Callable, Iterator, List, Mapping
 
 VendorHandler = Callable[[List[str], dict], None]
 
-REGISTRY: Dict[str, VendorHandler] = {}
+
+class HandlerRegistry(Mapping):
+    """
+    Proveedor -> handler. Los handlers se declaran por nombre de modulo (`declare`) y el modulo
+    recien se importa la primera vez que se pide ese proveedor; al importarse, su `@register`
+    completa la entrada. Iterar / `in` no importa nada.
+    """
+
+    def __init__(self) -> None:
+        self._handlers: Dict[str, VendorHandler] = {}
+        self._modules: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def declare(self, vendor_id: str, module: str) -> None:
+        self._modules[vendor_id.upper()] = module
+
+    def add(self, vendor_id: str, fn: VendorHandler) -> None:
+        self._handlers[vendor_id.upper()] = fn
+
+    def __getitem__(self, vendor_id: str) -> VendorHandler:
+        key = vendor_id.upper()
+        if key not in self._handlers and key in self._modules:
+            with self._lock:
+                if key not in self._handlers:
+                    importlib.import_module(self._modules[key])
+        return self._handlers[key]
+
+    def __contains__(self, vendor_id: object) -> bool:
+        return isinstance(vendor_id, str) and (vendor_id.upper() in self._handlers or vendor_id.upper() in self._modules)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(sorted(set(self._handlers) | set(self._modules)))
+
+    def __len__(self) -> int:
+        return len(set(self._handlers) | set(self._modules))
+
+    def loaded(self) -> List[str]:
+        return sorted(self._handlers)
+
+
+REGISTRY = HandlerRegistry()
 
 def register(vendor_id: str):
     
     def deco(fn: VendorHandler):
-        REGISTRY[vendor_id.upper()] = fn
+        REGISTRY.add(vendor_id, fn)
         return fn   
-    return deco
\ No newline at end of file
+    return deco
@@ -0,0 +1,18 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+_LAZY = ("fitz", "pymupdf", "PIL", "pdf2image", "pytesseract", "tesserocr", "app.vendors.handlers_")
+
+
+def test_importing_the_app_with_defaults_stays_lazy():
+    env = {key: value for key, value in os.environ.items() if key != "WARMUP_ENABLED"}
+    code = "import json, sys, app.api.main; print(json.dumps(sorted(sys.modules)))"
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True)
+    loaded = json.loads(proc.stdout.strip().splitlines()[-1])
+    assert [name for name in loaded if name.startswith(_LAZY)] == []
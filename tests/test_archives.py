@@ -0,0 +1,18 @@
+import io
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from app.api.archives import Archives  # noqa: E402
+
+
+def test_spool_outlives_the_upload():
+    upload = io.BytesIO(b"PK\x03\x04 archive bytes")
+    upload.read(3)
+    spooled = Archives.spool(upload)
+    upload.close()
+    try:
+        assert spooled.read() == b"PK\x03\x04 archive bytes"
+    finally:
+        spooled.close()
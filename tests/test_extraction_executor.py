@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+from app.services import extraction_executor, pdf_reader
+from app.services.extraction_executor import ExtractionExecutor
+
+DIGITAL_PAGE = (
+    "FACTURA A Nro 0001-00001234\n"
+    "CUIT 30-12345678-9 Fecha 01/02/2024\n"
+    "Subtotal 1.000,00 IVA 21% 210,00 Total 1.210,00\n"
+)
+
+
+class _FakePage:
+    def __init__(self, text):
+        self.text = text
+
+    def get_text(self, kind):
+        return self.text
+
+
+class _FakeDoc:
+    def __init__(self, pages):
+        self.pages = [_FakePage(text) for text in pages]
+        self.page_count = len(self.pages)
+
+    def __getitem__(self, index):
+        return self.pages[index]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def _fake_fitz(monkeypatch, pages):
+    class FakeFitz:
+        @staticmethod
+        def open(*args, **kwargs):
+            return _FakeDoc(pages)
+
+    monkeypatch.setattr(pdf_reader, "_DEPS_LOADED", True)
+    monkeypatch.setattr(pdf_reader, "fitz", FakeFitz)
+
+
+def test_probe_requires_every_page_usable(monkeypatch):
+    _fake_fitz(monkeypatch, [DIGITAL_PAGE, ""])
+    assert pdf_reader.probe_text_layer(b"%PDF") == (2, False)
+
+    _fake_fitz(monkeypatch, [DIGITAL_PAGE, DIGITAL_PAGE])
+    assert pdf_reader.probe_text_layer(b"%PDF") == (2, True)
+
+
+def test_plan_keeps_hint_for_mixed_pdfs(monkeypatch):
+    monkeypatch.setattr(pdf_reader, "READER_MODE", "document")
+    monkeypatch.setattr(extraction_executor, "probe_text_layer", lambda path: (3, False))
+    assert asyncio.run(ExtractionExecutor().plan(b"%PDF", None)) == ("ocr", None, 3)
+
+
+def test_plan_pins_text_only_when_every_page_is_digital(monkeypatch):
+    monkeypatch.setattr(pdf_reader, "READER_MODE", "document")
+    monkeypatch.setattr(extraction_executor, "probe_text_layer", lambda path: (2, True))
+    assert asyncio.run(ExtractionExecutor().plan(b"%PDF", None)) == ("text", False, 2)
+
+
+def test_plan_does_not_probe_outside_document_mode(monkeypatch):
+    def probe(path):
+        raise AssertionError("probed")
+
+    monkeypatch.setattr(pdf_reader, "READER_MODE", "roi")
+    monkeypatch.setattr(extraction_executor, "probe_text_layer", probe)
+    monkeypatch.setattr(extraction_executor, "pdf_page_count", lambda path: 4)
+    assert asyncio.run(ExtractionExecutor().plan(b"%PDF", None)) == ("ocr", None, 4)
+
+
+def test_text_lane_requeues_ocr_reads_on_the_ocr_lane(monkeypatch):
+    calls = []
+    released = []
+
+    def fake_extract(pdf_path, vendor_hint=None, cfg_path="vendors.yaml", use_ocr_hint=None, allow_ocr=True):
+        calls.append((use_ocr_hint, allow_ocr))
+        if not allow_ocr:
+            raise pdf_reader.NeedsOcr("no text layer")
+        return {"total": 1.0}
+
+    async def plan(self, pdf_path, use_ocr_hint):
+        return "text", False, 1
+
+    monkeypatch.setattr(extraction_executor, "extract_from_pdf", fake_extract)
+    monkeypatch.setattr(ExtractionExecutor, "plan", plan)
+    executor = ExtractionExecutor(ocr_processes=0)
+    try:
+        minimal, _ = asyncio.run(executor.extract_traced(b"%PDF scanned", release=released.append))
+    finally:
+        executor.shutdown()
+    assert minimal == {"total": 1.0}
+    assert calls == [(False, False), (False, True)]
+    assert released == [b"%PDF scanned"]
+    lanes = executor.stats()["lanes"]
+    assert (lanes["text"]["requeued"], lanes["text"]["failed"], lanes["ocr"]["completed"]) == (1, 0, 1)
+
+
+def test_reader_without_ocr_raises_instead_of_ocring(monkeypatch):
+    reader = pdf_reader.PdfLineReader(allow_ocr=False)
+    monkeypatch.setattr(reader, "_read_text", lambda path: ([], pdf_reader.TokenStore()))
+
+    def ocr(path):
+        raise AssertionError("OCR'd")
+
+    monkeypatch.setattr(reader, "_ocr_document", ocr)
+    with pytest.raises(pdf_reader.NeedsOcr):
+        reader.read_layout(b"%PDF", use_ocr_hint=None)
@@ -0,0 +1,63 @@
+import os
+
+from app.services import batch_processor
+from app.services.folder_manifest import FolderManifest
+
+
+def _pdf(path, data=b"%PDF-1.4 invoice"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def _fake_extraction(monkeypatch):
+    monkeypatch.setattr(batch_processor, "extraction_version", lambda *args: "v1")
+    monkeypatch.setattr(
+        batch_processor,
+        "_process_entry",
+        lambda args: (args[0], 1, {"file": os.path.basename(args[0]), "status": "ok", "data": {}}),
+    )
+
+
+def test_non_recursive_run_keeps_subfolder_rows(tmp_path, monkeypatch):
+    _fake_extraction(monkeypatch)
+    folder = str(tmp_path / "facturas")
+    top = _pdf(os.path.join(folder, "a.pdf"))
+    nested = _pdf(os.path.join(folder, "2024", "b.pdf"))
+    manifest = FolderManifest(str(tmp_path / "folders.sqlite"))
+    try:
+        first = batch_processor.process_folder_incremental(folder, manifest, parallel=False, recursive=True)
+        assert first["done"] == 2
+
+        # Default (like the CLI): only the folder itself is in scope.
+        second = batch_processor.process_folder_incremental(folder, manifest, parallel=False)
+        assert (second["done"], second["unchanged"], second["removed"]) == (0, 1, 0)
+        assert manifest.stats(folder) == {"ok": 2}
+
+        os.unlink(nested)
+        os.unlink(top)
+        third = batch_processor.process_folder_incremental(folder, manifest, parallel=False)
+        assert third["removed"] == 1
+        assert [row["path"] for row in manifest.iter_results(folder)] == [os.path.join("2024", "b.pdf")]
+    finally:
+        manifest.close()
+
+
+def test_plan_processes_new_and_changed_files_only(tmp_path):
+    folder = str(tmp_path)
+    same = _pdf(os.path.join(folder, "same.pdf"))
+    changed = _pdf(os.path.join(folder, "changed.pdf"))
+    manifest = FolderManifest(str(tmp_path / "folders.sqlite"))
+    try:
+        for path in (same, changed):
+            st = os.stat(path)
+            manifest.record(path, st.st_size, st.st_mtime_ns, "sha", "v1", 1, {"status": "ok"})
+        _pdf(changed, b"%PDF-1.4 another invoice")
+        new = _pdf(os.path.join(folder, "new.pdf"))
+        plan = manifest.plan([changed, new, same], folder, "v1")
+        assert sorted(plan["process"]) == sorted([changed, new])
+        assert (plan["unchanged"], plan["removed"]) == (1, 0)
+        assert manifest.plan([same], folder, "v2")["process"] == [same]
+    finally:
+        manifest.close()
@@ -0,0 +1,61 @@
+from app.services.fallback_totals import fallback_totals
+from app.services.page_tokens import TokenStore
+from app.vendors.handlers_guerrini import extract_totals_guerrini
+
+
+def _layout(rows):
+    """TokenStore with one row of words per (line index, words) pair, 10 pt apart."""
+    store = TokenStore()
+    for line_idx, words in rows:
+        x = 10.0
+        y = 100.0 + 10 * line_idx
+        for word in words:
+            store.add(1, 0, line_idx, line_idx, (x, y, x + 40, y + 8), 95, word)
+            x += 50
+    return store
+
+
+def test_text_layer_numeric_column():
+    lines = ["SUBTOTAL", "IVA 21%", "PERCEP. IIBB", "TOTAL", "1.000,00", "210,00", "30,00", "1.240,00"]
+    out = {"debug": {"used_ocr": False}}
+    extract_totals_guerrini(lines, out)
+    assert (out["subtotal"], out["iva"], out["percepciones_total"], out["total"]) == (1000.0, 210.0, 30.0, 1240.0)
+
+
+def test_layout_amounts_on_the_label_baseline():
+    lines = ["SUBTOTAL", "IVA 21,00 %", "PERCEP. IIBB", "TOTAL"]
+    layout = _layout(
+        [
+            (0, ["SUBTOTAL", "1.000,00"]),
+            (1, ["IVA", "21,00", "%", "210,00"]),
+            (2, ["PERCEP.", "IIBB", "30,00"]),
+            (3, ["TOTAL", "1.240,00"]),
+        ]
+    )
+    out = {"debug": {"used_ocr": False}, "layout": layout}
+    extract_totals_guerrini(lines, out)
+    assert (out["subtotal"], out["iva"], out["percepciones_total"], out["total"]) == (1000.0, 210.0, 30.0, 1240.0)
+
+
+def test_layout_subtotal_only_falls_back_to_numeric_column():
+    # Only SUBTOTAL has its amount on the same baseline; IVA and TOTAL values sit in the number column.
+    lines = ["SUBTOTAL", "IVA 21%", "PERCEP. IIBB", "TOTAL", "1.000,00", "210,00", "0,00", "1.210,00"]
+    layout = _layout([(0, ["SUBTOTAL", "1.000,00"]), (1, ["IVA", "21%"]), (2, ["PERCEP.", "IIBB"]), (3, ["TOTAL"])])
+    out = {"debug": {"used_ocr": False}, "layout": layout}
+    extract_totals_guerrini(lines, out)
+    assert (out["subtotal"], out["iva"], out["total"]) == (1000.0, 210.0, 1210.0)
+
+
+def test_ocr_lines_without_layout():
+    lines = ["SUBTOTAL: 1.000,00", "IVA 21.00: 210,00", "PERCEP IIBB: 30,00", "TOTAL: 1.240,00 0800 222"]
+    out = {"debug": {"used_ocr": True}}
+    extract_totals_guerrini(lines, out)
+    assert (out["subtotal"], out["iva"], out["percepciones_total"], out["total"]) == (1000.0, 210.0, 30.0, 1240.0)
+
+
+def test_fallback_totals_perception_labels():
+    lines = ["SUBTOTAL", "1.000,00", "PERCEPCION INGRESOS BRUTOS", "25,00", "TOTAL", "1.025,00"]
+    out = {}
+    fallback_totals(lines, out)
+    assert out["percepciones_total"] == 25.0
+    assert out["total"] == 1025.0
@@ -0,0 +1,25 @@
+import subprocess
+
+import pytest
+
+from app.services import import_budget
+
+
+def test_measure_imports_keeps_the_deployed_environment(monkeypatch):
+    seen = {}
+
+    def fake_run(cmd, capture_output, text, env):
+        seen.update(env)
+        stderr = "import time: self [us] | cumulative | imported package\nimport time:       120 |        480 | app.api.main\n"
+        return subprocess.CompletedProcess(cmd, 0, "", stderr)
+
+    monkeypatch.setenv("WARMUP_ENABLED", "1")
+    monkeypatch.setattr(import_budget.subprocess, "run", fake_run)
+    assert import_budget.measure_imports("app.api.main") == [("app.api.main", 120, 480)]
+    assert seen["WARMUP_ENABLED"] == "1"
+
+
+def test_api_entry_point_stays_lazy_with_defaults(monkeypatch):
+    pytest.importorskip("fastapi")
+    monkeypatch.delenv("WARMUP_ENABLED", raising=False)
+    assert import_budget.check_import_budget("app.api.main")["eager_heavy_imports"] == []
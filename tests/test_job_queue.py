@@ -0,0 +1,87 @@
+import asyncio
+import os
+import threading
+
+import pytest
+
+from app.services import job_queue
+from app.services.job_queue import JobQueue
+
+
+def _queue(tmp_path, **kwargs):
+    return JobQueue(path=str(tmp_path / "jobs.sqlite"), spool_dir=str(tmp_path / "files"), **kwargs)
+
+
+def test_enqueue_failure_drops_the_files_already_spooled(tmp_path):
+    queue = _queue(tmp_path)
+
+    def entries():
+        yield "a.pdf", b"%PDF a", None
+        yield "b.pdf", b"%PDF b", None
+        raise OSError("archive truncated")
+
+    with pytest.raises(OSError):
+        queue.enqueue(entries())
+    assert os.listdir(queue.spool_dir) == []
+    assert queue.stats()["jobs"] == 0
+
+
+def test_failed_items_back_off_then_fail_for_good(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(job_queue.time, "time", lambda: clock[0])
+    queue = _queue(tmp_path, max_attempts=2, retry_backoff=10)
+    job_id = queue.enqueue([("a.pdf", b"%PDF a", None)])
+
+    item = queue.claim("w")
+    queue.fail(item, "w", "boom")
+    assert queue.claim("w") is None
+    clock[0] += 10
+    item = queue.claim("w")
+    assert item["attempt"] == 2
+    queue.fail(item, "w", "boom again")
+    job = queue.get_job(job_id)
+    assert (job["status"], job["results"][0]["error"]) == ("done", "boom again")
+    assert os.listdir(queue.spool_dir) == []
+
+
+def test_expired_lease_is_reclaimed_and_old_owner_cannot_complete(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(job_queue.time, "time", lambda: clock[0])
+    queue = _queue(tmp_path, visibility_timeout=30)
+    job_id = queue.enqueue([("a.pdf", b"%PDF a", None)])
+
+    stale = queue.claim("w1")
+    assert queue.claim("w2") is None
+    clock[0] += 31
+    fresh = queue.claim("w2")
+    assert fresh["attempt"] == 2
+    queue.complete(stale, "w1", {"total": 1.0})
+    assert queue.get_job(job_id)["running"] == 1
+    queue.complete(fresh, "w2", {"total": 2.0})
+    assert queue.get_job(job_id)["results"][0]["data"] == {"total": 2.0}
+
+
+def test_executor_runner_gives_up_after_the_lease(monkeypatch):
+    cancelled = threading.Event()
+
+    class SlowExecutor:
+        async def extract_traced(self, *args, **kwargs):
+            try:
+                await asyncio.sleep(30)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+    monkeypatch.setattr(job_queue, "get_extraction_executor", lambda: SlowExecutor())
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        extract = job_queue.executor_runner(loop, timeout=0.05)
+        with pytest.raises(TimeoutError):
+            extract({"path": "x.pdf", "vendor_hint": None, "cfg_path": "vendors.yaml", "use_ocr_hint": None})
+        assert cancelled.wait(2)
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(2)
+        loop.close()
@@ -0,0 +1,62 @@
+import time
+
+from app.services import line_cache
+from app.services.line_cache import LineCache
+from app.services.page_tokens import TokenStore
+
+
+def _cache(tmp_path, **kwargs):
+    return LineCache(path=str(tmp_path / "lines.sqlite"), **kwargs)
+
+
+def _put(cache, key, lines=("TOTAL 1,00",), tokens=None):
+    cache.put(key, key, "reader", list(lines), False, {}, tokens=tokens)
+
+
+def test_round_trip_with_tokens(tmp_path):
+    cache = _cache(tmp_path)
+    tokens = TokenStore()
+    tokens.add(1, 0, 0, 0, (10.0, 100.0, 50.0, 108.0), 95, "TOTAL")
+    _put(cache, "a", tokens=tokens)
+    lines, used_ocr, debug, layout = cache.get("a")
+    assert (lines, used_ocr, debug) == (["TOTAL 1,00"], False, {})
+    assert layout.text(0) == "TOTAL"
+    assert cache.get("b") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "stores": 1, "errors": 0}
+
+
+def test_expired_reads_are_dropped(tmp_path, monkeypatch):
+    cache = _cache(tmp_path, ttl_seconds=60)
+    _put(cache, "old")
+    now = time.time()
+    monkeypatch.setattr(line_cache.time, "time", lambda: now + 120)
+    assert cache.get("old") is None
+    assert list(cache.iter_entries()) == []
+
+
+def test_least_recently_used_reads_are_evicted_first(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(line_cache.time, "time", lambda: clock[0])
+    cache = _cache(tmp_path, ttl_seconds=0)
+    lines = ["%04d FACTURA TOTAL" % i for i in range(200)]
+    for key in ("a", "b"):
+        _put(cache, key, lines)
+        clock[0] += 1
+    size = cache._connect().execute("SELECT size FROM lines WHERE key = 'a'").fetchone()[0]
+    cache.max_bytes = 2 * size + size // 2
+    assert cache.get("a") is not None  # "a" is now more recent than "b"
+    clock[0] += 1
+    _put(cache, "c", lines)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+def test_reader_code_fingerprint_covers_page_tokens(tmp_path, monkeypatch):
+    for name in line_cache._READER_SOURCES:
+        (tmp_path / name).write_text("# " + name)
+    monkeypatch.setattr(line_cache, "_SERVICES_DIR", str(tmp_path))
+    monkeypatch.setattr(line_cache, "_READER_CODE_FINGERPRINT", None)
+    before = line_cache.reader_code_fingerprint()
+    (tmp_path / "page_tokens.py").write_text("# changed token serialization")
+    monkeypatch.setattr(line_cache, "_READER_CODE_FINGERPRINT", None)
+    assert line_cache.reader_code_fingerprint() != before
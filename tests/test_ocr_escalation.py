@@ -0,0 +1,49 @@
+from app.services import pdf_reader
+from app.services.pdf_reader import _lines_and_conf_from_data, _needs_escalation, ocr_pdf_units
+
+
+def _data(words):
+    """pytesseract-style dict for (text, conf, line_num) triples."""
+    return {
+        "text": [text for text, _, _ in words],
+        "conf": [conf for _, conf, _ in words],
+        "line_num": [line for _, _, line in words],
+    }
+
+
+def test_conf_is_numeric_mean():
+    lines, conf = _lines_and_conf_from_data(_data([("TOTAL", 95, 1), ("1.210,00", 60, 1), ("21%", 80, 1)]))
+    assert lines == ["TOTAL 1.210,00 21%"]
+    assert conf == 70.0
+
+
+def test_conf_is_none_without_numeric_tokens():
+    lines, conf = _lines_and_conf_from_data(_data([("FACTURA", 30, 1), ("ORIGINAL", 25, 2)]))
+    assert lines == ["FACTURA", "ORIGINAL"]
+    assert conf is None
+
+
+def test_needs_escalation():
+    threshold = pdf_reader.OCR_MIN_NUMERIC_CONF
+    assert not _needs_escalation({"conf": threshold + 1}, ["TOTAL 1,00"])
+    assert _needs_escalation({"conf": threshold - 1}, ["TOTAL 1,00"])
+    assert _needs_escalation({"conf": None}, ["FACTURA"])
+    assert _needs_escalation({"conf": None, "error": "render_failed"}, [])
+    assert not _needs_escalation({"conf": None, "error": "no_ocr_engine"}, [])
+
+
+def test_text_only_unit_is_retried_at_higher_dpi(monkeypatch):
+    calls = []
+
+    def fake_unit(path, unit, dpi, max_bytes=None):
+        calls.append((unit["page"], dpi))
+        if dpi == 300:
+            return ["TOTAL 1.210,00"], {"dpi": 300, "conf": 92.0}
+        lines, conf = _lines_and_conf_from_data(_data([("T0TAL", 20, 1)]))
+        return lines, {"dpi": dpi, "conf": conf}
+
+    monkeypatch.setattr(pdf_reader, "_ocr_dependencies_ready", lambda: True)
+    monkeypatch.setattr(pdf_reader, "_ocr_unit", fake_unit)
+    [(info, lines)] = ocr_pdf_units(b"%PDF", [{"page": 1}], dpi=150, workers=1, escalate_dpi=300)
+    assert calls == [(1, 150), (1, 300)]
+    assert (info["dpi"], lines) == (300, ["TOTAL 1.210,00"])
@@ -0,0 +1,45 @@
+from app.services.page_tokens import TokenStore
+
+
+def _row(store, line_idx, words, y=100.0, page=1):
+    x = 10.0
+    for word in words:
+        store.add(page, 0, line_idx, line_idx, (x, y, x + 40, y + 8), 90, word)
+        x += 50
+
+
+def test_round_trip_keeps_arrays_and_text():
+    store = TokenStore()
+    _row(store, 0, ["SUBTOTAL", "1.000,00"])
+    _row(store, 1, ["Descripción", "ñandú"], y=120.0, page=2)
+    restored = TokenStore.from_bytes(store.to_bytes())
+    assert len(restored) == 4
+    assert [restored.text(i) for i in range(4)] == ["SUBTOTAL", "1.000,00", "Descripción", "ñandú"]
+    assert restored.bbox(3) == store.bbox(3)
+    assert list(restored.page) == [1, 1, 2, 2]
+    assert restored.tokens_on_line(1) == [2, 3]
+
+
+def test_amount_right_of_skips_percentages():
+    store = TokenStore()
+    _row(store, 0, ["IVA", "21,00", "%", "210,00", "5,00"])
+    assert store.amount_right_of("IVA") == 210.0
+    assert store.amount_right_of("IVA", last=True) == 5.0
+
+
+def test_amount_right_of_needs_the_same_baseline_and_side():
+    store = TokenStore()
+    _row(store, 0, ["1.000,00", "TOTAL"])
+    _row(store, 1, ["99,00"], y=140.0)
+    assert store.amount_right_of("TOTAL") is None
+    assert store.amount_right_of("TOTAL", line_idx=1) is None
+    assert store.amount_right_of("NETO") is None
+
+
+def test_extend_shifts_line_indexes():
+    first, second = TokenStore(), TokenStore()
+    _row(first, 0, ["FACTURA"])
+    _row(second, 0, ["TOTAL", "1,00"], page=2)
+    first.extend(second, line_offset=5)
+    assert first.tokens_on_line(5) == [1, 2]
+    assert first.amount_right_of("TOTAL", line_idx=5) == 1.0
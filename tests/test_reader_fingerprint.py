@@ -0,0 +1,17 @@
+import sys
+
+from app.services import pdf_reader
+from app.services.pdf_reader import PdfLineReader
+
+
+def test_fingerprint_does_not_build_the_ocr_engine(monkeypatch):
+    def build():
+        raise AssertionError("OCR engine built")
+
+    monkeypatch.setattr(pdf_reader, "_build_ocr_engine", build)
+    monkeypatch.setattr(pdf_reader, "_ENGINE", None)
+    loaded = {name for name in ("fitz", "PIL", "tesserocr", "pytesseract") if name in sys.modules}
+    fingerprint = PdfLineReader().fingerprint()
+    assert fingerprint == PdfLineReader().fingerprint()
+    assert {name for name in ("fitz", "PIL", "tesserocr", "pytesseract") if name in sys.modules} == loaded
+    assert pdf_reader._ENGINE is None
@@ -0,0 +1,42 @@
+import io
+import os
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from app.api import uploads  # noqa: E402
+from app.api.uploads import UploadBudget, Uploads  # noqa: E402
+
+
+class _Upload:
+    def __init__(self, data, filename="factura.pdf"):
+        self.filename = filename
+        self.file = io.BytesIO(data)
+        self.size = len(data)
+
+
+def test_budget_charges_real_sizes(monkeypatch):
+    monkeypatch.setattr(uploads, "_UPLOAD_MEMORY_MAX_BYTES", 100)
+    budget = UploadBudget(total=150)
+    first = Uploads.read_pdf(_Upload(b"%PDF" + b"a" * 76), budget)
+    second = Uploads.read_pdf(_Upload(b"%PDF" + b"b" * 76), budget)
+    third = Uploads.read_pdf(_Upload(b"%PDF" + b"c" * 6), budget)
+    try:
+        assert isinstance(first, bytes) and len(first) == 80
+        assert isinstance(second, str) and os.path.getsize(second) == 80
+        assert third == b"%PDF" + b"c" * 6
+        assert budget.remaining == 60
+    finally:
+        Uploads.release(second)
+
+
+def test_files_over_the_per_file_limit_go_to_disk(monkeypatch):
+    monkeypatch.setattr(uploads, "_UPLOAD_MEMORY_MAX_BYTES", 10)
+    budget = UploadBudget(total=1000)
+    source = Uploads.read_pdf(_Upload(b"%PDF" + b"x" * 20), budget)
+    try:
+        assert isinstance(source, str)
+        assert budget.remaining == 1000
+    finally:
+        Uploads.release(source)